@@ -0,0 +1,157 @@
+import asyncio
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Both code trees are run as scripts from their own directory, as in tests/conftest.py
+for path in (os.path.join(ROOT, "src"), os.path.join(ROOT, "temp")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+class Benchmark:
+    """
+    One timed operation
+
+    setup() is called once and returns the operation: a function of no
+    arguments, or a coroutine function when is_async, which is awaited
+    inside a single event loop so loop start-up is not timed.
+    """
+
+    def __init__(self, name: str, setup: Callable[[], Callable], is_async: bool = False):
+        self.name = name
+        self.setup = setup
+        self.is_async = is_async
+
+REGISTRY: List[Benchmark] = []
+
+def benchmark(name: str, is_async: bool = False):
+    """Register a setup function under name"""
+    def register(setup):
+        REGISTRY.append(Benchmark(name, setup, is_async))
+        return setup
+    return register
+
+def _time_sync(operation: Callable, iterations: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        operation()
+    return time.perf_counter_ns() - started
+
+async def _time_async(operation: Callable, iterations: int) -> float:
+    started = time.perf_counter_ns()
+    for _ in range(iterations):
+        await operation()
+    return time.perf_counter_ns() - started
+
+def measure(bench: Benchmark, repeat: int = 5, min_time: float = 0.1) -> dict:
+    """
+    Time bench: the iteration count grows until one round takes
+    min_time seconds, then repeat rounds are timed with the garbage
+    collector off
+
+    Returns:
+        Nanoseconds per operation (median, min, mean, stdev) and the counts
+    """
+    operation = bench.setup()
+    loop = asyncio.new_event_loop() if bench.is_async else None
+
+    def run_round(iterations: int) -> float:
+        if loop is not None:
+            return loop.run_until_complete(_time_async(operation, iterations))
+        return _time_sync(operation, iterations)
+
+    gc_enabled = gc.isenabled()
+    try:
+        iterations = 1
+        while True:
+            elapsed = run_round(iterations)
+            if elapsed >= min_time * 1e9 or iterations >= 1 << 24:
+                break
+            iterations *= 2 if elapsed * 4 > min_time * 1e9 else 8
+        gc.disable()
+        rounds = [run_round(iterations) / iterations for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+        if loop is not None:
+            loop.close()
+
+    return {
+        'median_ns': statistics.median(rounds),
+        'min_ns': min(rounds),
+        'mean_ns': statistics.fmean(rounds),
+        'stdev_ns': statistics.stdev(rounds) if len(rounds) > 1 else 0.0,
+        'iterations': iterations,
+        'repeat': repeat,
+    }
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(benchmarks: List[Benchmark], repeat: int = 5, min_time: float = 0.1,
+        progress: Callable[[str, dict], None] = None) -> dict:
+    """Measure every benchmark; the result is what gets saved as JSON"""
+    results = {}
+    for bench in benchmarks:
+        results[bench.name] = measure(bench, repeat, min_time)
+        if progress:
+            progress(bench.name, results[bench.name])
+    return {
+        'meta': {
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'machine': f"{platform.system()} {platform.machine()}",
+        },
+        'results': results,
+    }
+
+def compare(results: dict, baseline: dict, threshold: float = 0.1, metric: str = 'median_ns') -> Dict[str, dict]:
+    """
+    Relative change of each benchmark present in both runs
+
+    Returns:
+        name -> {'baseline', 'current', 'change', 'regressed'}, where a
+        change above threshold (0.1 = 10% slower) is a regression
+    """
+    comparison = {}
+    for name, current in results['results'].items():
+        previous = baseline['results'].get(name)
+        if previous is None:
+            continue
+        change = current[metric] / previous[metric] - 1.0
+        comparison[name] = {'baseline': previous[metric], 'current': current[metric], 'change': change,
+                            'regressed': change > threshold}
+    return comparison
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f}{unit}"
+    return f"{ns:.0f}ns"
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def save(results: dict, path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
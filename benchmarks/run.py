@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+from benchmarks.harness import REGISTRY, ROOT, compare, format_ns, load, run, save
+import benchmarks.suite  # noqa: F401  Registers the benchmarks
+
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Time the bot's hot paths and compare with a baseline")
+    parser.add_argument('-k', '--filter', action='append', default=[],
+                        help="Only run benchmarks whose name contains this (repeatable)")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed rounds per benchmark")
+    parser.add_argument('--min-time', type=float, default=0.1, help="Seconds each round runs for at least")
+    parser.add_argument('--output', default=os.path.join(RESULTS_DIR, 'latest.json'))
+    parser.add_argument('--baseline', default=os.path.join(RESULTS_DIR, 'baseline.json'))
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Fail when a median is this much slower than the baseline's (0.10 = 10%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Make this run the new baseline")
+    parser.add_argument('--list', action='store_true', help="List the benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    selected = [b for b in REGISTRY if not args.filter or any(f in b.name for f in args.filter)]
+    if args.list:
+        print('\n'.join(b.name for b in selected))
+        return 0
+    if not selected:
+        print("No benchmark matches", file=sys.stderr)
+        return 2
+
+    width = max(len(b.name) for b in selected)
+
+    def progress(name, result):
+        print(f"{name:<{width}}  {format_ns(result['median_ns']):>10}  "
+              f"±{result['stdev_ns'] / result['median_ns'] * 100:4.1f}%  ({result['iterations']} x {result['repeat']})",
+              flush=True)
+
+    results = run(selected, args.repeat, args.min_time, progress)
+    save(results, args.output)
+    print(f"\nSaved {args.output}")
+
+    if args.save_baseline:
+        save(results, args.baseline)
+        print(f"Saved baseline {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare with, run with --save-baseline to record one")
+        return 0
+
+    baseline = load(args.baseline)
+    comparison = compare(results, baseline, args.threshold)
+    print(f"\nAgainst baseline from {baseline['meta'].get('time')} ({baseline['meta'].get('commit')}):")
+    for name, row in comparison.items():
+        flag = "  REGRESSION" if row['regressed'] else ""
+        print(f"{name:<{width}}  {format_ns(row['baseline']):>10} -> {format_ns(row['current']):>10}  "
+              f"{row['change'] * 100:+6.1f}%{flag}")
+    regressions = [name for name, row in comparison.items() if row['regressed']]
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than the baseline by more than "
+              f"{args.threshold * 100:.0f}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+# From the repository root: python -m benchmarks.run --save-baseline, then python -m benchmarks.run after a change
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.harness import benchmark
+
+from api.rest_api_manager import RESTAPIManager
+from simulation.simulation_engine import SimulationEngine
+from strategies.strategy_manager import StrategyManager
+
+from binance_trader.api.decoder import Kline, decode_payload, loads, peek_stream
+from binance_trader.api.rate_limiter import RateLimit, RateLimiter
+from binance_trader.latency import LatencyTracer
+from binance_trader.strategies.scalping_strategy import ScalpingStrategy
+from binance_trader.trade_manager import TradeManager
+
+def _prices(n: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 1e-3, n)))
+
+def _klines(n: int, symbol: str = 'BTCUSDT') -> list:
+    # A slow wave under the noise, so the strategy does enter and exit
+    closes = _prices(n) * (1 + 0.02 * np.sin(np.arange(n) / 15))
+    return [Kline(symbol, '1m', i * 60_000 + 59_999, i * 60_000, i * 60_000 + 59_999, float(c), float(c) * 1.001,
+                  float(c) * 0.999, float(c), 10.0, True) for i, c in enumerate(closes)]
+
+class _FilledClient:
+    """Answers TradeManager's calls the way a funded account would, without a network"""
+
+    async def get_free_balance(self, asset):
+        return 10000.0
+
+    async def get_trading_rules(self, symbol):
+        return {'base_asset': symbol[:-4], 'quote_asset': symbol[-4:], 'step_size': 0.001, 'min_qty': 0.001}
+
+    async def place_order(self, symbol, side, order_type, quantity, price=None):
+        return {'orderId': 1, 'status': 'FILLED', 'price': '0.0', 'executedQty': str(quantity),
+                'cummulativeQuoteQty': str(quantity * 100)}
+
+# REST
+
+@benchmark('rest.sign_payload')
+def sign_payload():
+    manager = RESTAPIManager('key', 'secret')
+    params = {'symbol': 'BTCUSDT', 'side': 'BUY', 'type': 'LIMIT', 'quantity': 0.01, 'price': 64000.5,
+              'timeInForce': 'GTC', 'timestamp': 1700000000000}
+    return lambda: manager.sign_payload(params)
+
+@benchmark('rate_limiter.acquire', is_async=True)
+def rate_limiter_acquire():
+    limiter = RateLimiter(limits=[
+        RateLimit(10 ** 12, 60, header='X-MBX-USED-WEIGHT-1M'),
+        RateLimit(10 ** 12, 10, kind='ORDERS'),
+        RateLimit(10 ** 12, 86400, kind='ORDERS'),
+    ])
+    return lambda: limiter.acquire(1, orders=1)
+
+@benchmark('latency.record')
+def latency_record():
+    tracer = LatencyTracer()
+    return lambda: tracer.record('decode', 'BTCUSDT', 12_345)
+
+# Stream decoding, as WebSocketManager.feed does it
+
+def _frame(stream: str, data: dict) -> str:
+    return json.dumps({'stream': stream, 'data': data})
+
+FRAMES = {
+    'trade': _frame('btcusdt@trade', {'e': 'trade', 'E': 1700000000000, 's': 'BTCUSDT', 't': 12345,
+                                      'p': '64000.01000000', 'q': '0.01200000', 'T': 1700000000000,
+                                      'm': True, 'M': True}),
+    'kline': _frame('btcusdt@kline_1m', {'e': 'kline', 'E': 1700000000000, 's': 'BTCUSDT', 'k': {
+        't': 1699999980000, 'T': 1700000039999, 's': 'BTCUSDT', 'i': '1m', 'f': 100, 'L': 200,
+        'o': '64000.00000000', 'c': '64010.00000000', 'h': '64020.00000000', 'l': '63990.00000000',
+        'v': '12.50000000', 'n': 100, 'x': False, 'q': '800000.00000000', 'V': '6.00000000',
+        'Q': '384000.00000000', 'B': '0'}}),
+    'depth20': _frame('btcusdt@depth@100ms', {'e': 'depthUpdate', 'E': 1700000000000, 's': 'BTCUSDT',
+                                              'U': 1000, 'u': 1019,
+                                              'b': [[f"{64000 - i * 0.01:.8f}", '1.00000000'] for i in range(20)],
+                                              'a': [[f"{64000 + i * 0.01:.8f}", '1.00000000'] for i in range(20)]}),
+}
+
+def _decoder(frame: str):
+    def decode():
+        peek_stream(frame)
+        return decode_payload(loads(frame)['data'])
+    return decode
+
+for _name, _frame_text in FRAMES.items():
+    benchmark(f"decode.{_name}")(lambda frame=_frame_text: _decoder(frame))
+
+# Strategy and trade manager
+
+def _warm_strategy(klines: list) -> ScalpingStrategy:
+    strategy = ScalpingStrategy(None, 'BTCUSDT')
+    for kline in klines:
+        strategy._add_candle({'timestamp': kline.open_time, 'open': kline.open, 'high': kline.high,
+                              'low': kline.low, 'close': kline.close, 'volume': kline.volume})
+    return strategy
+
+@benchmark('strategy.indicators')
+def strategy_indicators():
+    """One candle in, every BaseStrategy indicator read back"""
+    klines = _klines(2000)
+    strategy = _warm_strategy(klines[:100])
+    candles = [{'timestamp': k.open_time, 'open': k.open, 'high': k.high, 'low': k.low, 'close': k.close,
+                'volume': k.volume} for k in klines[100:]]
+    position = [0]
+
+    def step():
+        strategy._add_candle(candles[position[0] % len(candles)])
+        position[0] += 1
+        strategy.calculate_rsi(14)
+        strategy.calculate_ema(20)
+        strategy.calculate_macd()
+        strategy.calculate_sma(20)
+        strategy.calculate_atr(14)
+        strategy.calculate_bollinger_bands(20)
+    return step
+
+@benchmark('strategy.scalping_signals')
+def scalping_signals():
+    klines = _klines(200)
+    strategy = _warm_strategy(klines)
+
+    def signals():
+        strategy._signals_key = None  # As if a new candle had arrived
+        return strategy.get_signals()
+    return signals
+
+@benchmark('trade_manager.handle_kline', is_async=True)
+def handle_kline():
+    klines = _klines(5000)
+    client = _FilledClient()
+    manager = TradeManager(client)
+    manager.add_strategy('BTCUSDT', _warm_strategy(klines[:100]))
+    stream = klines[100:]
+    position = [0]
+
+    def next_kline():
+        kline = stream[position[0] % len(stream)]
+        position[0] += 1
+        return manager._handle_kline_data(kline)
+    return next_kline
+
+# Backtests at several sizes
+
+def _backtest(size: int, mode: str):
+    prices = pd.Series(_prices(size))
+    engine = SimulationEngine(StrategyManager())
+    if mode == 'vectorized':
+        return lambda: engine.run_vectorized_backtest(prices.to_numpy())
+    return lambda: engine.run_backtest(prices, streaming=mode == 'streaming')
+
+BACKTEST_SIZES = {
+    'prefix': (100, 1_000),  # O(n^2): every bar re-evaluates its whole prefix
+    'streaming': (1_000, 10_000, 100_000),
+    'vectorized': (10_000, 1_000_000),
+}
+
+for _mode, _sizes in BACKTEST_SIZES.items():
+    for _size in _sizes:
+        benchmark(f"simulation.run_backtest.{_mode}.{_size}")(
+            lambda size=_size, mode=_mode: _backtest(size, mode))
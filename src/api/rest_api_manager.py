@@ -3,13 +3,81 @@ import hmac
 import hashlib
 import time
 import os
+import asyncio
+import logging
+from collections import deque
+
+try:
+    import h2  # noqa: F401  httpx needs it for HTTP/2
+except ImportError:
+    h2 = None
 
 class RESTAPIManager:
     BASE_URL = "https://testnet.binance.vision/api"
 
-    def __init__(self, api_key: str, secret_key: str):
+    def __init__(self, api_key: str, secret_key: str, http2: bool = False, max_connections: int = 10,
+                 keepalive_expiry: float = 60.0, timeout: float = 10.0, transport=None, base_url: str = None):
+        """
+        Args:
+            api_key: Binance API key
+            secret_key: Binance API secret
+            http2: Negotiate HTTP/2 when the h2 package is installed
+            max_connections: Size of the connection pool
+            keepalive_expiry: Seconds an idle pooled connection is kept open
+            timeout: Request timeout in seconds
+            transport: Custom httpx transport, e.g. httpx.MockTransport in tests
+            base_url: REST root, e.g. a local MockExchange's rest_url
+        """
         self.api_key = api_key
         self.secret_key = secret_key
+        if http2 and h2 is None:
+            logging.warning("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+        self.http2 = http2 and h2 is not None
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        self.transport = transport
+        if base_url:
+            self.BASE_URL = base_url
+        self.timings = deque(maxlen=1000)  # Most recent request timings, oldest first
+        self.brackets = {}  # Open OCO brackets by orderListId
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Long-lived pooled client shared by every request"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.BASE_URL,
+                headers={"X-MBX-APIKEY": self.api_key or ""},
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.transport
+            )
+        return self._client
+
+    async def start(self, warm_connections: int = 1):
+        """Open the pool and pre-establish connections before the first order"""
+        try:
+            await asyncio.gather(*(self._request("GET", "/v3/ping") for _ in range(warm_connections)))
+        except httpx.HTTPError as e:
+            logging.warning(f"Could not pre-warm REST connections: {e}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
 
     def sign_payload(self, params):
         query = "&".join([f"{k}={v}" for k, v in params.items()])
@@ -25,9 +93,115 @@ class RESTAPIManager:
             "quantity": quantity,
             "timestamp": int(time.time() * 1000)
         }
-        signed_params = self.sign_payload(params)
-        headers = {"X-MBX-APIKEY": self.api_key}
+        response = await self._request("POST", endpoint, self.sign_payload(params))
+        return response.json()
+
+    async def place_bracket_order(self, symbol: str, side: str, quantity: float,
+                                  take_profit_price, stop_price, stop_limit_price=None) -> dict:
+        """
+        Protect a position with a take-profit and a stop-loss submitted as
+        one OCO order list: both legs exist after a single round trip and
+        the exchange cancels one when the other fills.
+
+        Args:
+            symbol: Trading pair
+            side: Side of the protective orders, SELL to close a long
+            quantity: Quantity of each leg
+            take_profit_price: Limit price of the take-profit leg
+            stop_price: Trigger price of the stop-loss leg
+            stop_limit_price: Limit price once the stop triggers, defaults to stop_price
+
+        Returns:
+            The tracked bracket, also kept in self.brackets
+        """
+        stop_limit_price = stop_price if stop_limit_price is None else stop_limit_price
+        take_profit = {"Type": "LIMIT_MAKER", "Price": take_profit_price}
+        stop_loss = {
+            "Type": "STOP_LOSS_LIMIT",
+            "Price": stop_limit_price,
+            "StopPrice": stop_price,
+            "TimeInForce": "GTC"
+        }
+        # Closing a long, the take-profit sits above the market; closing a short, below
+        above, below = (take_profit, stop_loss) if side == "SELL" else (stop_loss, take_profit)
+
+        params = {"symbol": symbol, "side": side, "quantity": quantity}
+        params.update({f"above{k}": v for k, v in above.items()})
+        params.update({f"below{k}": v for k, v in below.items()})
+        params["timestamp"] = int(time.time() * 1000)
+
+        response = await self._request("POST", "/v3/orderList/oco", self.sign_payload(params))
+        response.raise_for_status()
+        order_list = response.json()
+
+        legs = {report["type"]: report for report in order_list.get("orderReports", [])}
+        bracket = {
+            "order_list_id": order_list["orderListId"],
+            "symbol": symbol,
+            "side": side,
+            "quantity": quantity,
+            "status": order_list["listOrderStatus"],
+            "take_profit": legs.get("LIMIT_MAKER"),
+            "stop_loss": legs.get("STOP_LOSS_LIMIT"),
+            "order_ids": [order["orderId"] for order in order_list["orders"]]
+        }
+        self.brackets[bracket["order_list_id"]] = bracket
+        return bracket
+
+    async def cancel_bracket_order(self, symbol: str, order_list_id: int) -> dict:
+        """Cancel both legs of a bracket in one request"""
+        params = {
+            "symbol": symbol,
+            "orderListId": order_list_id,
+            "timestamp": int(time.time() * 1000)
+        }
+        response = await self._request("DELETE", "/v3/orderList", self.sign_payload(params))
+        response.raise_for_status()
+        self.brackets.pop(order_list_id, None)
+        return response.json()
+
+    async def _request(self, method: str, endpoint: str, query: str = None) -> httpx.Response:
+        events = {}
+
+        async def trace(name, info):
+            events[name] = time.perf_counter()
+
+        url = f"{endpoint}?{query}" if query else endpoint
+        started = time.perf_counter()
+        response = await self.client.request(method, url, extensions={"trace": trace})
+        self.timings.append(self._timing(endpoint, started, time.perf_counter(), events))
+        return response
+
+    @staticmethod
+    def _timing(endpoint, started, finished, events):
+        """Turn httpcore trace events into connect/TLS/time-to-first-byte durations"""
+        def span(start, end):
+            if start in events and end in events:
+                return events[end] - events[start]
+            return None
+
+        sent = events.get("http11.send_request_headers.started", events.get("http2.send_request_headers.started"))
+        first_byte = events.get("http11.receive_response_headers.complete",
+                                events.get("http2.receive_response_headers.complete"))
+        return {
+            "endpoint": endpoint,
+            "connect": span("connection.connect_tcp.started", "connection.connect_tcp.complete"),
+            "tls": span("connection.start_tls.started", "connection.start_tls.complete"),
+            "ttfb": first_byte - sent if sent is not None and first_byte is not None else None,
+            "total": finished - started,
+            "reused": "connection.connect_tcp.started" not in events
+        }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{self.BASE_URL}{endpoint}?{signed_params}", headers=headers)
-            return response.json()
+    def latency_summary(self) -> dict:
+        """p50/p99/max in milliseconds for every recorded timing"""
+        summary = {}
+        for key in ("connect", "tls", "ttfb", "total"):
+            values = sorted(t[key] * 1000 for t in self.timings if t[key] is not None)
+            if values:
+                summary[key] = {
+                    "count": len(values),
+                    "p50": values[len(values) // 2],
+                    "p99": values[min(len(values) - 1, int(len(values) * 0.99))],
+                    "max": values[-1]
+                }
+        return summary
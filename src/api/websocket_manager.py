@@ -3,16 +3,41 @@ import websockets
 import logging
 
 class WebSocketManager:
-    def __init__(self, stream: str):
-        self.url = f"wss://testnet.binance.vision/ws/{stream}"
+    BASE_URL = "wss://testnet.binance.vision/ws"
+
+    def __init__(self, stream: str, publish=None, recorder=None, connect=None, base_url: str = None):
+        """
+        Args:
+            stream: Stream to connect to, e.g. "btcusdt@trade"
+            publish: Coroutine function publish(stream, message) every raw
+                message is handed to, e.g. an event bus's publish
+            recorder: Object with record(source, message), e.g. a
+                StreamRecorder, that gets every raw message
+            connect: websockets.connect replacement, e.g. a
+                StreamReplayer's connect to replay a recording
+            base_url: Single-stream root, e.g. a local MockExchange's ws_url
+        """
+        self.stream = stream
+        self.url = f"{base_url or self.BASE_URL}/{stream}"
+        self.publish = publish
+        self.recorder = recorder
+        self._connect = connect or websockets.connect
 
     async def connect(self):
         try:
             logging.info("Connecting to WebSocket...")
-            async with websockets.connect(self.url) as ws:
+            async with self._connect(self.url) as ws:
                 while True:
                     message = await ws.recv()
-                    logging.info(f"Received: {message}")
+                    if self.recorder is not None:
+                        self.recorder.record(self.stream, message)
+                    await self.feed(message)
         except websockets.ConnectionClosed:
             logging.warning("WebSocket connection closed. Reconnecting...")
             await self.connect()
+
+    async def feed(self, message):
+        """Handle one raw message as if the socket had received it"""
+        logging.debug(f"Received: {message}")
+        if self.publish:
+            await self.publish(self.stream, message)
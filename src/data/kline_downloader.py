@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+from data.kline_store import KlineStore, interval_ms, rows_to_columns
+
+logger = logging.getLogger(__name__)
+
+class _WeightBudget:
+    """Request weight spent in the exchange's current one-minute window"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.window = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, weight: int) -> None:
+        async with self._lock:  # Waiters queue up behind the first one sleeping
+            while True:
+                now = time.time()
+                window = int(now // 60)
+                if window != self.window:
+                    self.window = window
+                    self.used = 0
+                if self.used + weight <= self.limit:
+                    self.used += weight
+                    return
+                await asyncio.sleep((window + 1) * 60 - now)
+
+    def update(self, headers: httpx.Headers) -> None:
+        used = headers.get('x-mbx-used-weight-1m')
+        if used is not None and int(time.time() // 60) == self.window:
+            self.used = max(self.used, int(used))
+
+class KlineDownloader:
+    """
+    Fills a KlineStore from the public klines endpoint
+
+    Every series resumes after its newest stored kline. Its remaining range
+    is cut into pages of PAGE_LIMIT klines that are fetched concurrently,
+    bounded by max_concurrency across all series and by the request weight
+    budget, and written in order a batch at a time so an interrupted run
+    loses at most one batch.
+    """
+
+    BASE_URL = "https://api.binance.com/api"
+    PAGE_LIMIT = 1000
+    KLINES_WEIGHT = 2
+    PAGES_PER_WRITE = 50
+
+    def __init__(self, store: KlineStore = None, max_concurrency: int = 8, weight_limit: int = 1000,
+                 base_url: str = None, timeout: float = 30.0, max_retries: int = 5, transport=None):
+        """
+        Args:
+            store: Where klines go, the default data/klines store if omitted
+            max_concurrency: Requests in flight at once
+            weight_limit: Request weight to spend per minute, kept below the
+                exchange's 1200 to leave room for the bot itself
+            base_url: REST root, e.g. a local stand-in server in tests
+            timeout: Request timeout in seconds
+            max_retries: Attempts per page on throttling and server errors
+            transport: Custom httpx transport
+        """
+        self.store = store or KlineStore()
+        self.max_concurrency = max_concurrency
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.transport = transport
+        self._budget = _WeightBudget(weight_limit)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.requests = 0
+
+    async def download(self, symbols: Iterable[str], intervals: Iterable[str], start: int,
+                       end: Optional[int] = None) -> Dict[str, int]:
+        """
+        Download every symbol/interval pair concurrently
+
+        Args:
+            start: First open time wanted (ms)
+            end: Open time to stop before (ms), now by default. Only closed
+                klines are stored.
+
+        Returns:
+            Klines written per "SYMBOL interval"
+        """
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        series = [(symbol.upper(), interval) for symbol in symbols for interval in intervals]
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, transport=self.transport,
+                                     limits=httpx.Limits(max_connections=self.max_concurrency)) as client:
+            written = await asyncio.gather(*(self.download_series(client, symbol, interval, start, end)
+                                             for symbol, interval in series))
+        return {f"{symbol} {interval}": count for (symbol, interval), count in zip(series, written)}
+
+    async def download_series(self, client: httpx.AsyncClient, symbol: str, interval: str, start: int,
+                              end: Optional[int] = None) -> int:
+        step = interval_ms(interval)
+        now = int(time.time() * 1000)
+        end = min(end if end is not None else now, now - now % step)  # The open kline is still changing
+
+        last = self.store.last_open_time(symbol, interval)
+        if last is not None and last + step > start:
+            start = last + step
+        start += -start % step
+        if start >= end:
+            return 0
+
+        page_span = self.PAGE_LIMIT * step
+        pages = list(range(start, end, page_span))
+        written = 0
+        for i in range(0, len(pages), self.PAGES_PER_WRITE):
+            batch = pages[i:i + self.PAGES_PER_WRITE]
+            results = await asyncio.gather(*(
+                self._fetch_page(client, symbol, interval, page, min(page + page_span, end)) for page in batch))
+            rows = [row for page_rows in results for row in page_rows if row[0] < end]
+            written += self.store.write(symbol, interval, rows_to_columns(rows))
+        logger.info(f"Stored {written} {symbol} {interval} klines")
+        return written
+
+    async def _fetch_page(self, client: httpx.AsyncClient, symbol: str, interval: str, start: int,
+                          end: int) -> List[list]:
+        params = {
+            'symbol': symbol,
+            'interval': interval,
+            'startTime': start,
+            'endTime': end - 1,
+            'limit': self.PAGE_LIMIT
+        }
+        for attempt in range(self.max_retries):
+            await self._budget.acquire(self.KLINES_WEIGHT)
+            try:
+                async with self._semaphore:
+                    response = await client.get('/v3/klines', params=params)
+                self.requests += 1
+            except httpx.TransportError as e:
+                logger.warning(f"Klines request for {symbol} {interval} failed: {e}")
+                await asyncio.sleep(2 ** attempt)
+                continue
+
+            self._budget.update(response.headers)
+            if response.status_code in (418, 429):
+                retry_after = float(response.headers.get('Retry-After', 2 ** attempt))
+                logger.warning(f"Throttled by the exchange, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                await asyncio.sleep(2 ** attempt)
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise RuntimeError(f"Giving up on {symbol} {interval} klines from {start} after {self.max_retries} attempts")
+
+def _timestamp_ms(date: str) -> int:
+    return int(datetime.strptime(date, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+def main():
+    parser = argparse.ArgumentParser(description="Download historical klines into data/klines")
+    parser.add_argument('symbols', nargs='+', help="e.g. BTCUSDT TRXUSDT")
+    parser.add_argument('--intervals', nargs='+', default=['1m'])
+    parser.add_argument('--start', required=True, help="YYYY-MM-DD (UTC)")
+    parser.add_argument('--end', help="YYYY-MM-DD (UTC), now by default")
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    downloader = KlineDownloader(max_concurrency=args.concurrency)
+    written = asyncio.run(downloader.download(
+        args.symbols, args.intervals, _timestamp_ms(args.start),
+        _timestamp_ms(args.end) if args.end else None
+    ))
+    for series, count in written.items():
+        print(f"{series}: {count} klines")
+
+# Run from src/: python -m data.kline_downloader BTCUSDT --start 2024-01-01
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'klines')
+
+# Column layout of the exchange's kline arrays, minus the unused last field
+COLUMNS = (
+    ('open_time', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+    ('close_time', np.int64),
+    ('quote_volume', np.float64),
+    ('trades', np.int64),
+    ('taker_buy_volume', np.float64),
+    ('taker_buy_quote_volume', np.float64),
+)
+
+INTERVAL_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+}
+
+def interval_ms(interval: str) -> int:
+    """Length of a kline interval such as '1m' or '4h' in milliseconds"""
+    match = re.fullmatch(r'(\d+)([smhdw])', interval)
+    if not match:
+        raise ValueError(f"Unsupported interval {interval}")
+    return int(match.group(1)) * INTERVAL_MS[match.group(2)]
+
+def rows_to_columns(rows: List[list]) -> Dict[str, np.ndarray]:
+    """Exchange kline rows (lists of strings and ints) to typed column arrays"""
+    table = np.array([row[:len(COLUMNS)] for row in rows], dtype=object).reshape(-1, len(COLUMNS))
+    return {name: table[:, i].astype(dtype) for i, (name, dtype) in enumerate(COLUMNS)}
+
+class KlineStore:
+    """
+    Klines on disk as one compressed .npz file of column arrays per
+    symbol, interval and calendar month (UTC):
+
+        <root>/<SYMBOL>/<interval>/<YYYY-MM>.npz
+
+    Loading is a few np.load calls and a concatenate per series, no
+    parsing. Writes merge into the month file by open_time, so
+    re-downloading a range is harmless.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    def _series_dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol.upper(), interval)
+
+    def _chunks(self, symbol: str, interval: str) -> List[str]:
+        directory = self._series_dir(symbol, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.npz'))
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, np.ndarray]:
+        with np.load(path) as chunk:
+            return {name: chunk[name] for name, _ in COLUMNS}
+
+    def write(self, symbol: str, interval: str, columns: Dict[str, np.ndarray]) -> int:
+        """
+        Merge klines into the store
+
+        Args:
+            columns: Column arrays as returned by rows_to_columns
+
+        Returns:
+            Number of klines written
+        """
+        open_time = columns['open_time']
+        if not len(open_time):
+            return 0
+        directory = self._series_dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        months = open_time.astype('datetime64[ms]').astype('datetime64[M]')
+        for month in np.unique(months):
+            selected = months == month
+            chunk = {name: columns[name][selected] for name, _ in COLUMNS}
+            path = os.path.join(directory, f"{month}.npz")
+            if os.path.exists(path):
+                existing = self._read(path)
+                chunk = {name: np.concatenate([existing[name], chunk[name]]) for name, _ in COLUMNS}
+            # Later rows win for a repeated open_time
+            _, last = np.unique(chunk['open_time'][::-1], return_index=True)
+            order = len(chunk['open_time']) - 1 - last
+            chunk = {name: values[order] for name, values in chunk.items()}
+
+            temporary = f"{path}.tmp"
+            with open(temporary, 'wb') as f:
+                np.savez_compressed(f, **chunk)
+            os.replace(temporary, path)
+        return len(open_time)
+
+    def last_open_time(self, symbol: str, interval: str) -> Optional[int]:
+        """open_time of the newest stored kline, None if there is none"""
+        chunks = self._chunks(symbol, interval)
+        if not chunks:
+            return None
+        with np.load(chunks[-1]) as chunk:
+            open_time = chunk['open_time']
+            return int(open_time[-1]) if len(open_time) else None
+
+    def load_columns(self, symbol: str, interval: str, start: Optional[int] = None,
+                     end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Column arrays for open_time in [start, end) (ms), sorted by time"""
+        chunks = self._chunks(symbol, interval)
+        if start is not None or end is not None:
+            first = _month(start) if start is not None else ''
+            last = _month(end - 1) if end is not None else '9999-99'
+            chunks = [path for path in chunks if first <= os.path.basename(path)[:7] <= last]
+
+        parts = [self._read(path) for path in chunks]
+        columns = {name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype)
+                   for name, dtype in COLUMNS}
+        if start is not None or end is not None:
+            open_time = columns['open_time']
+            lo = np.searchsorted(open_time, start) if start is not None else 0
+            hi = np.searchsorted(open_time, end) if end is not None else len(open_time)
+            columns = {name: values[lo:hi] for name, values in columns.items()}
+        return columns
+
+    def load(self, symbol: str, interval: str, start: Optional[int] = None, end: Optional[int] = None) -> pd.DataFrame:
+        """Stored klines as a DataFrame indexed by open time"""
+        frame = pd.DataFrame(self.load_columns(symbol, interval, start, end))
+        frame.index = pd.to_datetime(frame['open_time'], unit='ms', utc=True)
+        return frame
+
+def _month(timestamp_ms: int) -> str:
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m')
@@ -0,0 +1,220 @@
+import json
+import os
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data', 'ticks')
+
+TRADE_COLUMNS = (
+    ('time', '<i8'),
+    ('trade_id', '<i8'),
+    ('price', '<f8'),
+    ('quantity', '<f8'),
+    ('is_buyer_maker', '|b1'),
+)
+
+BAR_COLUMNS = (
+    ('time', '<i8'),  # Open time
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('close_time', '<i8'),
+)
+
+SCHEMAS = {
+    'trades': TRADE_COLUMNS,
+    'bars': BAR_COLUMNS,
+}
+
+# One index entry per this many rows
+INDEX_STRIDE = 4096
+
+class _Series:
+    """Paths and committed metadata of one series directory"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.index_path = os.path.join(directory, 'time.idx')
+
+    def column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def read_meta(self) -> dict:
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def write_meta(self, meta: dict) -> None:
+        temporary = f"{self.meta_path}.tmp"
+        with open(temporary, 'w') as f:
+            json.dump(meta, f)
+        os.replace(temporary, self.meta_path)
+
+class SeriesWriter:
+    """
+    Appends rows to one series: a raw little-endian file per column plus a
+    sparse time index holding the time of every INDEX_STRIDE-th row
+
+    Rows must come in time order. The row count in meta.json is only
+    advanced after every column has been written, so a crash mid-append
+    leaves bytes past the committed count that readers ignore and the next
+    writer truncates.
+    """
+
+    def __init__(self, directory: str, columns: Tuple[Tuple[str, str], ...]):
+        self.series = _Series(directory)
+        os.makedirs(directory, exist_ok=True)
+
+        if os.path.exists(self.series.meta_path):
+            meta = self.series.read_meta()
+            if [tuple(c) for c in meta['columns']] != [tuple(c) for c in columns]:
+                raise ValueError(f"{directory} holds a different schema: {meta['columns']}")
+        else:
+            meta = {'columns': [list(c) for c in columns], 'count': 0, 'last_time': None}
+            self.series.write_meta(meta)
+        self.columns = tuple((name, np.dtype(dtype)) for name, dtype in columns)
+        self.count = meta['count']
+        self.last_time = meta['last_time']
+
+        # Drop whatever an interrupted append left behind
+        for name, dtype in self.columns:
+            path = self.series.column_path(name)
+            with open(path, 'ab') as f:
+                f.truncate(self.count * dtype.itemsize)
+        with open(self.series.index_path, 'ab') as f:
+            f.truncate(-(-self.count // INDEX_STRIDE) * 8)
+
+    def append(self, columns: Dict[str, np.ndarray]) -> int:
+        """
+        Append rows given as one array per column
+
+        Returns:
+            Committed row count after the append
+        """
+        times = np.asarray(columns['time'], dtype=np.int64)
+        n = len(times)
+        if not n:
+            return self.count
+        if np.any(np.diff(times) < 0) or (self.last_time is not None and times[0] < self.last_time):
+            raise ValueError("Rows must be appended in time order")
+
+        for name, dtype in self.columns:
+            values = np.asarray(columns[name], dtype=dtype)
+            if len(values) != n:
+                raise ValueError(f"Column {name} has {len(values)} rows, expected {n}")
+            with open(self.series.column_path(name), 'ab') as f:
+                f.write(values.tobytes())
+
+        # Index entries for every stride boundary inside the new rows
+        first = -(-self.count // INDEX_STRIDE) * INDEX_STRIDE
+        boundaries = np.arange(first, self.count + n, INDEX_STRIDE) - self.count
+        if len(boundaries):
+            with open(self.series.index_path, 'ab') as f:
+                f.write(times[boundaries].tobytes())
+
+        self.count += n
+        self.last_time = int(times[-1])
+        self.series.write_meta({'columns': [[name, dtype.str] for name, dtype in self.columns],
+                                'count': self.count, 'last_time': self.last_time})
+        return self.count
+
+class SeriesReader:
+    """
+    Memory-mapped read access to one series
+
+    Slices are views into the mapped files: nothing is read until the
+    returned arrays are touched, and then only the pages touched.
+    """
+
+    def __init__(self, directory: str):
+        self.series = _Series(directory)
+        if not os.path.exists(self.series.meta_path):
+            raise FileNotFoundError(f"No series in {directory}")
+        self.count = 0
+        self.columns: Dict[str, np.ndarray] = {}
+        self._index = np.empty(0, dtype=np.int64)
+        self.refresh()
+
+    def refresh(self) -> int:
+        """Map rows committed since the reader was opened; returns the row count"""
+        meta = self.series.read_meta()
+        count = meta['count']
+        if count == self.count and self.columns:
+            return count
+        self.count = count
+        self.columns = {name: self._map(self.series.column_path(name), np.dtype(dtype), count)
+                        for name, dtype in meta['columns']}
+        self._index = self._map(self.series.index_path, np.dtype('<i8'), -(-count // INDEX_STRIDE))
+        return count
+
+    @staticmethod
+    def _map(path: str, dtype: np.dtype, count: int) -> np.ndarray:
+        if count == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(count,))
+
+    def __len__(self):
+        return self.count
+
+    def locate(self, timestamp: int, side: str = 'left') -> int:
+        """Row position of timestamp, as np.searchsorted on the time column"""
+        if not self.count:
+            return 0
+        # The sparse index narrows the search to one stride of the mapped column
+        block = max(int(np.searchsorted(self._index, timestamp, side)) - 1, 0)
+        lo = block * INDEX_STRIDE
+        hi = min(lo + 2 * INDEX_STRIDE, self.count)
+        return lo + int(np.searchsorted(self.columns['time'][lo:hi], timestamp, side))
+
+    def rows(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[int, int]:
+        """Row range [lo, hi) with time in [start, end)"""
+        lo = self.locate(start) if start is not None else 0
+        hi = self.locate(end) if end is not None else self.count
+        return lo, max(lo, hi)
+
+    def slice(self, start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy column views for time in [start, end)"""
+        lo, hi = self.rows(start, end)
+        return {name: values[lo:hi] for name, values in self.columns.items()}
+
+    def iter_chunks(self, start: Optional[int] = None, end: Optional[int] = None,
+                    chunk_rows: int = 1_000_000) -> Iterator[Dict[str, np.ndarray]]:
+        """Views over a time range in pieces, to walk a range larger than RAM"""
+        lo, hi = self.rows(start, end)
+        for offset in range(lo, hi, chunk_rows):
+            yield {name: values[offset:min(offset + chunk_rows, hi)] for name, values in self.columns.items()}
+
+class TickStore:
+    """
+    Append-only trade and bar series under data/ticks:
+
+        <root>/<SYMBOL>/trades/
+        <root>/<SYMBOL>/bars_<interval>/
+
+    Each holds a <column>.bin file per column, time.idx and meta.json.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT):
+        self.root = root
+
+    def _directory(self, symbol: str, kind: str, interval: Optional[str]) -> str:
+        if kind not in SCHEMAS:
+            raise ValueError(f"Unknown series kind {kind}, expected one of {tuple(SCHEMAS)}")
+        name = f"bars_{interval}" if kind == 'bars' else kind
+        return os.path.join(self.root, symbol.upper(), name)
+
+    def writer(self, symbol: str, kind: str = 'trades', interval: Optional[str] = None) -> SeriesWriter:
+        if kind == 'bars' and not interval:
+            raise ValueError("Bar series need an interval")
+        return SeriesWriter(self._directory(symbol, kind, interval), SCHEMAS[kind])
+
+    def reader(self, symbol: str, kind: str = 'trades', interval: Optional[str] = None) -> SeriesReader:
+        return SeriesReader(self._directory(symbol, kind, interval))
+
+    def slice(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None, kind: str = 'trades',
+              interval: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy column views of one series for time in [start, end)"""
+        return self.reader(symbol, kind, interval).slice(start, end)
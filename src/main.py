@@ -11,12 +11,17 @@ logger = setup_logger()
 async def main():
     config = load_config()
 
-    ws_manager = WebSocketManager("btcusdt@trade")
-    rest_api = RESTAPIManager(config["api_key"], config["secret_key"])
+    ws_managers = [WebSocketManager(f"{pair.lower()}@trade", base_url=config["stream_base_url"])
+                   for pair in config["trading_pairs"]]
+    rest_api = RESTAPIManager(config["api_key"], config["secret_key"], base_url=config["rest_base_url"])
     strategy = StrategyManager()
     risk = RiskManager(stop_loss=0.02, take_profit=0.05)
 
-    await ws_manager.connect()
+    await rest_api.start()
+    try:
+        await asyncio.gather(*(ws_manager.connect() for ws_manager in ws_managers))
+    finally:
+        await rest_api.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
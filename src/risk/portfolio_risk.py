@@ -0,0 +1,195 @@
+from typing import Dict, Iterable, Mapping, Optional
+
+import numpy as np
+
+HOLD = 0
+STOP_LOSS = 1
+TAKE_PROFIT = 2
+REASONS = np.array(['HOLD', 'STOP_LOSS', 'TAKE_PROFIT'])
+
+class PortfolioRiskManager:
+    """
+    Risk checks for every open position at once
+
+    Positions live in parallel numpy arrays (symbol index, direction,
+    quantity, entry, stop and take-profit levels), kept dense by moving the
+    last position into the slot of a closed one. A price update evaluates
+    stops, unrealized PnL, per-asset exposure and the drawdown limit for the
+    whole book in a handful of array operations instead of calling
+    RiskManager.manage_risk per position.
+    """
+
+    def __init__(self, stop_loss: float, take_profit: float, capital: float = 1.0,
+                 max_drawdown: Optional[float] = None, max_exposure: Optional[float] = None,
+                 capacity: int = 256):
+        """
+        Args:
+            stop_loss: Default stop distance as a fraction of the entry price
+            take_profit: Default take-profit distance as a fraction of the entry price
+            capital: Starting equity, the base of the drawdown
+            max_drawdown: Fraction of peak equity that may be lost before
+                everything should be closed
+            max_exposure: Largest absolute net notional allowed per asset
+            capacity: Initial array size, doubled as needed
+        """
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+        self.capital = capital
+        self.max_drawdown = max_drawdown
+        self.max_exposure = max_exposure
+
+        self.count = 0
+        self._symbol = np.zeros(capacity, dtype=np.int64)
+        self._direction = np.zeros(capacity)  # 1 long, -1 short
+        self._quantity = np.zeros(capacity)
+        self._entry = np.zeros(capacity)
+        self._stop = np.zeros(capacity)
+        self._target = np.zeros(capacity)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._slots: Dict[int, int] = {}
+        self._next_id = 1
+
+        self.symbols: Dict[str, int] = {}
+        self._prices = np.full(16, np.nan)
+
+        self.realized_pnl = 0.0
+        self.peak_equity = capital
+
+    def open_position(self, symbol: str, side: str, quantity: float, entry_price: float,
+                      stop_loss: Optional[float] = None, take_profit: Optional[float] = None) -> int:
+        """
+        Track a position; stop_loss/take_profit override the default
+        fractions for this position. Returns its id.
+        """
+        if side not in ('BUY', 'SELL'):
+            raise ValueError(f"Unknown side {side}")
+        if self.count == len(self._ids):
+            self._grow()
+
+        direction = 1.0 if side == 'BUY' else -1.0
+        stop_loss = self.stop_loss if stop_loss is None else stop_loss
+        take_profit = self.take_profit if take_profit is None else take_profit
+
+        slot = self.count
+        position_id = self._next_id
+        self._next_id += 1
+        self._symbol[slot] = self._symbol_index(symbol)
+        self._direction[slot] = direction
+        self._quantity[slot] = quantity
+        self._entry[slot] = entry_price
+        self._stop[slot] = entry_price * (1 - direction * stop_loss)
+        self._target[slot] = entry_price * (1 + direction * take_profit)
+        self._ids[slot] = position_id
+        self._slots[position_id] = slot
+        self.count += 1
+        return position_id
+
+    def close_position(self, position_id: int, exit_price: Optional[float] = None) -> float:
+        """
+        Stop tracking a position and book its PnL
+
+        Args:
+            exit_price: Fill price, the last known price by default
+
+        Returns:
+            Realized PnL of the position
+        """
+        slot = self._slots.pop(position_id)
+        if exit_price is None:
+            exit_price = self._prices[self._symbol[slot]]
+        pnl = float(self._direction[slot] * self._quantity[slot] * (exit_price - self._entry[slot]))
+        self.realized_pnl += pnl
+
+        last = self.count - 1
+        if slot != last:
+            for array in (self._symbol, self._direction, self._quantity, self._entry,
+                          self._stop, self._target, self._ids):
+                array[slot] = array[last]
+            self._slots[int(self._ids[slot])] = slot
+        self.count = last
+        return pnl
+
+    def close_positions(self, position_ids: Iterable[int]) -> float:
+        """Close several positions at their last prices; returns their total PnL"""
+        return sum(self.close_position(int(position_id)) for position_id in position_ids)
+
+    def update_prices(self, prices: Mapping[str, float]) -> dict:
+        """
+        Take new prices and evaluate the whole book
+
+        Args:
+            prices: Latest price per symbol; symbols not given keep their last price
+
+        Returns:
+            dict with
+                position_ids: ids in slot order
+                unrealized_pnl: per position, same order
+                exits: ids of positions whose stop or target was hit
+                reasons: 'STOP_LOSS' or 'TAKE_PROFIT' for each exit
+                exposure: net notional per symbol
+                exposure_breaches: symbols over max_exposure
+                equity, drawdown: portfolio level, drawdown from peak equity
+                drawdown_breach: True once max_drawdown is reached
+        """
+        for symbol, price in prices.items():
+            self._prices[self._symbol_index(symbol)] = price
+        return self.evaluate()
+
+    def evaluate(self) -> dict:
+        """Evaluate the book at the last known prices, see update_prices"""
+        n = self.count
+        symbol = self._symbol[:n]
+        direction = self._direction[:n]
+        quantity = self._quantity[:n]
+        price = self._prices[symbol]
+        priced = ~np.isnan(price)
+
+        signed_quantity = direction * quantity
+        unrealized = np.where(priced, signed_quantity * (price - self._entry[:n]), 0.0)
+
+        # Compare in the position's direction so longs and shorts share one test
+        with np.errstate(invalid='ignore'):
+            stopped = direction * (price - self._stop[:n]) <= 0
+            targeted = direction * (price - self._target[:n]) >= 0
+        reason = np.where(stopped, STOP_LOSS, np.where(targeted, TAKE_PROFIT, HOLD))
+        exiting = np.flatnonzero(reason != HOLD)
+
+        notional = np.where(priced, signed_quantity * price, 0.0)
+        net = np.bincount(symbol, weights=notional, minlength=len(self.symbols))
+        names = list(self.symbols)
+        exposure = dict(zip(names, net.tolist()))
+        breaches = []
+        if self.max_exposure is not None:
+            breaches = [names[i] for i in np.flatnonzero(np.abs(net) > self.max_exposure)]
+
+        equity = self.capital + self.realized_pnl + float(unrealized.sum())
+        self.peak_equity = max(self.peak_equity, equity)
+        drawdown = (self.peak_equity - equity) / self.peak_equity if self.peak_equity > 0 else 0.0
+
+        return {
+            'position_ids': self._ids[:n].copy(),
+            'unrealized_pnl': unrealized,
+            'exits': self._ids[exiting],
+            'reasons': REASONS[reason[exiting]],
+            'exposure': exposure,
+            'exposure_breaches': breaches,
+            'equity': equity,
+            'drawdown': drawdown,
+            'drawdown_breach': self.max_drawdown is not None and drawdown >= self.max_drawdown
+        }
+
+    def _symbol_index(self, symbol: str) -> int:
+        index = self.symbols.get(symbol)
+        if index is None:
+            index = self.symbols[symbol] = len(self.symbols)
+            if index == len(self._prices):
+                self._prices = np.concatenate([self._prices, np.full(index, np.nan)])
+        return index
+
+    def _grow(self) -> None:
+        size = 2 * len(self._ids)
+        for name in ('_symbol', '_direction', '_quantity', '_entry', '_stop', '_target', '_ids'):
+            array = getattr(self, name)
+            grown = np.zeros(size, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from simulation.mock_exchange import MockExchange
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+
+# Command and working directory of each bot, as they are run by hand
+TARGETS = {
+    'temp': (['-m', 'binance_trader.main'], os.path.join(ROOT, 'temp')),
+    'src': (['main.py'], os.path.join(ROOT, 'src')),
+}
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process in MiB, None if it cannot be read"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss / 2 ** 20
+        except psutil.Error:
+            pass
+    return None
+
+async def run_load(target: str, exchange: MockExchange, duration: float, sample_interval: float = 1.0,
+                   log_path: Optional[str] = None) -> dict:
+    """
+    Run one bot against a started MockExchange for duration seconds
+
+    The bot is pointed at the exchange through REST_BASE_URL,
+    STREAM_BASE_URL and TRADING_PAIRS. Every sample_interval its resident
+    memory and the frames sent to it since the previous sample are
+    recorded.
+
+    Returns:
+        Report with the exchange's stats, memory and throughput over time
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target {target}, expected one of {tuple(TARGETS)}")
+    args, cwd = TARGETS[target]
+    stream_base_url = exchange.stream_url if target == 'temp' else exchange.ws_url
+    env = dict(os.environ, REST_BASE_URL=exchange.rest_url, STREAM_BASE_URL=stream_base_url,
+               TRADING_PAIRS=','.join(exchange.markets), USE_TESTNET='false', TESTNET_API_KEY='mock',
+               TESTNET_API_SECRET='mock', TESTNET_SECRET_KEY='mock')
+
+    log = open(log_path, 'wb') if log_path else subprocess.DEVNULL
+    process = await asyncio.create_subprocess_exec(sys.executable, *args, cwd=cwd, env=env,
+                                                   stdout=log, stderr=log)
+    started = time.perf_counter()
+    memory: List[list] = []
+    throughput: List[list] = []
+    frames = exchange.frames_sent
+    try:
+        while time.perf_counter() - started < duration and process.returncode is None:
+            try:
+                await asyncio.wait_for(process.wait(), sample_interval)
+            except asyncio.TimeoutError:
+                pass
+            elapsed = time.perf_counter() - started
+            memory.append([round(elapsed, 3), rss_mb(process.pid)])
+            throughput.append([round(elapsed, 3), (exchange.frames_sent - frames) / sample_interval])
+            frames = exchange.frames_sent
+    finally:
+        if process.returncode is None:
+            process.send_signal(signal.SIGINT)
+            try:
+                await asyncio.wait_for(process.wait(), 10)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        if log_path:
+            log.close()
+
+    resident = [mb for _, mb in memory if mb is not None]
+    return {
+        'target': target,
+        'duration': time.perf_counter() - started,
+        'exit_code': process.returncode,
+        'symbols': len(exchange.markets),
+        'trade_rate': exchange.trade_rate,
+        'bar_ms': exchange.bar_ms,
+        'exchange': exchange.stats(),
+        'throughput': throughput,
+        'memory': {
+            'samples': memory,
+            'start_mb': resident[0] if resident else None,
+            'peak_mb': max(resident) if resident else None,
+            'end_mb': resident[-1] if resident else None,
+        },
+    }
+
+def summary(report: dict) -> str:
+    exchange = report['exchange']
+    latency = exchange['tick_to_order_ms']
+    memory = report['memory']
+    lines = [
+        f"{report['target']}: {report['symbols']} symbols x {report['trade_rate']:g} trades/s "
+        f"for {report['duration']:.1f}s (exit code {report['exit_code']})",
+        f"  frames sent     {exchange['frames_sent']} ({exchange['frames_per_second']:.0f}/s), "
+        f"{exchange['connections_opened']} connections, {exchange['disconnects']} injected disconnects, "
+        f"{exchange['slow_consumers']} dropped as slow",
+        f"  orders          {exchange['orders']}",
+    ]
+    if latency['count']:
+        lines.append(f"  tick-to-order   p50 {latency['p50']:.2f}ms  p90 {latency['p90']:.2f}ms  "
+                     f"p99 {latency['p99']:.2f}ms  max {latency['max']:.2f}ms")
+    if memory['peak_mb'] is not None:
+        lines.append(f"  memory          start {memory['start_mb']:.1f}MiB  peak {memory['peak_mb']:.1f}MiB  "
+                     f"end {memory['end_mb']:.1f}MiB")
+    return '\n'.join(lines)
+
+async def _main(args) -> dict:
+    exchange = MockExchange(args.symbols, args.trade_rate, args.bar_ms, args.rest_latency, args.stream_latency,
+                            args.disconnect_every)
+    async with exchange:
+        return await run_load(args.target, exchange, args.duration, args.sample_interval, args.log)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a bot against a local mock exchange")
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds to run")
+    parser.add_argument('--symbols', type=int, default=10)
+    parser.add_argument('--trade-rate', type=float, default=20.0, help="Trades per second per symbol")
+    parser.add_argument('--bar-ms', type=int, default=500, help="Real-time length of a bar")
+    parser.add_argument('--rest-latency', type=float, default=0.0, help="Seconds added to REST responses")
+    parser.add_argument('--stream-latency', type=float, default=0.0, help="Seconds added to stream frames")
+    parser.add_argument('--disconnect-every', type=float, help="Seconds between dropping every stream")
+    parser.add_argument('--sample-interval', type=float, default=1.0)
+    parser.add_argument('--log', help="File for the bot's output")
+    parser.add_argument('--output', help="Write the full report here as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    report = asyncio.run(_main(args))
+    print(summary(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+# Run from src/: python -m simulation.load_harness temp --symbols 20 --duration 120
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,736 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import math
+import random
+import time
+import uuid
+import zlib
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+from data.kline_store import interval_ms
+
+logger = logging.getLogger(__name__)
+
+class _Market:
+    """Random-walk price, current bar and resting orders of one symbol"""
+
+    def __init__(self, symbol: str, price: float, volatility: float, rng: random.Random):
+        self.symbol = symbol
+        self.price = price
+        self.volatility = volatility
+        self.rng = rng
+        self.trade_id = 0
+        self.update_id = 1
+        self.orders: List[dict] = []
+        self.bar: Optional[dict] = None
+        self.bar_closed_at: Optional[float] = None  # perf_counter when the last closed bar went out
+        self.traded_at: Optional[float] = None
+
+    def trade(self, now_ms: int) -> dict:
+        self.price *= math.exp(self.rng.gauss(0.0, self.volatility))
+        self.trade_id += 1
+        quantity = round(self.rng.expovariate(10.0) + 0.0001, 4)
+        bar = self.bar
+        if bar is not None:
+            bar['h'] = max(bar['h'], self.price)
+            bar['l'] = min(bar['l'], self.price)
+            bar['c'] = self.price
+            bar['v'] += quantity
+            bar['n'] += 1
+        return {'e': 'trade', 'E': now_ms, 's': self.symbol, 't': self.trade_id, 'p': f"{self.price:.8f}",
+                'q': f"{quantity:.8f}", 'T': now_ms, 'm': self.rng.random() < 0.5, 'M': True}
+
+    def open_bar(self, now_ms: int, length_ms: int) -> None:
+        self.bar = {'t': now_ms, 'T': now_ms + length_ms - 1, 'o': self.price, 'h': self.price,
+                    'l': self.price, 'c': self.price, 'v': 0.0, 'n': 0}
+
+    def kline(self, now_ms: int, interval: str, closed: bool) -> dict:
+        bar = self.bar
+        return {'e': 'kline', 'E': now_ms, 's': self.symbol, 'k': {
+            't': bar['t'], 'T': bar['T'], 's': self.symbol, 'i': interval, 'o': f"{bar['o']:.8f}",
+            'c': f"{bar['c']:.8f}", 'h': f"{bar['h']:.8f}", 'l': f"{bar['l']:.8f}", 'v': f"{bar['v']:.8f}",
+            'n': bar['n'], 'x': closed}}
+
+    def depth(self, now_ms: int, levels: int = 5) -> dict:
+        first = self.update_id
+        self.update_id += levels
+        tick = self.price * 1e-4
+        return {'e': 'depthUpdate', 'E': now_ms, 's': self.symbol, 'U': first, 'u': self.update_id - 1,
+                'b': [[f"{self.price - (i + 1) * tick:.8f}", f"{self.rng.random():.8f}"] for i in range(levels)],
+                'a': [[f"{self.price + (i + 1) * tick:.8f}", f"{self.rng.random():.8f}"] for i in range(levels)]}
+
+class _Connection:
+    """One client websocket with its own outbound queue and sender task"""
+
+    def __init__(self, ws: web.WebSocketResponse, combined: bool):
+        self.ws = ws
+        self.combined = combined
+        self.streams: Set[str] = set()
+        self.queue: deque = deque()  # (due, frame)
+        self.wakeup = asyncio.Event()
+        self.sender: Optional[asyncio.Task] = None
+
+class MockExchange:
+    """
+    Local stand-in for the spot REST API and market streams the bot uses
+
+    REST under /api/v3: ping, time, exchangeInfo, klines, depth, account,
+    order (new, query, cancel), openOrders, orderList/oco, orderList and
+    userDataStream. Streams: combined connections on /stream (?streams=
+    and SUBSCRIBE/UNSUBSCRIBE) and single ones on /ws/<stream>, carrying
+    <symbol>@trade, <symbol>@kline_<interval>, <symbol>@depth[@100ms] and
+    user data on /ws/<listenKey>.
+
+    Every symbol trades trade_rate times per second around a random walk.
+    Bars of any interval last bar_ms of real time, so strategies see
+    closed klines quickly. rest_latency and stream_latency delay every
+    response and frame, disconnect_every drops all stream connections
+    periodically, and a connection more than max_queue frames behind is
+    dropped as the exchange drops slow consumers.
+
+    Tick-to-order latency is the time from the last closed bar (or trade,
+    before any bar closed) of a symbol going out to an order for it
+    arriving.
+
+    Every symbol has a LOT_SIZE filter of STEP_SIZE and MIN_QTY, listed in
+    exchangeInfo and enforced on orders as the exchange does.
+    """
+
+    STEP_SIZE = 0.001
+    MIN_QTY = 0.001
+
+    def __init__(self, symbols: Union[int, Iterable[str]] = ('BTCUSDT',), trade_rate: float = 10.0,
+                 bar_ms: int = 1000, rest_latency: float = 0.0, stream_latency: float = 0.0,
+                 disconnect_every: Optional[float] = None, balances: Optional[Dict[str, float]] = None,
+                 volatility: float = 0.001, max_queue: int = 10000, tick_interval: float = 0.01,
+                 host: str = '127.0.0.1', port: int = 0, seed: int = 0):
+        """
+        Args:
+            symbols: Symbols to list, or how many synthetic ones (BTCUSDT,
+                S0001USDT, S0002USDT, ...)
+            trade_rate: Trades per second per symbol
+            bar_ms: Real-time length of every bar, whatever its interval
+            rest_latency: Seconds added before each REST response
+            stream_latency: Seconds added before each stream frame
+            disconnect_every: Seconds between dropping every stream connection
+            balances: Starting account balances, 10000 USDT by default
+            volatility: Standard deviation of each trade's log return
+            max_queue: Frames a connection may fall behind before it is dropped
+            tick_interval: Seconds between rounds of generated trades
+        """
+        if isinstance(symbols, int):
+            symbols = ['BTCUSDT'] + [f"S{i:04d}USDT" for i in range(1, symbols)]
+        rng = random.Random(seed)
+        self.markets = {symbol: _Market(symbol, 100.0 * (1 + i), volatility, random.Random(rng.random()))
+                        for i, symbol in enumerate(symbols)}
+        self.trade_rate = trade_rate
+        self.bar_ms = bar_ms
+        self.rest_latency = rest_latency
+        self.stream_latency = stream_latency
+        self.disconnect_every = disconnect_every
+        self.max_queue = max_queue
+        self.tick_interval = tick_interval
+        self.host = host
+        self.port = port
+
+        self.balances: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0.0])  # asset -> [free, locked]
+        for asset, amount in (balances or {'USDT': 10000.0}).items():
+            self.balances[asset][0] = amount
+        self.orders: Dict[int, dict] = {}
+        self.order_lists: Dict[int, List[int]] = {}
+        self.listen_keys: Set[str] = set()
+        self._order_ids = itertools.count(1)
+        self._order_list_ids = itertools.count(1)
+
+        self._connections: Set[_Connection] = set()
+        self._subscribers: Dict[str, Set[_Connection]] = defaultdict(set)
+        self._tasks: List[asyncio.Task] = []
+        self._runner: Optional[web.AppRunner] = None
+        self._weight_window = 0
+        self._weight_used = 0
+
+        self.started_at: Optional[float] = None
+        self.frames_sent = 0
+        self.connections_opened = 0
+        self.disconnects = 0
+        self.slow_consumers = 0
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.tick_to_order: List[float] = []
+
+    @property
+    def rest_url(self) -> str:
+        return f"http://{self.host}:{self.port}/api"
+
+    @property
+    def stream_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/stream"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    async def start(self) -> None:
+        app = web.Application(middlewares=[self._rest_middleware])
+        app.router.add_get('/stream', self._handle_stream)
+        app.router.add_get('/ws', self._handle_stream)
+        app.router.add_get('/ws/{stream}', self._handle_stream)
+        app.router.add_get('/api/v3/ping', self._ping)
+        app.router.add_get('/api/v3/time', self._time)
+        app.router.add_get('/api/v3/exchangeInfo', self._exchange_info)
+        app.router.add_get('/api/v3/klines', self._klines)
+        app.router.add_get('/api/v3/depth', self._depth)
+        app.router.add_get('/api/v3/account', self._account)
+        app.router.add_post('/api/v3/order', self._new_order)
+        app.router.add_get('/api/v3/order', self._query_order)
+        app.router.add_delete('/api/v3/order', self._cancel_order)
+        app.router.add_get('/api/v3/openOrders', self._open_orders)
+        app.router.add_post('/api/v3/orderList/oco', self._new_oco)
+        app.router.add_delete('/api/v3/orderList', self._cancel_order_list)
+        app.router.add_post('/api/v3/userDataStream', self._new_listen_key)
+        app.router.add_put('/api/v3/userDataStream', self._keepalive_listen_key)
+        app.router.add_delete('/api/v3/userDataStream', self._close_listen_key)
+
+        self._runner = web.AppRunner(app, handle_signals=False, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+        now_ms = int(time.time() * 1000)
+        for market in self.markets.values():
+            market.open_bar(now_ms, self.bar_ms)
+        self.started_at = time.perf_counter()
+        self._tasks.append(asyncio.create_task(self._generate()))
+        if self.disconnect_every:
+            self._tasks.append(asyncio.create_task(self._disconnect_periodically()))
+        logger.info(f"Mock exchange on {self.rest_url} and {self.stream_url} with {len(self.markets)} symbols")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for connection in list(self._connections):
+            await self._drop(connection)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> 'MockExchange':
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        latencies = np.asarray(self.tick_to_order) * 1000
+        return {
+            'elapsed': elapsed,
+            'frames_sent': self.frames_sent,
+            'frames_per_second': self.frames_sent / elapsed if elapsed else 0.0,
+            'connections_opened': self.connections_opened,
+            'open_connections': len(self._connections),
+            'disconnects': self.disconnects,
+            'slow_consumers': self.slow_consumers,
+            'requests': dict(self.requests),
+            'orders': len(self.orders),
+            'tick_to_order_ms': {
+                'count': len(latencies),
+                **({f"p{q}": float(np.percentile(latencies, q)) for q in (50, 90, 99)} if len(latencies) else {}),
+                **({'max': float(latencies.max())} if len(latencies) else {}),
+            },
+        }
+
+    # Market data
+
+    async def _generate(self) -> None:
+        loop = asyncio.get_running_loop()
+        carry = 0.0
+        last = loop.time()
+        next_depth = 0.0
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            now = loop.time()
+            carry += self.trade_rate * (now - last)
+            last = now
+            count, carry = int(carry), carry - int(carry)
+            now_ms = int(time.time() * 1000)
+            sent_at = time.perf_counter()
+            depth_due = now >= next_depth
+            if depth_due:
+                next_depth = now + 0.1
+
+            for symbol, market in self.markets.items():
+                stream = symbol.lower()
+                for _ in range(count):
+                    trade = market.trade(now_ms)
+                    self._emit(f"{stream}@trade", trade)
+                    if market.orders:
+                        self._match(market)
+                if count:
+                    market.traded_at = sent_at
+                closed = now_ms > market.bar['T']
+                if count or closed:
+                    for name in self._kline_streams(stream):
+                        self._emit(name, market.kline(now_ms, name.rsplit('_', 1)[1], closed))
+                if closed:
+                    market.bar_closed_at = sent_at
+                    market.open_bar(now_ms, self.bar_ms)
+                if depth_due:
+                    for name in (f"{stream}@depth", f"{stream}@depth@100ms"):
+                        if self._subscribers.get(name):
+                            self._emit(name, market.depth(now_ms))
+
+    def _kline_streams(self, stream: str) -> List[str]:
+        prefix = f"{stream}@kline_"
+        return [name for name, subscribers in self._subscribers.items() if subscribers and name.startswith(prefix)]
+
+    def _emit(self, stream: str, payload: dict) -> None:
+        subscribers = self._subscribers.get(stream)
+        if not subscribers:
+            return
+        raw = combined = None
+        due = time.monotonic() + self.stream_latency
+        for connection in list(subscribers):
+            if connection.combined:
+                if combined is None:
+                    combined = json.dumps({'stream': stream, 'data': payload})
+                frame = combined
+            else:
+                if raw is None:
+                    raw = json.dumps(payload)
+                frame = raw
+            if len(connection.queue) >= self.max_queue:
+                self.slow_consumers += 1
+                asyncio.ensure_future(self._drop(connection))
+                continue
+            connection.queue.append((due, frame))
+            connection.wakeup.set()
+
+    async def _send_loop(self, connection: _Connection) -> None:
+        queue = connection.queue
+        while True:
+            if not queue:
+                connection.wakeup.clear()
+                await connection.wakeup.wait()
+                continue
+            due, frame = queue[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            queue.popleft()
+            await connection.ws.send_str(frame)
+            self.frames_sent += 1
+
+    async def _handle_stream(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(autoping=True)
+        await ws.prepare(request)
+        connection = _Connection(ws, combined=request.path == '/stream')
+        self._connections.add(connection)
+        self.connections_opened += 1
+
+        initial = request.match_info.get('stream') or request.query.get('streams')
+        for stream in (initial.split('/') if initial else []):
+            self._subscribe(connection, stream)
+        connection.sender = asyncio.create_task(self._send_loop(connection))
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                await self._control(connection, message.data)
+        finally:
+            await self._drop(connection)
+        return ws
+
+    async def _control(self, connection: _Connection, text: str) -> None:
+        try:
+            request = json.loads(text)
+            method, request_id = request['method'], request.get('id')
+        except (ValueError, KeyError, TypeError):
+            await connection.ws.send_str(json.dumps({'error': {'code': 2, 'msg': 'Invalid request'}, 'id': None}))
+            return
+        result = None
+        if method == 'SUBSCRIBE':
+            for stream in request.get('params', []):
+                self._subscribe(connection, stream)
+        elif method == 'UNSUBSCRIBE':
+            for stream in request.get('params', []):
+                connection.streams.discard(stream)
+                self._subscribers[stream].discard(connection)
+        elif method == 'LIST_SUBSCRIPTIONS':
+            result = sorted(connection.streams)
+        else:
+            await connection.ws.send_str(json.dumps({'error': {'code': 2, 'msg': f"Invalid method {method}"},
+                                                     'id': request_id}))
+            return
+        connection.queue.append((0.0, json.dumps({'result': result, 'id': request_id})))
+        connection.wakeup.set()
+
+    def _subscribe(self, connection: _Connection, stream: str) -> None:
+        connection.streams.add(stream)
+        self._subscribers[stream].add(connection)
+
+    async def _drop(self, connection: _Connection) -> None:
+        if connection not in self._connections:
+            return
+        self._connections.discard(connection)
+        for stream in connection.streams:
+            self._subscribers[stream].discard(connection)
+        if connection.sender is not None and connection.sender is not asyncio.current_task():
+            connection.sender.cancel()
+        await connection.ws.close()
+
+    async def _disconnect_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.disconnect_every)
+            connections = list(self._connections)
+            self.disconnects += len(connections)
+            for connection in connections:
+                await self._drop(connection)
+
+    # REST
+
+    @web.middleware
+    async def _rest_middleware(self, request: web.Request, handler):
+        if not request.path.startswith('/api/'):
+            return await handler(request)
+        self.requests[f"{request.method} {request.path}"] += 1
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+        try:
+            response = await handler(request)
+        except _ApiError as e:
+            response = web.json_response({'code': e.code, 'msg': e.message}, status=400)
+        except KeyError as e:
+            response = web.json_response({'code': -1102, 'msg': f"Mandatory parameter {e} was not sent."},
+                                         status=400)
+        window = int(time.time() // 60)
+        if window != self._weight_window:
+            self._weight_window, self._weight_used = window, 0
+        self._weight_used += 1
+        response.headers['X-MBX-USED-WEIGHT-1M'] = str(self._weight_used)
+        return response
+
+    @staticmethod
+    async def _params(request: web.Request) -> dict:
+        params = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.post())
+        return params
+
+    async def _ping(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    async def _time(self, request: web.Request) -> web.Response:
+        return web.json_response({'serverTime': int(time.time() * 1000)})
+
+    async def _exchange_info(self, request: web.Request) -> web.Response:
+        return web.json_response({'timezone': 'UTC', 'serverTime': int(time.time() * 1000), 'symbols': [
+            {'symbol': symbol, 'status': 'TRADING', 'baseAsset': symbol[:-4], 'quoteAsset': symbol[-4:],
+             'orderTypes': ['LIMIT', 'LIMIT_MAKER', 'MARKET', 'STOP_LOSS_LIMIT'],
+             'filters': [{'filterType': 'LOT_SIZE', 'minQty': f"{self.MIN_QTY:.8f}", 'maxQty': '9000000.00000000',
+                          'stepSize': f"{self.STEP_SIZE:.8f}"}]}
+            for symbol in self.markets]})
+
+    async def _klines(self, request: web.Request) -> web.Response:
+        params = request.query
+        market = self._market(params.get('symbol'))
+        step = interval_ms(params.get('interval', '1m'))
+        limit = min(int(params.get('limit', 500)), 1000)
+        now = int(time.time() * 1000)
+        end = min(int(params.get('endTime', now)), now - now % step - 1)
+        start = int(params['startTime']) if 'startTime' in params else end - end % step - (limit - 1) * step
+        start += -start % step
+        open_times = np.arange(start, end + 1, step, dtype=np.int64)[:limit]
+        return web.json_response([_history_row(market, int(t), step) for t in open_times])
+
+    async def _depth(self, request: web.Request) -> web.Response:
+        market = self._market(request.query.get('symbol'))
+        limit = min(int(request.query.get('limit', 100)), 5000)
+        depth = market.depth(int(time.time() * 1000), levels=limit)
+        return web.json_response({'lastUpdateId': depth['u'], 'bids': depth['b'], 'asks': depth['a']})
+
+    async def _account(self, request: web.Request) -> web.Response:
+        return web.json_response({'makerCommission': 10, 'takerCommission': 10, 'canTrade': True,
+                                  'accountType': 'SPOT', 'updateTime': int(time.time() * 1000),
+                                  'balances': self._balances()})
+
+    async def _new_order(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        market = self._market(params.get('symbol'))
+        self._record_latency(market)
+        order = self._create_order(market, params['side'], params['type'], float(params['quantity']),
+                                   params.get('price'), params.get('stopPrice'))
+        self._place(market, order)
+        return web.json_response(self._order_response(order))
+
+    async def _query_order(self, request: web.Request) -> web.Response:
+        params = request.query
+        return web.json_response(self._order_response(self._order(params.get('symbol'), params.get('orderId'))))
+
+    async def _cancel_order(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        order = self._order(params.get('symbol'), params.get('orderId'))
+        if order['status'] not in ('NEW', 'PARTIALLY_FILLED'):
+            raise _ApiError(-2011, "Unknown order sent.")
+        self._finish(self.markets[order['symbol']], order, 'CANCELED')
+        return web.json_response(self._order_response(order))
+
+    async def _open_orders(self, request: web.Request) -> web.Response:
+        symbol = request.query.get('symbol')
+        return web.json_response([self._order_response(order) for order in self.orders.values()
+                                  if order['status'] == 'NEW' and symbol in (None, order['symbol'])])
+
+    async def _new_oco(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        market = self._market(params.get('symbol'))
+        self._record_latency(market)
+        quantity = float(params['quantity'])
+        list_id = next(self._order_list_ids)
+        legs = []
+        for prefix in ('above', 'below'):
+            # One reservation covers both legs; a fill takes it over from the other leg
+            order = self._create_order(market, params['side'], params[f"{prefix}Type"], quantity,
+                                       params.get(f"{prefix}Price"), params.get(f"{prefix}StopPrice"),
+                                       lock=not legs)
+            order['orderListId'] = list_id
+            legs.append(order)
+        legs[0]['sibling'], legs[1]['sibling'] = legs[1]['orderId'], legs[0]['orderId']
+        self.order_lists[list_id] = [order['orderId'] for order in legs]
+        for order in legs:
+            self._place(market, order)
+        return web.json_response({
+            'orderListId': list_id, 'contingencyType': 'OCO', 'listStatusType': 'EXEC_STARTED',
+            'listOrderStatus': 'EXECUTING', 'symbol': market.symbol,
+            'orders': [{'symbol': market.symbol, 'orderId': o['orderId']} for o in legs],
+            'orderReports': [self._order_response(o) for o in legs]})
+
+    async def _cancel_order_list(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        order_ids = self.order_lists.get(int(params.get('orderListId', -1)))
+        if not order_ids:
+            raise _ApiError(-2011, "Order list does not exist.")
+        market = self._market(params.get('symbol'))
+        for order_id in order_ids:
+            order = self.orders[order_id]
+            if order['status'] == 'NEW':
+                self._finish(market, order, 'CANCELED')
+        return web.json_response({'orderListId': int(params['orderListId']), 'listOrderStatus': 'ALL_DONE',
+                                  'orderReports': [self._order_response(self.orders[i]) for i in order_ids]})
+
+    async def _new_listen_key(self, request: web.Request) -> web.Response:
+        listen_key = uuid.uuid4().hex
+        self.listen_keys.add(listen_key)
+        return web.json_response({'listenKey': listen_key})
+
+    async def _keepalive_listen_key(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        if params.get('listenKey') not in self.listen_keys:
+            raise _ApiError(-1125, "This listenKey does not exist.")
+        return web.json_response({})
+
+    async def _close_listen_key(self, request: web.Request) -> web.Response:
+        params = await self._params(request)
+        self.listen_keys.discard(params.get('listenKey'))
+        return web.json_response({})
+
+    # Orders
+
+    def _market(self, symbol: Optional[str]) -> _Market:
+        market = self.markets.get(symbol)
+        if market is None:
+            raise _ApiError(-1121, "Invalid symbol.")
+        return market
+
+    def _order(self, symbol: Optional[str], order_id: Optional[str]) -> dict:
+        order = self.orders.get(int(order_id)) if order_id else None
+        if order is None or order['symbol'] != symbol:
+            raise _ApiError(-2013, "Order does not exist.")
+        return order
+
+    def _record_latency(self, market: _Market) -> None:
+        reference = market.bar_closed_at or market.traded_at
+        if reference is not None:
+            self.tick_to_order.append(time.perf_counter() - reference)
+
+    def _create_order(self, market: _Market, side: str, order_type: str, quantity: float, price: Optional[str],
+                      stop_price: Optional[str], lock: bool = True) -> dict:
+        if side not in ('BUY', 'SELL'):
+            raise _ApiError(-1102, f"Invalid side {side}.")
+        if order_type not in ('MARKET', 'LIMIT', 'LIMIT_MAKER', 'STOP_LOSS_LIMIT'):
+            raise _ApiError(-1116, "Invalid orderType.")
+        if quantity <= 0:
+            raise _ApiError(-1013, "Invalid quantity.")
+        steps = quantity / self.STEP_SIZE
+        if abs(steps - round(steps)) > 1e-6 or quantity < self.MIN_QTY:
+            raise _ApiError(-1013, "Filter failure: LOT_SIZE")
+        if order_type != 'MARKET' and price is None:
+            raise _ApiError(-1102, "Mandatory parameter 'price' was not sent.")
+        base, quote = market.symbol[:-4], market.symbol[-4:]
+        limit = float(price) if price is not None else None
+        reserve_asset, reserve = (quote, quantity * (limit or market.price)) if side == 'BUY' else (base, quantity)
+        if lock and self.balances[reserve_asset][0] < reserve - 1e-8:
+            raise _ApiError(-2010, "Account has insufficient balance for requested action.")
+        order = {'symbol': market.symbol, 'orderId': next(self._order_ids), 'orderListId': -1,
+                 'clientOrderId': uuid.uuid4().hex[:22], 'price': limit or 0.0, 'origQty': quantity,
+                 'executedQty': 0.0, 'cummulativeQuoteQty': 0.0, 'status': 'NEW', 'type': order_type,
+                 'side': side, 'stopPrice': float(stop_price) if stop_price else 0.0,
+                 'triggered': order_type != 'STOP_LOSS_LIMIT', 'sibling': None, 'fills': [],
+                 'transactTime': int(time.time() * 1000), 'locked': 0.0, 'reserve_asset': reserve_asset}
+        if lock and order_type != 'MARKET':
+            reserve = min(reserve, self.balances[reserve_asset][0])
+            self.balances[reserve_asset][0] -= reserve
+            self.balances[reserve_asset][1] += reserve
+            order['locked'] = reserve
+        self.orders[order['orderId']] = order
+        return order
+
+    def _place(self, market: _Market, order: dict) -> None:
+        self._report(order, 'NEW')
+        if order['type'] == 'MARKET':
+            self._fill(market, order, market.price)
+        elif order['type'] == 'LIMIT_MAKER' and self._crosses(order, market.price):
+            self._finish(market, order, 'EXPIRED')  # Would take liquidity
+        else:
+            market.orders.append(order)
+            self._match(market)
+
+    @staticmethod
+    def _crosses(order: dict, price: float) -> bool:
+        return price <= order['price'] if order['side'] == 'BUY' else price >= order['price']
+
+    def _match(self, market: _Market) -> None:
+        price = market.price
+        for order in list(market.orders):
+            if order['status'] != 'NEW':
+                continue
+            if not order['triggered']:
+                stop = order['stopPrice']
+                if (price >= stop) if order['side'] == 'BUY' else (price <= stop):
+                    order['triggered'] = True
+                else:
+                    continue
+            if self._crosses(order, price):
+                self._fill(market, order, order['price'] if order['type'] == 'LIMIT_MAKER' else price)
+
+    def _fill(self, market: _Market, order: dict, price: float) -> None:
+        base, quote = market.symbol[:-4], market.symbol[-4:]
+        quantity = order['origQty']
+        sibling = self.orders.get(order['sibling']) if order['sibling'] else None
+        if sibling is not None and sibling['status'] == 'NEW':
+            order['locked'], sibling['locked'] = order['locked'] + sibling['locked'], 0.0
+            self._finish(market, sibling, 'EXPIRED')
+        commission = price * quantity * 0.001
+        reserve_asset = order['reserve_asset']
+        self.balances[reserve_asset][1] -= order['locked']
+        self.balances[reserve_asset][0] += order['locked']
+        order['locked'] = 0.0
+        if order['side'] == 'BUY':
+            self.balances[quote][0] -= price * quantity + commission
+            self.balances[base][0] += quantity
+        else:
+            self.balances[base][0] -= quantity
+            self.balances[quote][0] += price * quantity - commission
+        order['executedQty'] = quantity
+        order['cummulativeQuoteQty'] = price * quantity
+        order['fills'].append({'price': f"{price:.8f}", 'qty': f"{quantity:.8f}",
+                               'commission': f"{commission:.8f}", 'commissionAsset': quote})
+        self._finish(market, order, 'FILLED', execution='TRADE', last=(price, quantity, commission))
+
+    def _finish(self, market: _Market, order: dict, status: str, execution: Optional[str] = None,
+                last: tuple = (0.0, 0.0, 0.0)) -> None:
+        order['status'] = status
+        if order['locked']:
+            asset = order['reserve_asset']
+            self.balances[asset][1] -= order['locked']
+            self.balances[asset][0] += order['locked']
+            order['locked'] = 0.0
+        if order in market.orders:
+            market.orders.remove(order)
+        self._report(order, execution or status, last)
+
+    def _report(self, order: dict, execution: str, last: tuple = (0.0, 0.0, 0.0)) -> None:
+        """Execution report and balance update on every user data stream"""
+        if not self.listen_keys:
+            return
+        now_ms = int(time.time() * 1000)
+        price, quantity, commission = last
+        report = {'e': 'executionReport', 'E': now_ms, 's': order['symbol'], 'c': order['clientOrderId'],
+                  'S': order['side'], 'o': order['type'], 'f': 'GTC', 'q': f"{order['origQty']:.8f}",
+                  'p': f"{order['price']:.8f}", 'P': f"{order['stopPrice']:.8f}", 'x': execution,
+                  'X': order['status'], 'r': 'NONE', 'i': order['orderId'], 'l': f"{quantity:.8f}",
+                  'z': f"{order['executedQty']:.8f}", 'L': f"{price:.8f}", 'n': f"{commission:.8f}",
+                  'N': order['symbol'][-4:] if commission else None, 'T': now_ms, 't': -1,
+                  'm': order['type'] == 'LIMIT_MAKER', 'g': order['orderListId'],
+                  'Z': f"{order['cummulativeQuoteQty']:.8f}"}
+        position = {'e': 'outboundAccountPosition', 'E': now_ms, 'u': now_ms, 'B': [
+            {'a': asset, 'f': f"{free:.8f}", 'l': f"{locked:.8f}"}
+            for asset, (free, locked) in self.balances.items()
+            if asset in (order['symbol'][:-4], order['symbol'][-4:])]}
+        for listen_key in self.listen_keys:
+            self._emit(listen_key, report)
+            if execution in ('NEW', 'TRADE', 'CANCELED', 'EXPIRED'):
+                self._emit(listen_key, position)
+
+    def _balances(self) -> List[dict]:
+        return [{'asset': asset, 'free': f"{free:.8f}", 'locked': f"{locked:.8f}"}
+                for asset, (free, locked) in sorted(self.balances.items())]
+
+    @staticmethod
+    def _order_response(order: dict) -> dict:
+        response = {key: order[key] for key in ('symbol', 'orderId', 'orderListId', 'clientOrderId',
+                                                'transactTime', 'status', 'type', 'side')}
+        for key in ('price', 'origQty', 'executedQty', 'cummulativeQuoteQty', 'stopPrice'):
+            response[key] = f"{order[key]:.8f}"
+        response['timeInForce'] = 'GTC'
+        response['fills'] = order['fills']
+        return response
+
+class _ApiError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+def _history_row(market: _Market, open_time: int, step: int) -> list:
+    """Deterministic kline for a past open time, shaped like the exchange's arrays"""
+    rng = random.Random(zlib.crc32(market.symbol.encode()) ^ open_time)
+    base = 100.0 * (1 + 0.05 * math.sin(open_time / (step * 500.0)))
+    prices = [base * math.exp(rng.gauss(0.0, 0.002)) for _ in range(4)]
+    volume = rng.expovariate(0.1)
+    return [open_time, f"{prices[0]:.8f}", f"{max(prices):.8f}", f"{min(prices):.8f}", f"{prices[-1]:.8f}",
+            f"{volume:.8f}", open_time + step - 1, f"{volume * base:.8f}", rng.randint(1, 500),
+            f"{volume / 2:.8f}", f"{volume * base / 2:.8f}", "0"]
+
+async def serve(exchange: MockExchange) -> None:
+    async with exchange:
+        while True:
+            await asyncio.sleep(3600)
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in exchange")
+    parser.add_argument('--symbols', type=int, default=1, help="Number of symbols listed")
+    parser.add_argument('--trade-rate', type=float, default=10.0, help="Trades per second per symbol")
+    parser.add_argument('--bar-ms', type=int, default=1000, help="Real-time length of a bar")
+    parser.add_argument('--rest-latency', type=float, default=0.0, help="Seconds added to REST responses")
+    parser.add_argument('--stream-latency', type=float, default=0.0, help="Seconds added to stream frames")
+    parser.add_argument('--disconnect-every', type=float, help="Seconds between dropping every stream")
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(MockExchange(args.symbols, args.trade_rate, args.bar_ms, args.rest_latency,
+                                   args.stream_latency, args.disconnect_every, port=args.port)))
+
+# Run from src/: python -m simulation.mock_exchange --symbols 50 --trade-rate 20
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import hashlib
+import itertools
+import json
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from strategies.strategy_manager import StrategyManager
+
+logger = logging.getLogger(__name__)
+
+# Set in each worker process by _attach_prices
+_worker_memory = None
+_worker_prices = None
+
+
+def ema_crossover_positions(prices, short_period=12, long_period=26):
+    """Positions of StrategyManager for the given EMA spans"""
+    return StrategyManager(short_period, long_period).evaluate_signals(prices)['positions']
+
+
+def _attach_prices(name, shape, dtype):
+    """Pool initializer: map the shared price array instead of unpickling a copy"""
+    global _worker_memory, _worker_prices
+    _worker_memory = shared_memory.SharedMemory(name=name)
+    _worker_prices = np.ndarray(shape, dtype=dtype, buffer=_worker_memory.buf)
+
+
+def _run_shared(evaluate, params, start, stop, fee_rate):
+    return _score(_worker_prices, evaluate, params, start, stop, fee_rate)
+
+
+def _score(prices, evaluate, params, start, stop, fee_rate):
+    window = prices[start:stop]
+    try:
+        positions = evaluate(window, **params)
+    except ValueError as e:
+        logger.debug(f"Skipping {params}: {e}")
+        return None
+
+    equity = StrategyManager.equity_curve(window, positions, fee_rate)
+    if not len(equity):
+        return None
+    peak = np.maximum.accumulate(equity)
+    return {
+        'pnl': float(equity[-1] - 1.0),
+        'max_drawdown': float(np.max(1.0 - equity / peak)),
+        'trades': int(np.count_nonzero(np.diff(positions, prepend=0.0)))
+    }
+
+
+class ParameterOptimizer:
+    """Grid search and walk-forward optimization of strategy parameters"""
+
+    def __init__(self, prices, evaluate=ema_crossover_positions, fee_rate: float = 0.001,
+                 max_workers: int = None, cache_dir: str = None):
+        """
+        Args:
+            prices: 1-D array of prices shared by every run
+            evaluate: Module-level function evaluate(prices, **params) returning
+                the position (0 = flat, 1 = long) after each bar, e.g.
+                ema_crossover_positions or ScalpingStrategy.history_positions.
+                It may raise ValueError to reject a parameter combination.
+            fee_rate: Fee per unit of traded notional
+            max_workers: Worker processes, defaults to the number of cores
+            cache_dir: Directory for cached results, disabled when None
+        """
+        self.prices = np.ascontiguousarray(prices, dtype=np.float64)
+        self.evaluate = evaluate
+        self.fee_rate = fee_rate
+        self.max_workers = max_workers or os.cpu_count()
+        self.cache_dir = cache_dir
+        self.dataset_hash = hashlib.sha256(self.prices.tobytes()).hexdigest()
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def grid_search(self, param_grid: dict, start: int = 0, stop: int = None) -> list:
+        """
+        Evaluate every combination of param_grid on prices[start:stop]
+
+        Returns:
+            List of {'params', 'pnl', 'max_drawdown', 'trades'}, best PnL first
+        """
+        stop = len(self.prices) if stop is None else stop
+        tasks = [(params, start, stop) for params in self._expand(param_grid)]
+        return self._rank(self._run(tasks))
+
+    def walk_forward(self, param_grid: dict, train_size: int, test_size: int, step: int = None) -> list:
+        """
+        Optimize on rolling train windows and score the winner on the
+        test window that follows each of them
+
+        Returns:
+            One dict per split with the 'train' and 'test' bounds, the
+            chosen 'params' and the 'train_result' and 'test_result'
+        """
+        step = step or test_size
+        splits = [
+            (start, start + train_size, start + train_size + test_size)
+            for start in range(0, len(self.prices) - train_size - test_size + 1, step)
+        ]
+        combos = self._expand(param_grid)
+
+        # Every train window of every split goes to the pool in one batch
+        train_tasks = [(params, start, mid) for start, mid, _ in splits for params in combos]
+        train_results = self._run(train_tasks)
+
+        chosen = []
+        for i, (start, mid, end) in enumerate(splits):
+            ranked = self._rank(train_results[i * len(combos):(i + 1) * len(combos)])
+            chosen.append(ranked[0] if ranked else None)
+
+        test_tasks = [(best['params'], mid, end) for best, (_, mid, end) in zip(chosen, splits) if best]
+        test_results = iter(self._run(test_tasks))
+
+        report = []
+        for best, (start, mid, end) in zip(chosen, splits):
+            if not best:
+                continue
+            test = next(test_results)
+            report.append({
+                'train': (start, mid),
+                'test': (mid, end),
+                'params': best['params'],
+                'train_result': best,
+                'test_result': test
+            })
+        return report
+
+    @staticmethod
+    def _expand(param_grid: dict) -> list:
+        keys = sorted(param_grid)
+        return [dict(zip(keys, values)) for values in itertools.product(*(param_grid[k] for k in keys))]
+
+    @staticmethod
+    def _rank(results: list) -> list:
+        return sorted((r for r in results if r is not None), key=lambda r: r['pnl'], reverse=True)
+
+    def _run(self, tasks: list) -> list:
+        """Score (params, start, stop) tasks, reusing cached results"""
+        results = [self._load_cached(*task) for task in tasks]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if pending:
+            if self.max_workers == 1:
+                scores = [
+                    _score(self.prices, self.evaluate, *tasks[i], self.fee_rate)
+                    for i in pending
+                ]
+            else:
+                scores = self._run_pool([tasks[i] for i in pending])
+
+            for i, score in zip(pending, scores):
+                params = tasks[i][0]
+                results[i] = {'params': params, **score} if score else None
+                self._store_cached(*tasks[i], results[i])
+
+        return [r if r and r.get('pnl') is not None else None for r in results]
+
+    def _run_pool(self, tasks: list) -> list:
+        memory = shared_memory.SharedMemory(create=True, size=max(self.prices.nbytes, 1))
+        shared = None
+        try:
+            shared = np.ndarray(self.prices.shape, dtype=self.prices.dtype, buffer=memory.buf)
+            shared[:] = self.prices
+
+            with ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_attach_prices,
+                initargs=(memory.name, self.prices.shape, self.prices.dtype.str)
+            ) as pool:
+                futures = [
+                    pool.submit(_run_shared, self.evaluate, params, start, stop, self.fee_rate)
+                    for params, start, stop in tasks
+                ]
+                return [future.result() for future in futures]
+        finally:
+            del shared
+            memory.close()
+            memory.unlink()
+
+    def _cache_path(self, params, start, stop):
+        if not self.cache_dir:
+            return None
+        key = json.dumps({
+            'dataset': self.dataset_hash,
+            'evaluate': f"{self.evaluate.__module__}.{self.evaluate.__qualname__}",
+            'params': params,
+            'window': [start, stop],
+            'fee_rate': self.fee_rate
+        }, sort_keys=True)
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _load_cached(self, params, start, stop):
+        path = self._cache_path(params, start, stop)
+        if not path or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            # Rejected combinations are cached as {'pnl': None}
+            return json.load(f)
+
+    def _store_cached(self, params, start, stop, result):
+        path = self._cache_path(params, start, stop)
+        if not path:
+            return
+        with open(path, "w") as f:
+            json.dump(result or {'params': params, 'pnl': None}, f)
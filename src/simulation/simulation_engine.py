@@ -4,9 +4,33 @@ class SimulationEngine:
     def __init__(self, strategy_manager):
         self.strategy_manager = strategy_manager
 
-    def run_backtest(self, data):
+    def run_backtest(self, data, streaming: bool = False):
+        """
+        Replay data bar by bar and collect the signal for each bar
+
+        Args:
+            data: Series of prices
+            streaming: Feed the strategy one price at a time through its
+                running state instead of re-evaluating the whole prefix.
+                Gives the same signals in O(n) instead of O(n^2), and also
+                accepts any 1-D array, e.g. a memory-mapped TickStore slice
+                that is paged in as it is read rather than loaded up front.
+        """
+        if streaming:
+            return self._run_streaming_backtest(data)
+
         signals = []
         for i in range(len(data)):
             signal = self.strategy_manager.evaluate_signal(data[:i+1])
             signals.append(signal)
         return signals
+
+    def _run_streaming_backtest(self, data):
+        self.strategy_manager.reset()
+        return [self.strategy_manager.update(price) for price in data]
+
+    def run_vectorized_backtest(self, data, fee_rate: float = 0.001, initial_capital: float = 1.0):
+        """Evaluate the whole history at once, see StrategyManager.evaluate_signals"""
+        return self.strategy_manager.evaluate_signals(
+            data, fee_rate=fee_rate, initial_capital=initial_capital
+        )
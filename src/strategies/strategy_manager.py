@@ -2,15 +2,103 @@ import pandas as pd
 import numpy as np
 
 class StrategyManager:
+    def __init__(self, short_period: int = 12, long_period: int = 26):
+        self.short_period = short_period
+        self.long_period = long_period
+        self.reset()
+
     def calculate_ema(self, prices, period):
         return prices.ewm(span=period, adjust=False).mean()
 
     def evaluate_signal(self, prices):
-        short_ema = self.calculate_ema(prices, period=12)
-        long_ema = self.calculate_ema(prices, period=26)
+        short_ema = self.calculate_ema(prices, period=self.short_period)
+        long_ema = self.calculate_ema(prices, period=self.long_period)
+
+        return self._signal(short_ema.iloc[-1], long_ema.iloc[-1])
+
+    def evaluate_signals(self, prices, fee_rate: float = 0.001, initial_capital: float = 1.0) -> dict:
+        """
+        Evaluate a whole price history in one vectorized pass
+
+        Signal i is the one evaluate_signal() returns for prices[:i+1]. The
+        strategy is long after a BUY and flat after a SELL; a position taken
+        at a bar's close earns the next bar's return, and fee_rate is charged
+        on every change of position.
+
+        Args:
+            prices: 1-D array of prices
+            fee_rate: Fee per unit of traded notional (0.001 = 0.1%)
+            initial_capital: Starting value of the equity curve
+
+        Returns:
+            dict with 'signals', 'positions' and 'equity' arrays and the
+            fee-adjusted 'pnl'
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        series = pd.Series(prices)
+        short_ema = self.calculate_ema(series, period=self.short_period).to_numpy()
+        long_ema = self.calculate_ema(series, period=self.long_period).to_numpy()
+
+        bullish = short_ema > long_ema
+        bearish = short_ema < long_ema
+        signals = np.full(len(prices), "HOLD", dtype="<U4")
+        signals[bullish] = "BUY"
+        signals[bearish] = "SELL"
+
+        # HOLD keeps whatever position the last BUY/SELL left us in
+        state = np.where(bullish, 1.0, np.where(bearish, 0.0, np.nan))
+        positions = pd.Series(state).ffill().fillna(0.0).to_numpy()
+
+        equity = self.equity_curve(prices, positions, fee_rate, initial_capital)
+
+        return {
+            'signals': signals,
+            'positions': positions,
+            'equity': equity,
+            'pnl': float(equity[-1] - initial_capital) if len(equity) else 0.0
+        }
+
+    @staticmethod
+    def equity_curve(prices, positions, fee_rate: float = 0.001, initial_capital: float = 1.0):
+        """
+        Equity of holding positions[i] (0 = flat, 1 = long) from the close
+        of bar i to the close of bar i+1, paying fee_rate on each change
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        positions = np.asarray(positions, dtype=np.float64)
+
+        returns = np.zeros(len(prices))
+        returns[1:] = np.diff(prices) / prices[:-1]
+        held = np.concatenate(([0.0], positions[:-1]))
+        turnover = np.abs(np.diff(positions, prepend=0.0))
+        return initial_capital * np.cumprod((1.0 + held * returns) * (1.0 - fee_rate * turnover))
+
+    def reset(self):
+        """Clear the running EMA state used by update()"""
+        self._short_ema = None
+        self._long_ema = None
+
+    def update(self, price: float) -> str:
+        """Feed one new price and return the signal for it in O(1)"""
+        self._short_ema = self._update_ema(self._short_ema, price, self.short_period)
+        self._long_ema = self._update_ema(self._long_ema, price, self.long_period)
+
+        return self._signal(self._short_ema, self._long_ema)
+
+    @staticmethod
+    def _update_ema(previous, price, period):
+        if previous is None:
+            return price
+        # Same arithmetic as pandas' ewm(span=period, adjust=False), so the
+        # running value matches calculate_ema() exactly
+        alpha = 1.0 / (1.0 + (period - 1) / 2.0)
+        old_weight = 1.0 - alpha
+        return (old_weight * previous + alpha * price) / (old_weight + alpha)
 
-        if short_ema.iloc[-1] > long_ema.iloc[-1]:
+    @staticmethod
+    def _signal(short_ema, long_ema):
+        if short_ema > long_ema:
             return "BUY"
-        elif short_ema.iloc[-1] < long_ema.iloc[-1]:
+        elif short_ema < long_ema:
             return "SELL"
         return "HOLD"
@@ -5,5 +5,10 @@ def load_config():
     load_dotenv()
     return {
         "api_key": os.getenv("TESTNET_API_KEY"),
-        "secret_key": os.getenv("TESTNET_SECRET_KEY")
+        "secret_key": os.getenv("TESTNET_SECRET_KEY"),
+        # Endpoints, e.g. a local MockExchange; the testnet's when unset
+        "rest_base_url": os.getenv("REST_BASE_URL"),
+        "stream_base_url": os.getenv("STREAM_BASE_URL"),
+        "trading_pairs": [pair.strip().upper() for pair in os.getenv("TRADING_PAIRS", "BTCUSDT").split(",")
+                          if pair.strip()]
     }
@@ -1,29 +1,69 @@
-from binance.client import Client
+from binance import AsyncClient
 from binance.enums import *
+import aiohttp
 import asyncio
 import logging
 from binance_trader.config import Config
 from .websocket_manager import WebSocketManager
-from .rate_limiter import RateLimiter
+from .stream_recorder import StreamRecorder
+from .rate_limiter import RateLimit, RateLimiter
+from .user_data_stream import AccountCache, UserDataStream, user_stream_url
+from ..latency import LatencyTracer, stamp
 
 logger = logging.getLogger(__name__)
 
 class BinanceClient:
+    """
+    Orders and account data over python-binance's AsyncClient, market data
+    over WebSocketManager
+
+    REST requests share one aiohttp session with a pool of up to
+    Config.REST_MAX_CONNECTIONS keep-alive connections, so they never block
+    the event loop: stream readers keep running and orders for several
+    symbols can be in flight at once. Construct it inside the running loop
+    with `await BinanceClient.create()`, which also checks connectivity.
+
+    After start_user_data_stream() balances are read from an AccountCache
+    kept current by the user data stream instead of being fetched.
+    """
+
     def __init__(self):
-        self.client = Client(
+        self.client = AsyncClient(
             Config.API_KEY,
             Config.API_SECRET,
-            testnet=Config.USE_TESTNET
+            testnet=Config.USE_TESTNET and not Config.REST_BASE_URL,
+            session_params={'connector': aiohttp.TCPConnector(limit=Config.REST_MAX_CONNECTIONS)}
         )
+        if Config.REST_BASE_URL:
+            self.client.API_URL = Config.REST_BASE_URL
         self.bm = None
         self.ws_connections = {}
+        self._trading_rules = {}
         self._setup_socket_manager()
 
+    @classmethod
+    async def create(cls) -> 'BinanceClient':
+        """Create a client and ping the exchange with it"""
+        self = cls()
+        try:
+            await self.client.ping()
+        except Exception:
+            await self.close_all_connections()
+            raise
+        return self
+
     def _setup_socket_manager(self):
         """Initialize WebSocket manager"""
-        self.ws_manager = WebSocketManager()
-        self.rate_limiter = RateLimiter(max_requests=1200, time_window=60)
-        self.rate_limiter.start()
+        self.recorder = StreamRecorder(Config.STREAM_RECORD_DIR) if Config.STREAM_RECORD_DIR else None
+        self.account = AccountCache()
+        self.user_data = UserDataStream(self, self.account, url=user_stream_url(Config.STREAM_BASE_URL))
+        self.tracer = LatencyTracer()
+        self.ws_manager = WebSocketManager(recorder=self.recorder, url=Config.STREAM_BASE_URL, tracer=self.tracer)
+        self.rate_limiter = RateLimiter(limits=[
+            RateLimit(1200, 60, header='X-MBX-USED-WEIGHT-1M'),
+            RateLimit(50, 10, kind='ORDERS', header='X-MBX-ORDER-COUNT-10S'),
+            RateLimit(160000, 86400, kind='ORDERS', header='X-MBX-ORDER-COUNT-1D'),
+        ])
 
     async def start_kline_socket(self, symbol: str, callback, interval: str = '1m'):
         """Start a WebSocket connection for kline/candlestick data"""
@@ -35,10 +75,40 @@ class BinanceClient:
             logger.error(f"Error starting kline socket: {e}")
             raise
 
+    async def start_trade_socket(self, symbol: str, callback):
+        """Start the raw trade stream for a symbol, e.g. to feed a BarAggregator"""
+        try:
+            await self.ws_manager.connect_socket(f"{symbol.lower()}@trade", callback)
+            logger.info(f"Started trade socket for {symbol}")
+        except Exception as e:
+            logger.error(f"Error starting trade socket: {e}")
+            raise
+
+    async def start_depth_socket(self, symbol: str, callback):
+        """Start the 100ms depth diff stream for a symbol"""
+        try:
+            await self.ws_manager.connect_socket(f"{symbol.lower()}@depth@100ms", callback)
+            logger.info(f"Started depth socket for {symbol}")
+        except Exception as e:
+            logger.error(f"Error starting depth socket: {e}")
+            raise
+
+    async def get_order_book(self, symbol: str, limit: int = 1000):
+        """Get a depth snapshot, as OrderBookManager expects it"""
+        try:
+            await self.rate_limiter.acquire(RateLimiter.weight_for('/api/v3/depth'))
+            book = await self.client.get_order_book(symbol=symbol, limit=limit)
+            self.rate_limiter.update_from_headers(self.client.response.headers)
+            return book
+        except Exception as e:
+            logger.error(f"Error getting order book: {e}")
+            raise
+
     async def place_order(self, symbol: str, side: str, order_type: str, quantity: float, price: float = None):
         """Place an order on Binance"""
         try:
-            await self.rate_limiter.acquire()
+            await self.rate_limiter.acquire(RateLimiter.weight_for('/api/v3/order'), orders=1)
+            stamp('rate_limit')
             params = {
                 'symbol': symbol,
                 'side': side,
@@ -48,7 +118,9 @@ class BinanceClient:
             if price and order_type != ORDER_TYPE_MARKET:
                 params['price'] = price
 
-            order = self.client.create_order(**params)
+            order = await self.client.create_order(**params)
+            stamp('rest')
+            self.rate_limiter.update_from_headers(self.client.response.headers)
             logger.info(f"Order placed: {order}")
             return order
         except Exception as e:
@@ -58,16 +130,81 @@ class BinanceClient:
     async def get_account_balance(self):
         """Get account balance for all assets"""
         try:
-            await self.rate_limiter.acquire()
-            return self.client.get_account()
+            await self.rate_limiter.acquire(RateLimiter.weight_for('/api/v3/account'))
+            account = await self.client.get_account()
+            self.rate_limiter.update_from_headers(self.client.response.headers)
+            return account
         except Exception as e:
             logger.error(f"Error getting account balance: {e}")
             raise
 
+    async def get_trading_rules(self, symbol: str) -> dict:
+        """
+        Base and quote asset and LOT_SIZE filter of a symbol; exchangeInfo
+        is fetched once for all symbols
+
+        Returns:
+            {'base_asset', 'quote_asset', 'step_size', 'min_qty'}
+        """
+        if not self._trading_rules:
+            try:
+                await self.rate_limiter.acquire(RateLimiter.weight_for('/api/v3/exchangeInfo'))
+                info = await self.client.get_exchange_info()
+                self.rate_limiter.update_from_headers(self.client.response.headers)
+            except Exception as e:
+                logger.error(f"Error getting exchange info: {e}")
+                raise
+            for symbol_info in info['symbols']:
+                lot_size = next((f for f in symbol_info.get('filters', []) if f['filterType'] == 'LOT_SIZE'), {})
+                self._trading_rules[symbol_info['symbol']] = {
+                    'base_asset': symbol_info['baseAsset'],
+                    'quote_asset': symbol_info['quoteAsset'],
+                    'step_size': float(lot_size.get('stepSize', 0)) or 1e-8,
+                    'min_qty': float(lot_size.get('minQty', 0)),
+                }
+        return self._trading_rules[symbol]
+
+    async def get_free_balance(self, asset: str) -> float:
+        """Free balance of asset, from the account cache while it is in sync"""
+        if self.account.synced:
+            return self.account.free(asset)
+        account = await self.get_account_balance()
+        return float(next((balance['free'] for balance in account['balances'] if balance['asset'] == asset), 0))
+
+    async def start_user_data_stream(self):
+        """Sync the account cache and keep it current; returns once it is in sync"""
+        try:
+            await self.user_data.start()
+            logger.info("Started user data stream")
+        except Exception as e:
+            logger.error(f"Error starting user data stream: {e}")
+            raise
+
+    async def get_listen_key(self) -> str:
+        await self.rate_limiter.acquire(RateLimiter.weight_for('/api/v3/userDataStream'))
+        listen_key = await self.client.stream_get_listen_key()
+        self.rate_limiter.update_from_headers(self.client.response.headers)
+        return listen_key
+
+    async def keepalive_listen_key(self, listen_key: str):
+        await self.rate_limiter.acquire(RateLimiter.weight_for('/api/v3/userDataStream'))
+        await self.client.stream_keepalive(listen_key)
+        self.rate_limiter.update_from_headers(self.client.response.headers)
+
+    async def close_listen_key(self, listen_key: str):
+        await self.rate_limiter.acquire(RateLimiter.weight_for('/api/v3/userDataStream'))
+        await self.client.stream_close(listen_key)
+        self.rate_limiter.update_from_headers(self.client.response.headers)
+
     async def close_all_connections(self):
-        """Close all WebSocket connections"""
+        """Close all WebSocket connections and the REST session"""
         try:
             await self.ws_manager.close()
+            await self.user_data.close()
+            await self.tracer.stop()
+            if self.recorder is not None:
+                self.recorder.close()
+            await self.client.close_connection()
             logger.info("Closed all WebSocket connections")
         except Exception as e:
             logger.error(f"Error closing WebSocket connections: {e}")
@@ -0,0 +1,132 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    import orjson
+    loads: Callable[[Union[str, bytes]], Any] = orjson.loads
+except ImportError:
+    try:
+        import ujson
+        loads = ujson.loads
+    except ImportError:
+        loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+class Kline:
+    __slots__ = ('symbol', 'interval', 'event_time', 'open_time', 'close_time',
+                 'open', 'high', 'low', 'close', 'volume', 'is_closed')
+
+    def __init__(self, symbol: str, interval: str, event_time: int, open_time: int, close_time: int,
+                 open: float, high: float, low: float, close: float, volume: float, is_closed: bool):
+        self.symbol = symbol
+        self.interval = interval
+        self.event_time = event_time
+        self.open_time = open_time
+        self.close_time = close_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.is_closed = is_closed
+
+    def __repr__(self):
+        return f"Kline({self.symbol} {self.interval} {self.open_time} c={self.close} closed={self.is_closed})"
+
+class Trade:
+    __slots__ = ('symbol', 'event_time', 'trade_id', 'price', 'quantity', 'trade_time', 'is_buyer_maker')
+
+    def __init__(self, symbol: str, event_time: int, trade_id: int, price: float, quantity: float,
+                 trade_time: int, is_buyer_maker: bool):
+        self.symbol = symbol
+        self.event_time = event_time
+        self.trade_id = trade_id
+        self.price = price
+        self.quantity = quantity
+        self.trade_time = trade_time
+        self.is_buyer_maker = is_buyer_maker
+
+    def __repr__(self):
+        return f"Trade({self.symbol} #{self.trade_id} {self.quantity}@{self.price})"
+
+class Ticker:
+    __slots__ = ('symbol', 'event_time', 'last_price', 'open', 'high', 'low', 'volume', 'quote_volume')
+
+    def __init__(self, symbol: str, event_time: int, last_price: float, open: float, high: float,
+                 low: float, volume: float, quote_volume: float):
+        self.symbol = symbol
+        self.event_time = event_time
+        self.last_price = last_price
+        self.open = open
+        self.high = high
+        self.low = low
+        self.volume = volume
+        self.quote_volume = quote_volume
+
+    def __repr__(self):
+        return f"Ticker({self.symbol} {self.last_price})"
+
+class DepthUpdate:
+    __slots__ = ('symbol', 'event_time', 'first_update_id', 'final_update_id', 'bids', 'asks')
+
+    def __init__(self, symbol: str, event_time: int, first_update_id: int, final_update_id: int,
+                 bids: List[Tuple[float, float]], asks: List[Tuple[float, float]]):
+        self.symbol = symbol
+        self.event_time = event_time
+        self.first_update_id = first_update_id
+        self.final_update_id = final_update_id
+        self.bids = bids
+        self.asks = asks
+
+    def __repr__(self):
+        return f"DepthUpdate({self.symbol} {self.first_update_id}-{self.final_update_id})"
+
+
+def _levels(levels: list) -> List[Tuple[float, float]]:
+    return [(float(price), float(quantity)) for price, quantity in levels]
+
+def _kline(payload: dict) -> Kline:
+    k = payload['k']
+    return Kline(k['s'], k['i'], payload['E'], k['t'], k['T'],
+                 float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v']), k['x'])
+
+def _trade(payload: dict) -> Trade:
+    return Trade(payload['s'], payload['E'], payload['t'], float(payload['p']), float(payload['q']),
+                 payload['T'], payload['m'])
+
+def _ticker(payload: dict) -> Ticker:
+    return Ticker(payload['s'], payload['E'], float(payload['c']), float(payload['o']), float(payload['h']),
+                  float(payload['l']), float(payload['v']), float(payload['q']))
+
+def _depth(payload: dict) -> DepthUpdate:
+    return DepthUpdate(payload['s'], payload['E'], payload['U'], payload['u'],
+                       _levels(payload['b']), _levels(payload['a']))
+
+DECODERS: Dict[str, Callable[[dict], Any]] = {
+    'kline': _kline,
+    'trade': _trade,
+    '24hrTicker': _ticker,
+    'depthUpdate': _depth,
+}
+
+STREAM_PREFIX = '{"stream":'
+
+def peek_stream(frame: Union[str, bytes]) -> Optional[str]:
+    """
+    Stream name of a combined-stream frame, read from its first bytes
+    without parsing the JSON. None when the frame is not a stream message.
+    """
+    if isinstance(frame, bytes):
+        frame = frame[:200].decode('utf-8', 'replace')
+    if not frame.startswith(STREAM_PREFIX):
+        return None
+    start = frame.find('"', len(STREAM_PREFIX)) + 1
+    end = frame.find('"', start)
+    return frame[start:end] if start > 0 and end > 0 else None
+
+def decode_payload(payload: dict) -> Any:
+    """Typed record for a stream payload, or the payload itself for unknown events"""
+    decoder = DECODERS.get(payload.get('e')) if isinstance(payload, dict) else None
+    return decoder(payload) if decoder else payload
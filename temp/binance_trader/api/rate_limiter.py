@@ -1,74 +1,186 @@
 import asyncio
 import time
-from typing import Dict, Optional
+from collections import deque
+from typing import Deque, Dict, List, Mapping, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+class RateLimit:
+    """
+    One exchange limit: `limit` units per `interval` seconds
+
+    Binance counts usage in fixed windows aligned to the clock (the current
+    minute, the current 10 seconds, ...), so this is a token bucket that
+    refills in full at each window boundary. Everything is O(1).
+    """
+
+    def __init__(self, limit: int, interval: float, kind: str = 'REQUEST_WEIGHT', header: Optional[str] = None):
+        """
+        Args:
+            limit: Units allowed per window
+            interval: Window length in seconds
+            kind: What a request is charged: 'REQUEST_WEIGHT' (its weight),
+                'ORDERS' (the orders it places) or 'RAW_REQUESTS' (1)
+            header: Response header reporting the exchange's count for this
+                window, e.g. 'X-MBX-USED-WEIGHT-1M'
+        """
+        self.limit = limit
+        self.interval = interval
+        self.kind = kind
+        self.header = header
+        self.used = 0
+        self.window_start = 0.0
+
+    def cost(self, weight: int, orders: int) -> int:
+        if self.kind == 'ORDERS':
+            return orders
+        if self.kind == 'RAW_REQUESTS':
+            return 1
+        return weight
+
+    def _roll(self, now: float) -> None:
+        window_start = now - (now % self.interval)
+        if window_start != self.window_start:
+            self.window_start = window_start
+            self.used = 0
+
+    def available_at(self, cost: int, now: float) -> float:
+        """Earliest time `cost` more units fit in a window"""
+        self._roll(now)
+        if self.used + cost <= self.limit:
+            return now
+        return self.window_start + self.interval
+
+    def consume(self, cost: int, now: float) -> None:
+        self._roll(now)
+        self.used += cost
+
+
 class RateLimiter:
     """Rate limiter for Binance API requests"""
-    
-    def __init__(self, max_requests: int, time_window: float):
+
+    # Request weight of the REST endpoints the bot calls
+    ENDPOINT_WEIGHTS: Dict[str, int] = {
+        '/api/v3/order': 1,
+        '/api/v3/orderList/oco': 1,
+        '/api/v3/account': 20,
+        '/api/v3/klines': 2,
+        '/api/v3/depth': 50,  # limit=1000
+        '/api/v3/exchangeInfo': 20,
+        '/api/v3/userDataStream': 2,
+    }
+
+    def __init__(self, max_requests: int = 1200, time_window: float = 60, limits: Optional[List[RateLimit]] = None):
         """
         Initialize rate limiter
-        
+
         Args:
-            max_requests: Maximum number of requests allowed in the time window
+            max_requests: Maximum request weight allowed in the time window
             time_window: Time window in seconds
+            limits: Several limits to enforce together instead of the single
+                max_requests/time_window one
         """
-        self.max_requests = max_requests
-        self.time_window = time_window
-        self.requests: Dict[float, int] = {}
-        self._cleanup_task: Optional[asyncio.Task] = None
+        self.limits = limits or [RateLimit(max_requests, time_window)]
+        self._waiters: Deque[Tuple[asyncio.Future, int, int]] = deque()
+        self._timer: Optional[asyncio.TimerHandle] = None
 
-    async def acquire(self):
-        """
-        Acquire a rate limit slot. Blocks if rate limit is exceeded.
-        """
-        while True:
-            now = time.time()
-            # Remove old timestamps
-            cutoff = now - self.time_window
-            self.requests = {ts: count for ts, count in self.requests.items() if ts > cutoff}
-            
-            # Calculate current request count
-            current_requests = sum(self.requests.values())
-            
-            if current_requests < self.max_requests:
-                # Add new request
-                self.requests[now] = self.requests.get(now, 0) + 1
-                return
-            
-            # Wait before checking again
-            await asyncio.sleep(0.1)
-
-    async def cleanup(self):
+    @classmethod
+    def weight_for(cls, endpoint: str) -> int:
+        return cls.ENDPOINT_WEIGHTS.get(endpoint, 1)
+
+    async def acquire(self, weight: int = 1, orders: int = 0):
         """
-        Periodically cleanup old timestamps
+        Acquire capacity for one request. Blocks if a limit is exhausted;
+        waiters are served in arrival order, each woken exactly when the
+        window that blocks it rolls over.
+
+        Args:
+            weight: Request weight of the endpoint
+            orders: Number of orders the request places
         """
-        while True:
-            try:
-                now = time.time()
-                cutoff = now - self.time_window
-                self.requests = {ts: count for ts, count in self.requests.items() if ts > cutoff}
-                await asyncio.sleep(self.time_window / 2)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in rate limiter cleanup: {e}")
-                await asyncio.sleep(1)
+        for limit in self.limits:
+            if limit.cost(weight, orders) > limit.limit:
+                raise ValueError(f"Request cost exceeds limit of {limit.limit} per {limit.interval}s")
+
+        if not self._waiters and self._try_consume(weight, orders):
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((future, weight, orders))
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.done() or future.cancelled():
+                self._remove_waiter(future)
+            raise
 
-    def start(self):
-        """Start the cleanup task"""
-        if not self._cleanup_task:
-            self._cleanup_task = asyncio.create_task(self.cleanup())
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Take the exchange's own usage count for each limit that reports one"""
+        now = time.time()
+        lowered = {k.lower(): v for k, v in headers.items()}
+        for limit in self.limits:
+            if not limit.header:
+                continue
+            value = lowered.get(limit.header.lower())
+            if value is None:
+                continue
+            limit._roll(now)
+            limit.used = int(value)
+
+        # Usage may have been corrected downwards
+        if self._waiters:
+            self._cancel_timer()
+            self._wake()
 
     async def stop(self):
-        """Stop the cleanup task"""
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
-            self._cleanup_task = None
\ No newline at end of file
+        """Cancel the wake-up timer and fail anyone still waiting"""
+        self._cancel_timer()
+        while self._waiters:
+            future, _, _ = self._waiters.popleft()
+            if not future.done():
+                future.cancel()
+
+    def _try_consume(self, weight: int, orders: int) -> bool:
+        now = time.time()
+        for limit in self.limits:
+            if limit.available_at(limit.cost(weight, orders), now) > now:
+                return False
+        for limit in self.limits:
+            limit.consume(limit.cost(weight, orders), now)
+        return True
+
+    def _wake(self) -> None:
+        self._timer = None
+        while self._waiters:
+            future, weight, orders = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._try_consume(weight, orders):
+                break
+            self._waiters.popleft()
+            future.set_result(None)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        """Arm one timer for when the request at the head of the queue fits"""
+        if self._timer or not self._waiters:
+            return
+        _, weight, orders = self._waiters[0]
+        now = time.time()
+        ready = max(limit.available_at(limit.cost(weight, orders), now) for limit in self.limits)
+        self._timer = asyncio.get_running_loop().call_later(max(ready - now, 0), self._wake)
+
+    def _cancel_timer(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _remove_waiter(self, future: asyncio.Future) -> None:
+        was_head = bool(self._waiters) and self._waiters[0][0] is future
+        self._waiters = deque(w for w in self._waiters if w[0] is not future)
+        if was_head:
+            self._cancel_timer()
+            self._wake()
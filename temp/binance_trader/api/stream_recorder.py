@@ -0,0 +1,296 @@
+import asyncio
+import gzip
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Receive time (ns since the epoch), text frame flag, source length, frame length
+_HEADER = struct.Struct('<q?HI')
+_SEGMENT_PREFIX = 'frames-'
+_SEGMENT_SUFFIX = '.gz'
+
+Frame = Union[str, bytes]
+
+def segment_paths(directory: str) -> List[str]:
+    """Segment files of a recording, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.startswith(_SEGMENT_PREFIX) and name.endswith(_SEGMENT_SUFFIX))
+
+def read_frames(directory: str, sources: Optional[set] = None) -> Iterator[Tuple[int, str, Frame]]:
+    """
+    Recorded frames as (receive time ns, source, frame), in recording order
+
+    A segment cut short by a crash ends at its last complete frame.
+    """
+    for path in segment_paths(directory):
+        with gzip.open(path, 'rb') as f:
+            try:
+                while True:
+                    header = f.read(_HEADER.size)
+                    if len(header) < _HEADER.size:
+                        if header:
+                            logger.warning(f"{path} ends with a partial frame")
+                        break
+                    received, text, source_length, frame_length = _HEADER.unpack(header)
+                    body = f.read(source_length + frame_length)
+                    if len(body) < source_length + frame_length:
+                        logger.warning(f"{path} ends with a partial frame")
+                        break
+                    source = body[:source_length].decode()
+                    if sources is not None and source not in sources:
+                        continue
+                    frame = body[source_length:]
+                    yield received, source, frame.decode() if text else frame
+            except (EOFError, zlib.error) as e:
+                logger.warning(f"{path} is truncated: {e}")
+
+class StreamRecorder:
+    """
+    Append-only log of raw WebSocket frames with their receive times
+
+    record() only stamps the frame and queues it, so it is cheap enough for
+    a socket reader; a writer thread compresses frames into gzip segments
+    under directory, starting a new one every segment_bytes of raw frames:
+
+        <directory>/frames-000001.gz
+        <directory>/frames-000002.gz
+
+    Opening a recorder on an existing recording appends new segments. The
+    open segment is flushed every flush_interval seconds, so a crash loses
+    at most that much traffic.
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 64 * 1024 * 1024, compresslevel: int = 6,
+                 flush_interval: float = 1.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.compresslevel = compresslevel
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        existing = segment_paths(directory)
+        self._segment_number = int(os.path.basename(existing[-1])[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)]) \
+            if existing else 0
+        self._file = None
+        self._segment_size = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name='stream-recorder', daemon=True)
+        self._closed = False
+        self.recorded = 0
+        self.written_bytes = 0
+        self._writer.start()
+
+    def record(self, source: str, frame: Frame) -> None:
+        """Queue one frame received from source (a stream or connection name)"""
+        if self._closed:
+            return
+        self.recorded += 1
+        self._queue.put((time.time_ns(), source, frame))
+
+    def close(self) -> None:
+        """Write out every queued frame and close the open segment"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+
+    def _write_loop(self) -> None:
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._write(*item)
+                # Drain whatever else is already queued before flushing
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._close_segment()
+                        return
+                    self._write(*item)
+            if self._file is not None and time.monotonic() - last_flush >= self.flush_interval:
+                self._file.flush()
+                last_flush = time.monotonic()
+        self._close_segment()
+
+    def _write(self, received: int, source: str, frame: Frame) -> None:
+        text = isinstance(frame, str)
+        payload = frame.encode() if text else bytes(frame)
+        source_bytes = source.encode()
+        if self._file is None or self._segment_size >= self.segment_bytes:
+            self._open_segment()
+        record = _HEADER.pack(received, text, len(source_bytes), len(payload)) + source_bytes + payload
+        self._file.write(record)
+        self._segment_size += len(record)
+        self.written_bytes += len(record)
+
+    def _open_segment(self) -> None:
+        self._close_segment()
+        self._segment_number += 1
+        path = os.path.join(self.directory, f"{_SEGMENT_PREFIX}{self._segment_number:06d}{_SEGMENT_SUFFIX}")
+        self._file = gzip.open(path, 'wb', compresslevel=self.compresslevel)
+        self._segment_size = 0
+
+    def _close_segment(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class _ReplayClock:
+    """Maps recorded receive times onto the event loop clock at a given speed"""
+
+    def __init__(self, speed: Optional[float]):
+        if speed is not None and speed <= 0:
+            raise ValueError("speed must be positive, or None for as fast as possible")
+        self.speed = speed
+        self._origin: Optional[Tuple[int, float]] = None
+
+    async def wait(self, received: int) -> None:
+        if self.speed is None:
+            await asyncio.sleep(0)  # Let consumers keep up without slowing the replay down
+            return
+        loop = asyncio.get_running_loop()
+        if self._origin is None:
+            self._origin = (received, loop.time())
+        first, started = self._origin
+        delay = started + (received - first) / 1e9 / self.speed - loop.time()
+        await asyncio.sleep(max(delay, 0))
+
+class ReplaySocket:
+    """
+    Stand-in for a client websocket that receives recorded frames
+
+    Works both as `await connect(url)` and `async with connect(url)`.
+    Messages sent to it (SUBSCRIBE requests) are kept in `sent`. Once the
+    recording is exhausted recv() blocks until the reader is cancelled, as
+    a quiet live socket would.
+    """
+
+    def __init__(self, replayer: 'StreamReplayer', source: Optional[str]):
+        self.replayer = replayer
+        self.source = source
+        self.sent: List[str] = []
+        self.received = 0
+        self.exhausted = False
+        self.closed = False
+        self._frames = replayer.frames({source} if source is not None else set())
+
+    def __await__(self):
+        return self._opened().__await__()
+
+    async def _opened(self) -> 'ReplaySocket':
+        return self
+
+    async def __aenter__(self) -> 'ReplaySocket':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def recv(self) -> Frame:
+        for received, _, frame in self._frames:
+            await self.replayer.clock.wait(received)
+            self.received += 1
+            self.replayer.replayed += 1
+            return frame
+        if not self.exhausted:
+            self.exhausted = True
+            self.replayer._exhausted()
+        return await asyncio.get_running_loop().create_future()
+
+    async def send(self, message: str) -> None:
+        self.sent.append(message)
+
+    async def close(self) -> None:
+        self.closed = True
+
+class StreamReplayer:
+    """
+    Feeds a StreamRecorder log back through the code that consumed it live
+
+    Either call replay() with a handler such as a manager's feed(), or
+    hand connect() to a WebSocketManager in place of websockets.connect so
+    recorded frames come in through its socket reader, subscriptions and
+    event bus exactly as live traffic would. Frames keep their recorded
+    spacing divided by speed; speed=None replays as fast as possible.
+    The order of frames never depends on the speed.
+    """
+
+    def __init__(self, directory: str, speed: Optional[float] = 1.0):
+        if not segment_paths(directory):
+            raise FileNotFoundError(f"No recording in {directory}")
+        self.directory = directory
+        self.clock = _ReplayClock(speed)
+        self.replayed = 0
+        self.sockets: List[ReplaySocket] = []
+        self._claimed: set = set()
+        self._sources: Optional[List[str]] = None
+        self.finished = asyncio.Event()
+
+    def frames(self, sources: Optional[set] = None) -> Iterator[Tuple[int, str, Frame]]:
+        return read_frames(self.directory, sources)
+
+    @property
+    def sources(self) -> List[str]:
+        """Recorded sources in order of first appearance (reads the whole log once)"""
+        if self._sources is None:
+            seen = {}
+            for _, source, _ in self.frames():
+                seen.setdefault(source, None)
+            self._sources = list(seen)
+        return self._sources
+
+    async def replay(self, handler: Callable[[Frame], Any], sources: Optional[set] = None) -> int:
+        """
+        Call handler with every frame (awaiting it if it is a coroutine
+        function), paced by the clock
+
+        Returns:
+            Number of frames replayed
+        """
+        count = 0
+        for received, _, frame in self.frames(sources):
+            await self.clock.wait(received)
+            result = handler(frame)
+            if asyncio.iscoroutine(result):
+                await result
+            count += 1
+        self.replayed += count
+        self.finished.set()
+        return count
+
+    def connect(self, url: str, **kwargs) -> ReplaySocket:
+        """
+        websockets.connect replacement. A URL ending in a recorded source
+        (as single-stream /ws/<stream> URLs do) gets that source's frames;
+        other connections take the unclaimed sources in recorded order.
+        """
+        source = next((s for s in self.sources if url.endswith(s)), None)
+        if source is None:
+            source = next((s for s in self.sources if s not in self._claimed), None)
+        if source is not None:
+            self._claimed.add(source)
+        socket = ReplaySocket(self, source)
+        self.sockets.append(socket)
+        return socket
+
+    def _exhausted(self) -> None:
+        if all(s.exhausted for s in self.sockets) and self._claimed.issuperset(self.sources):
+            self.finished.set()
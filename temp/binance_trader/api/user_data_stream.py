@@ -0,0 +1,232 @@
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import websockets
+
+from .decoder import loads
+
+logger = logging.getLogger(__name__)
+
+# Order statuses after which an order is no longer open
+FINAL_STATUSES = ('FILLED', 'CANCELED', 'EXPIRED', 'REJECTED', 'EXPIRED_IN_MATCH')
+
+def user_stream_url(stream_url: Optional[str]) -> str:
+    """Raw stream base of an exchange whose combined streams are on stream_url"""
+    if not stream_url:
+        return UserDataStream.WEBSOCKET_BASE_URL
+    base = stream_url.rstrip('/')
+    if base.endswith('/stream'):
+        base = base[:-len('/stream')]
+    return f"{base}/ws"
+
+class AccountCache:
+    """
+    Local copy of the account's balances and open orders
+
+    Starts from a REST account snapshot and is then kept current by user
+    data stream events. Events arriving before the snapshot are buffered,
+    and only those newer than the snapshot's updateTime are applied on top
+    of it, as OrderBookManager does with depth diffs.
+
+    Balances change when the exchange reports them, shortly after a fill,
+    not when an order is sent.
+    """
+
+    def __init__(self, max_buffer: int = 10000):
+        self.max_buffer = max_buffer
+        self.balances: Dict[str, Tuple[float, float]] = {}  # asset -> (free, locked)
+        self.orders: Dict[int, dict] = {}  # orderId -> latest executionReport of open orders
+        self.update_time: Optional[int] = None
+        self.events = 0
+        self._buffer: List[dict] = []
+
+    @property
+    def synced(self) -> bool:
+        return self.update_time is not None
+
+    def free(self, asset: str) -> float:
+        return self.balances.get(asset, (0.0, 0.0))[0]
+
+    def locked(self, asset: str) -> float:
+        return self.balances.get(asset, (0.0, 0.0))[1]
+
+    def open_orders(self, symbol: Optional[str] = None) -> List[dict]:
+        return [order for order in self.orders.values() if symbol in (None, order['s'])]
+
+    def apply_snapshot(self, account: dict) -> None:
+        """Replace everything with a GET /api/v3/account response, then apply newer buffered events"""
+        self.balances = {balance['asset']: (float(balance['free']), float(balance['locked']))
+                         for balance in account['balances']}
+        snapshot_time = self.update_time = account.get('updateTime', 0)
+        buffer, self._buffer = self._buffer, []
+        for event in buffer:
+            if self._event_time(event) > snapshot_time:
+                self._apply(event)
+
+    def invalidate(self) -> None:
+        """Events were missed; buffer new ones until the next snapshot"""
+        self.update_time = None
+
+    def on_event(self, event: dict) -> None:
+        """User data stream callback"""
+        self.events += 1
+        if not self.synced:
+            self._buffer.append(event)
+            if len(self._buffer) > self.max_buffer:
+                del self._buffer[0]
+            return
+        self._apply(event)
+
+    @staticmethod
+    def _event_time(event: dict) -> int:
+        return event.get('u') or event.get('E', 0)
+
+    def _apply(self, event: dict) -> None:
+        event_type = event.get('e')
+        if event_type == 'outboundAccountPosition':
+            for balance in event['B']:
+                self.balances[balance['a']] = (float(balance['f']), float(balance['l']))
+        elif event_type == 'balanceUpdate':
+            free, locked = self.balances.get(event['a'], (0.0, 0.0))
+            self.balances[event['a']] = (free + float(event['d']), locked)
+        elif event_type == 'executionReport':
+            if event['X'] in FINAL_STATUSES:
+                self.orders.pop(event['i'], None)
+            else:
+                self.orders[event['i']] = event
+        else:
+            return
+        self.update_time = max(self.update_time, self._event_time(event))
+
+class UserDataStream:
+    """
+    Keeps an AccountCache current from the user data stream
+
+    A listen key is created over REST and its raw stream opened on
+    {url}/{listenKey}; the key is kept alive every KEEPALIVE_INTERVAL
+    seconds (the exchange expires it after an hour without). The account
+    snapshot is fetched only once the stream is open, so no event falls
+    between the two. When the connection drops or the key expires, the
+    cache is invalidated and everything is set up again.
+    """
+
+    WEBSOCKET_BASE_URL = "wss://stream.binance.com:9443/ws"
+    KEEPALIVE_INTERVAL = 30 * 60
+    MAX_RETRIES = 5
+
+    def __init__(self, client, cache: AccountCache, url: str = None, connect: Callable[[str], Any] = None):
+        """
+        Args:
+            client: BinanceClient, for the listen key and account requests
+            cache: Cache to keep current
+            url: Raw stream base URL, see user_stream_url
+            connect: Opens a websocket on a URL, websockets.connect by default
+        """
+        self.client = client
+        self.cache = cache
+        self.url = url or self.WEBSOCKET_BASE_URL
+        self._connect = connect or websockets.connect
+        self.listen_key: Optional[str] = None
+        self.websocket = None
+        self.reconnects = 0
+        self._running = False
+        self._reader: Optional[asyncio.Task] = None
+        self._keepalive: Optional[asyncio.Task] = None
+        self._restarting: Optional[asyncio.Task] = None
+        self._synced = asyncio.Event()
+
+    async def start(self) -> None:
+        """Open the stream and load the snapshot; returns once the cache is in sync"""
+        self._running = True
+        await self._open()
+        self._keepalive = asyncio.create_task(self._keep_alive())
+
+    async def wait_synced(self) -> None:
+        await self._synced.wait()
+
+    async def _open(self) -> None:
+        self.cache.invalidate()
+        self._synced.clear()
+        self.listen_key = await self.client.get_listen_key()
+        self.websocket = await self._connect(f"{self.url}/{self.listen_key}")
+        self._reader = asyncio.create_task(self._read(self.websocket))
+        self.cache.apply_snapshot(await self.client.get_account_balance())
+        self._synced.set()
+        logger.info(f"User data stream open, account cache synced at {self.cache.update_time}")
+
+    async def _read(self, websocket) -> None:
+        while True:
+            try:
+                event = loads(await websocket.recv())
+            except websockets.ConnectionClosed:
+                logger.warning("User data stream closed")
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading user data stream: {e}")
+                await asyncio.sleep(1)  # Prevent tight loop in case of repeated errors
+                continue
+            if event.get('e') == 'listenKeyExpired':
+                logger.warning("User data stream listen key expired")
+                break
+            self.cache.on_event(event)
+        self._schedule_restart()
+
+    def _schedule_restart(self) -> None:
+        if self._running and (self._restarting is None or self._restarting.done()):
+            self._restarting = asyncio.create_task(self._restart())
+
+    async def _restart(self) -> None:
+        """Set the stream up again with a fresh listen key and snapshot"""
+        self.cache.invalidate()
+        self._synced.clear()
+        retry_count = 0
+        while self._running and retry_count < self.MAX_RETRIES:
+            await self._close_socket()
+            try:
+                await self._open()
+                self.reconnects += 1
+                return
+            except Exception as e:
+                retry_count += 1
+                wait_time = min(1 * 2 ** retry_count, 30)
+                logger.warning(f"User data stream reconnection attempt {retry_count} failed: {e}")
+                await asyncio.sleep(wait_time)
+        if self._running:
+            logger.error(f"Failed to reopen the user data stream after {self.MAX_RETRIES} attempts")
+
+    async def _keep_alive(self) -> None:
+        while True:
+            await asyncio.sleep(self.KEEPALIVE_INTERVAL)
+            try:
+                await self.client.keepalive_listen_key(self.listen_key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"User data stream keepalive failed: {e}")
+                self._schedule_restart()
+
+    async def _close_socket(self) -> None:
+        if self._reader and self._reader is not asyncio.current_task():
+            self._reader.cancel()
+        if self.websocket is not None:
+            try:
+                await self.websocket.close()
+            except Exception as e:
+                logger.error(f"Error closing user data stream: {e}")
+            self.websocket = None
+
+    async def close(self) -> None:
+        self._running = False
+        for task in (self._keepalive, self._restarting):
+            if task:
+                task.cancel()
+        await self._close_socket()
+        if self.listen_key is not None:
+            try:
+                await self.client.close_listen_key(self.listen_key)
+            except Exception as e:
+                logger.error(f"Error closing listen key: {e}")
+            self.listen_key = None
@@ -2,119 +2,283 @@ import websockets
 import json
 import logging
 import asyncio
-from typing import Dict, Optional, Callable, Any
-from urllib.parse import urljoin
+import itertools
+import time
+from typing import Dict, List, Optional, Callable, Any, Iterable, Union
+from .decoder import decode_payload, loads, peek_stream
+from ..event_bus import EventBus, Subscription
+from ..latency import LatencyTracer, Trace
 
 logger = logging.getLogger(__name__)
 
+class _Connection:
+    """One combined-stream socket and the streams subscribed on it"""
+
+    def __init__(self, conn_id: int):
+        self.conn_id = conn_id
+        self.websocket = None
+        self.streams: set = set()
+        self.pending: List[tuple] = []  # (method, stream) not sent yet
+        self.reader: Optional[asyncio.Task] = None
+        self.flusher: Optional[asyncio.Task] = None
+        self.last_sent = 0.0
+
 class WebSocketManager:
-    """Manages WebSocket connections to Binance streams"""
-    
-    WEBSOCKET_BASE_URL = "wss://stream.binance.com:9443/ws/"
-    
-    def __init__(self):
-        self._connections: Dict[str, websockets.WebSocketClientProtocol] = {}
-        self._callbacks: Dict[str, Callable] = {}
+    """
+    Manages WebSocket connections to Binance streams
+
+    Streams are multiplexed over a few combined-stream connections, each
+    carrying up to MAX_STREAMS_PER_CONNECTION streams added and removed at
+    runtime with SUBSCRIBE/UNSUBSCRIBE. Messages arrive wrapped as
+    {"stream": ..., "data": ...}; the payload is decoded into a typed record
+    (see decoder.py) and published on the event bus under its stream name.
+    Each callback is one bus subscriber with its own bounded queue, so a
+    slow callback never stalls the socket readers.
+
+    A StreamRecorder passed as recorder gets every raw frame before it is
+    parsed; passing a StreamReplayer's connect as connect replays one.
+    With a LatencyTracer as tracer every event is timed from the moment its
+    frame was received (see latency.py).
+    """
+
+    WEBSOCKET_BASE_URL = "wss://stream.binance.com:9443/stream"
+    MAX_STREAMS_PER_CONNECTION = 1024
+    # Binance allows 5 incoming messages per second per connection
+    CONTROL_MESSAGE_INTERVAL = 0.25
+
+    def __init__(self, max_streams_per_connection: int = None, bus: EventBus = None, recorder=None,
+                 connect: Callable[[str], Any] = None, url: str = None, tracer: LatencyTracer = None):
+        if url:
+            self.WEBSOCKET_BASE_URL = url
+        self.max_streams_per_connection = max_streams_per_connection or self.MAX_STREAMS_PER_CONNECTION
+        self.bus = bus or EventBus()
+        self.recorder = recorder
+        self.tracer = tracer
+        self._connect = connect or websockets.connect
+        self._connections: Dict[int, _Connection] = {}
+        self._stream_connection: Dict[str, _Connection] = {}
+        self._stream_subscriptions: Dict[str, Subscription] = {}
+        self._callback_subscriptions: Dict[Callable, Subscription] = {}
+        self._request_ids = itertools.count(1)
+        self._connection_ids = itertools.count(1)
         self._running = False
         self._tasks = set()
+        self._lock = asyncio.Lock()
 
-    async def connect_socket(self, stream_name: str, callback: Callable[[dict], Any]) -> None:
+    async def connect_socket(self, stream_name: str, callback: Callable[[Any], Any], **queue_options) -> None:
         """
-        Connect to a Binance WebSocket stream
-        
+        Subscribe to a Binance WebSocket stream
+
         Args:
             stream_name: Name of the stream to connect to (e.g. "btcusdt@kline_1m")
             callback: Callback function to handle incoming messages
+            queue_options: maxsize/policy/key of the callback's bus queue,
+                see EventBus.subscribe
+        """
+        await self.subscribe([stream_name], callback, **queue_options)
+
+    async def subscribe(self, stream_names: Iterable[str], callback: Callable[[Any], Any], **queue_options) -> None:
         """
-        if stream_name in self._connections:
-            logger.warning(f"Stream {stream_name} already connected")
-            return
+        Subscribe to several streams. A callback already in use keeps its
+        queue and just receives the new streams too.
+        """
+        self._running = True
+        for stream_name in stream_names:
+            if stream_name in self._stream_subscriptions:
+                logger.warning(f"Stream {stream_name} already connected")
+                continue
+
+            async with self._lock:
+                connection = await self._connection_with_room()
+                connection.streams.add(stream_name)
 
-        self._callbacks[stream_name] = callback
-        uri = urljoin(self.WEBSOCKET_BASE_URL, stream_name)
-        
+            subscription = self._callback_subscriptions.get(callback)
+            if subscription is None:
+                subscription = self.bus.subscribe([stream_name], callback, **queue_options)
+                self._callback_subscriptions[callback] = subscription
+            else:
+                self.bus.add_topic(subscription, stream_name)
+            self._stream_subscriptions[stream_name] = subscription
+            self._stream_connection[stream_name] = connection
+            self._send_control(connection, "SUBSCRIBE", stream_name)
+
+    async def unsubscribe(self, stream_names: Iterable[str]) -> None:
+        """Stop receiving streams, closing connections left without any"""
+        for stream_name in stream_names:
+            subscription = self._stream_subscriptions.pop(stream_name, None)
+            if subscription is not None:
+                self.bus.remove_topic(subscription, stream_name)
+                if not subscription.topics:
+                    self._callback_subscriptions.pop(subscription.callback, None)
+                    await self.bus.unsubscribe(subscription)
+
+            connection = self._stream_connection.pop(stream_name, None)
+            if connection is None:
+                continue
+            connection.streams.discard(stream_name)
+            if connection.streams:
+                self._send_control(connection, "UNSUBSCRIBE", stream_name)
+            else:
+                await self._cleanup_connection(connection)
+
+    @property
+    def streams(self) -> List[str]:
+        return list(self._stream_subscriptions)
+
+    async def _connection_with_room(self) -> _Connection:
+        for connection in self._connections.values():
+            if len(connection.streams) < self.max_streams_per_connection:
+                return connection
+        return await self._open_connection()
+
+    async def _open_connection(self, connection: _Connection = None) -> _Connection:
+        connection = connection or _Connection(next(self._connection_ids))
         try:
-            ws = await websockets.connect(uri)
-            self._connections[stream_name] = ws
-            task = asyncio.create_task(self._handle_socket(stream_name, ws))
-            self._tasks.add(task)
-            task.add_done_callback(self._tasks.discard)
-            logger.info(f"Connected to stream: {stream_name}")
+            connection.websocket = await self._connect(self.WEBSOCKET_BASE_URL)
         except Exception as e:
-            logger.error(f"Failed to connect to {stream_name}: {e}")
+            logger.error(f"Failed to open stream connection {connection.conn_id}: {e}")
             raise
+        self._connections[connection.conn_id] = connection
+        connection.reader = self._create_task(self._handle_socket(connection))
+        logger.info(f"Opened stream connection {connection.conn_id}")
+        return connection
+
+    def _send_control(self, connection: _Connection, method: str, stream_name: str) -> None:
+        """Queue a (UN)SUBSCRIBE; queued streams go out together, paced per connection"""
+        connection.pending.append((method, stream_name))
+        if connection.flusher is None or connection.flusher.done():
+            connection.flusher = self._create_task(self._flush_control(connection))
+
+    async def _flush_control(self, connection: _Connection) -> None:
+        loop = asyncio.get_running_loop()
+        while connection.pending:
+            # Waiting here also lets every request made in the same burst
+            # join the next message
+            await asyncio.sleep(max(connection.last_sent + self.CONTROL_MESSAGE_INTERVAL - loop.time(), 0))
+
+            method = connection.pending[0][0]
+            count = next((i for i, (m, _) in enumerate(connection.pending) if m != method), len(connection.pending))
+            params = [stream for _, stream in connection.pending[:count]]
+            del connection.pending[:count]
+
+            request = {"method": method, "params": params, "id": next(self._request_ids)}
+            try:
+                await connection.websocket.send(json.dumps(request))
+            except Exception as e:
+                # The reader notices the broken socket and resubscribes everything
+                logger.error(f"Error sending {method} on connection {connection.conn_id}: {e}")
+                return
+            connection.last_sent = loop.time()
+            logger.info(f"{method} {len(params)} streams on connection {connection.conn_id}")
 
-    async def _handle_socket(self, stream_name: str, websocket: websockets.WebSocketClientProtocol) -> None:
+    async def _handle_socket(self, connection: _Connection) -> None:
         """Handle incoming messages from a WebSocket connection"""
+        source = f"connection-{connection.conn_id}"
+        while True:
+            try:
+                message = await connection.websocket.recv()
+                received = time.perf_counter_ns()
+                if self.recorder is not None:
+                    self.recorder.record(source, message)
+                await self.feed(message, connection.conn_id, received)
+            except websockets.ConnectionClosed:
+                logger.warning(f"Connection {connection.conn_id} closed")
+                if self._running and connection.streams:
+                    self._create_task(self._reconnect(connection))
+                break
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in connection {connection.conn_id}: {e}")
+                await asyncio.sleep(1)  # Prevent tight loop in case of repeated errors
+
+    async def feed(self, message: Union[str, bytes], conn_id: int = 0, received: Optional[int] = None) -> None:
+        """
+        Handle one raw combined-stream frame as if a socket had received it
+
+        Args:
+            message: The frame
+            conn_id: Connection it arrived on, for logging
+            received: time.perf_counter_ns() when it arrived, now if None
+        """
+        if received is None:
+            received = time.perf_counter_ns()
+        stream_name = peek_stream(message)
+        if stream_name is not None and stream_name not in self._stream_subscriptions:
+            return  # Still arriving after UNSUBSCRIBE, not worth parsing
+        data = loads(message)
+        stream_name = data.get("stream")
+        if stream_name is not None:
+            event = decode_payload(data["data"])
+            trace = None
+            if self.tracer is not None:
+                symbol = getattr(event, "symbol", None) or stream_name.split("@", 1)[0].upper()
+                trace = self.tracer.trace(symbol, received)
+            await self._process_message(stream_name, event, trace)
+        elif "error" in data:
+            logger.error(f"Stream request failed on connection {conn_id}: {data['error']}")
+
+    async def _process_message(self, stream_name: str, data: Any, trace: Optional[Trace] = None) -> None:
+        """Hand a decoded message to the bus; only waits on full 'block' queues"""
         try:
-            while True:
-                try:
-                    message = await websocket.recv()
-                    data = json.loads(message)
-                    await self._process_message(stream_name, data)
-                except websockets.ConnectionClosed:
-                    logger.warning(f"Connection closed for stream {stream_name}")
-                    await self._reconnect(stream_name)
-                    break
-                except Exception as e:
-                    logger.error(f"Error in socket {stream_name}: {e}")
-                    await asyncio.sleep(1)  # Prevent tight loop in case of repeated errors
-        finally:
-            await self._cleanup_connection(stream_name)
-
-    async def _process_message(self, stream_name: str, data: dict) -> None:
-        """Process incoming message and call appropriate callback"""
-        try:
-            callback = self._callbacks.get(stream_name)
-            if callback:
-                if asyncio.iscoroutinefunction(callback):
-                    await callback(data)
-                else:
-                    callback(data)
+            await self.bus.publish(stream_name, data, trace)
         except Exception as e:
             logger.error(f"Error processing message for {stream_name}: {e}")
 
-    async def _reconnect(self, stream_name: str) -> None:
-        """Attempt to reconnect to a stream after connection loss"""
-        await self._cleanup_connection(stream_name)
-        
+    async def _reconnect(self, connection: _Connection) -> None:
+        """Reopen a lost connection and subscribe its streams again"""
+        self._connections.pop(connection.conn_id, None)
+
         retry_count = 0
         max_retries = 5
-        
-        while retry_count < max_retries:
+
+        while retry_count < max_retries and self._running:
             try:
-                callback = self._callbacks.get(stream_name)
-                if callback:
-                    await self.connect_socket(stream_name, callback)
-                    logger.info(f"Successfully reconnected to {stream_name}")
-                    return
+                await self._open_connection(connection)
+                connection.pending = [("SUBSCRIBE", stream) for stream in sorted(connection.streams)]
+                connection.flusher = self._create_task(self._flush_control(connection))
+                logger.info(f"Successfully reconnected connection {connection.conn_id}")
+                return
             except Exception as e:
                 retry_count += 1
                 wait_time = min(1 * 2 ** retry_count, 30)  # Exponential backoff with 30s cap
-                logger.warning(f"Reconnection attempt {retry_count} failed for {stream_name}: {e}")
+                logger.warning(f"Reconnection attempt {retry_count} failed for connection {connection.conn_id}: {e}")
                 await asyncio.sleep(wait_time)
-        
-        logger.error(f"Failed to reconnect to {stream_name} after {max_retries} attempts")
 
-    async def _cleanup_connection(self, stream_name: str) -> None:
+        logger.error(f"Failed to reconnect connection {connection.conn_id} after {max_retries} attempts")
+
+    async def _cleanup_connection(self, connection: _Connection) -> None:
         """Clean up connection resources"""
-        if stream_name in self._connections:
-            try:
-                await self._connections[stream_name].close()
-            except Exception as e:
-                logger.error(f"Error closing connection for {stream_name}: {e}")
-            finally:
-                del self._connections[stream_name]
+        self._connections.pop(connection.conn_id, None)
+        for task in (connection.flusher, connection.reader):
+            if task and task is not asyncio.current_task():
+                task.cancel()
+        try:
+            if connection.websocket:
+                await connection.websocket.close()
+        except Exception as e:
+            logger.error(f"Error closing connection {connection.conn_id}: {e}")
+
+    def _create_task(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
 
     async def close(self) -> None:
         """Close all WebSocket connections"""
-        for stream_name in list(self._connections.keys()):
-            await self._cleanup_connection(stream_name)
-        
+        self._running = False
+        for connection in list(self._connections.values()):
+            await self._cleanup_connection(connection)
+        self._stream_subscriptions.clear()
+        self._callback_subscriptions.clear()
+        self._stream_connection.clear()
+        await self.bus.close()
+
         # Cancel all running tasks
         for task in self._tasks:
             task.cancel()
-        
+
         # Wait for all tasks to complete
         if self._tasks:
-            await asyncio.gather(*self._tasks, return_exceptions=True)
\ No newline at end of file
+            await asyncio.gather(*self._tasks, return_exceptions=True)
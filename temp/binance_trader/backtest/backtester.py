@@ -0,0 +1,435 @@
+import asyncio
+import itertools
+import logging
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from ..api.decoder import Kline, Trade
+from .matching_engine import (CANCELED, EXPIRED, LIMIT, LIMIT_MAKER, MARKET, NEW, REJECTED,
+                              STOP_LOSS_LIMIT, TERMINAL, TRADE, MatchingEngine, Order)
+
+logger = logging.getLogger(__name__)
+
+QUOTE_ASSETS = ('USDT', 'FDUSD', 'USDC', 'BUSD', 'TUSD', 'BTC', 'ETH', 'BNB', 'EUR', 'TRY')
+
+def split_symbol(symbol: str) -> Tuple[str, str]:
+    """('TRX', 'USDT') for 'TRXUSDT'"""
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    raise ValueError(f"Cannot tell the quote asset of {symbol}")
+
+class SimulatedOrderError(Exception):
+    """Raised where the exchange would answer an order request with an error"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+
+class SimulatedClient:
+    """
+    Stands in for BinanceClient inside a Backtester: same coroutine
+    methods, answering from the matching engine and a simulated account
+    """
+
+    def __init__(self, backtester: 'Backtester'):
+        self.backtester = backtester
+        self._order_ids = itertools.count(1)
+        self._order_list_ids = itertools.count(1)
+
+    async def start_kline_socket(self, symbol: str, callback, interval: str = '1m'):
+        self.backtester.subscribe(f"{symbol.lower()}@kline_{interval}", callback)
+
+    async def start_trade_socket(self, symbol: str, callback):
+        self.backtester.subscribe(f"{symbol.lower()}@trade", callback)
+
+    async def close_all_connections(self):
+        pass
+
+    async def get_account_balance(self):
+        account = self.backtester.account
+        assets = sorted(set(account.free) | set(account.locked))
+        return {
+            'balances': [{'asset': asset, 'free': f"{account.free[asset]:.8f}",
+                          'locked': f"{account.locked[asset]:.8f}"} for asset in assets]
+        }
+
+    async def get_free_balance(self, asset: str) -> float:
+        return self.backtester.account.free.get(asset, 0.0)
+
+    async def get_trading_rules(self, symbol: str) -> dict:
+        base, quote = split_symbol(symbol)
+        return {'base_asset': base, 'quote_asset': quote, 'step_size': self.backtester.step_size,
+                'min_qty': self.backtester.min_qty}
+
+    async def place_order(self, symbol: str, side: str, order_type: str, quantity: float, price: float = None,
+                          stop_price: float = None):
+        """
+        Place an order. MARKET orders return once filled (or expired), like
+        the exchange's FULL response; other types once accepted.
+        """
+        order = self._new_order(symbol, side, order_type, quantity, price, stop_price)
+        return await self.backtester._send(order, wait_until_done=order_type == MARKET)
+
+    async def place_oco_order(self, symbol: str, side: str, quantity: float, price: float, stop_price: float,
+                              stop_limit_price: float = None):
+        """
+        Place a take-profit LIMIT_MAKER and a STOP_LOSS_LIMIT as one OCO;
+        whichever trades first expires the other
+        """
+        limit_maker = self._new_order(symbol, side, LIMIT_MAKER, quantity, price)
+        stop = Order(next(self._order_ids), symbol, side, STOP_LOSS_LIMIT, float(quantity),
+                     float(stop_limit_price or stop_price), float(stop_price))
+        order_list_id = next(self._order_list_ids)
+        for leg, other in ((limit_maker, stop), (stop, limit_maker)):
+            leg.order_list_id = order_list_id
+            leg.sibling = other
+
+        # The list reserves its balance once, on the first leg
+        legs = await asyncio.gather(self.backtester._send(limit_maker), self.backtester._send(stop, lock=False),
+                                    return_exceptions=True)
+        errors = [leg for leg in legs if isinstance(leg, Exception)]
+        if errors:
+            raise errors[0]
+        return {'orderListId': order_list_id, 'symbol': symbol, 'listStatusType': 'EXEC_STARTED',
+                'orderReports': legs}
+
+    async def cancel_order(self, symbol: str, order_id: int):
+        order = self.backtester.engine.orders.get(order_id)
+        if order is None or order.symbol != symbol:
+            raise SimulatedOrderError(-2011, "Unknown order sent.")
+        if order.done:
+            raise SimulatedOrderError(-2011, "Unknown order sent.")
+        return await self.backtester._cancel(order)
+
+    async def get_order(self, symbol: str, order_id: int):
+        order = self.backtester.engine.orders.get(order_id)
+        if order is None or order.symbol != symbol:
+            raise SimulatedOrderError(-2013, "Order does not exist.")
+        return self.backtester.order_response(order)
+
+    def _new_order(self, symbol: str, side: str, order_type: str, quantity: float, price: Optional[float],
+                   stop_price: Optional[float] = None) -> Order:
+        if side not in ('BUY', 'SELL'):
+            raise SimulatedOrderError(-1102, f"Invalid side {side}.")
+        if order_type not in (MARKET, LIMIT, LIMIT_MAKER, STOP_LOSS_LIMIT):
+            raise SimulatedOrderError(-1116, f"Invalid orderType {order_type}.")
+        if not quantity or float(quantity) <= 0:
+            raise SimulatedOrderError(-1013, "Invalid quantity.")
+        steps = float(quantity) / self.backtester.step_size
+        if abs(steps - round(steps)) > 1e-6 or float(quantity) < self.backtester.min_qty:
+            raise SimulatedOrderError(-1013, "Filter failure: LOT_SIZE")
+        if order_type != MARKET and not price:
+            raise SimulatedOrderError(-1102, "Mandatory parameter 'price' was not sent.")
+        if order_type == STOP_LOSS_LIMIT and not stop_price:
+            raise SimulatedOrderError(-1102, "Mandatory parameter 'stopPrice' was not sent.")
+        return Order(next(self._order_ids), symbol, side, order_type, float(quantity),
+                     float(price) if price and order_type != MARKET else None,
+                     float(stop_price) if stop_price else None)
+
+class SimulatedAccount:
+    """Free and locked balance per asset"""
+
+    def __init__(self, balances: Optional[Dict[str, float]] = None):
+        self.free: Dict[str, float] = defaultdict(float, balances or {})
+        self.locked: Dict[str, float] = defaultdict(float)
+        self.commission: Dict[str, float] = defaultdict(float)
+
+    def lock(self, asset: str, amount: float) -> float:
+        """Reserve amount, allowing for the 8 decimals quantities are reported with; returns what was locked"""
+        if amount > self.free[asset] + 1e-8:
+            raise SimulatedOrderError(-2010, "Account has insufficient balance for requested action.")
+        amount = min(amount, self.free[asset])
+        self.free[asset] -= amount
+        self.locked[asset] += amount
+        return amount
+
+    def unlock(self, asset: str, amount: float) -> None:
+        self.locked[asset] -= amount
+        self.free[asset] += amount
+
+class Backtester:
+    """
+    Event-driven replay of trades and bars through a MatchingEngine
+
+    Recorded Trade and Kline records (or plain arrays, see run_trades and
+    run_bars) are published to whatever subscribed through the
+    SimulatedClient, so TradeManager and strategies run unchanged against
+    `backtester.client`. Each event goes to the matching engine first, so
+    an order placed in reaction to an event can only fill on later ones.
+
+    Callbacks run as tasks on the real event loop; after each event the
+    replay waits until every callback has finished or is waiting on an
+    order the simulated exchange has not answered yet, which keeps runs
+    deterministic whatever the callbacks await.
+    """
+
+    MAX_SETTLE_SPINS = 10000
+
+    def __init__(self, balances: Optional[Dict[str, float]] = None, maker_fee: float = 0.001,
+                 taker_fee: float = 0.001, latency: Union[float, Callable[[Order], float]] = 0,
+                 participation: float = 1.0, fill_at_touch: bool = False, step_size: float = 1e-8,
+                 min_qty: float = 0.0):
+        """
+        Args:
+            balances: Starting free balance per asset, e.g. {'USDT': 1000}
+            maker_fee: Commission rate on resting fills
+            taker_fee: Commission rate on aggressive fills
+            latency: Order and cancel latency in ms, or a function of the
+                order returning it, e.g. to draw from a distribution
+            participation: Share of each replayed print our orders may take
+            fill_at_touch: See MatchingEngine
+            step_size: LOT_SIZE filter of every symbol: order quantities
+                must be a multiple of step_size and at least min_qty
+            min_qty: See step_size
+        """
+        latency_model = latency if callable(latency) else (lambda order: latency)
+        self.engine = MatchingEngine(maker_fee, taker_fee, participation, fill_at_touch, latency_model,
+                                     on_execution=self._on_execution)
+        self.account = SimulatedAccount(balances)
+        self.step_size = step_size
+        self.min_qty = min_qty
+        self.client = SimulatedClient(self)
+        self.now = 0
+        self.events = 0
+        self.execution_listeners: List[Callable[..., None]] = []
+        self._subscribers: Dict[str, List[Callable]] = {}
+        self._tasks = set()
+        self._responses: Dict[int, Tuple[asyncio.Future, bool]] = {}
+        self._cancels: Dict[int, asyncio.Future] = {}
+
+    def subscribe(self, stream: str, callback: Callable[[Any], Any]) -> None:
+        self._subscribers.setdefault(stream, []).append(callback)
+
+    async def run(self, events: Iterable[Union[Trade, Kline]]) -> dict:
+        """
+        Replay time-ordered Trade and Kline records (merge several symbols
+        with heapq.merge on their time first)
+
+        Returns:
+            report()
+        """
+        engine = self.engine
+        subscribers = self._subscribers
+        for event in events:
+            self.events += 1
+            if isinstance(event, Trade):
+                self.now = event.trade_time
+                engine.on_trade(event.symbol, event.price, event.quantity, event.trade_time)
+                stream = f"{event.symbol.lower()}@trade"
+            elif isinstance(event, Kline):
+                self.now = event.close_time
+                engine.on_bar(event.symbol, event.open_time, event.close_time, event.open, event.high,
+                              event.low, event.close, event.volume)
+                stream = f"{event.symbol.lower()}@kline_{event.interval}"
+            else:
+                raise TypeError(f"Cannot replay {event!r}")
+            if stream in subscribers:
+                await self._publish(stream, event)
+        return await self.finish()
+
+    async def run_trades(self, symbol: str, times: Sequence[int], prices: Sequence[float],
+                         quantities: Sequence[float], is_buyer_maker: Sequence[bool] = None) -> dict:
+        """
+        Replay one symbol's trades given as columns, e.g. a TickStore slice.
+        Trade records are only built when something subscribed to them.
+        """
+        stream = f"{symbol.lower()}@trade"
+        on_trade = self.engine.on_trade
+        subscribed = stream in self._subscribers
+        makers = is_buyer_maker if is_buyer_maker is not None else itertools.repeat(False)
+        for trade_id, (time, price, quantity, maker) in enumerate(zip(
+                _as_list(times), _as_list(prices), _as_list(quantities), _as_list(makers))):
+            self.now = time
+            on_trade(symbol, price, quantity, time)
+            if subscribed:
+                await self._publish(stream, Trade(symbol, time, trade_id, price, quantity, time, maker))
+        self.events += len(times)
+        return await self.finish()
+
+    async def run_bars(self, symbol: str, interval: str, columns: Dict[str, Sequence]) -> dict:
+        """
+        Replay one symbol's bars given as columns ('time' or 'open_time',
+        'close_time', 'open', 'high', 'low', 'close', 'volume')
+        """
+        stream = f"{symbol.lower()}@kline_{interval}"
+        subscribed = stream in self._subscribers
+        on_bar = self.engine.on_bar
+        open_times = columns['open_time'] if 'open_time' in columns else columns['time']
+        rows = zip(*(_as_list(columns[name]) for name in ('close_time', 'open', 'high', 'low', 'close', 'volume')))
+        for open_time, (close_time, open_, high, low, close, volume) in zip(_as_list(open_times), rows):
+            self.now = close_time
+            on_bar(symbol, open_time, close_time, open_, high, low, close, volume)
+            if subscribed:
+                await self._publish(stream, Kline(symbol, interval, close_time, open_time, close_time,
+                                                  open_, high, low, close, volume, True))
+        self.events += len(open_times)
+        return await self.finish()
+
+    async def finish(self) -> dict:
+        """Let callbacks finish, expire everything still open and report"""
+        await self._settle()
+        self.engine.expire_all(self.now)
+        await self._settle()
+        return self.report()
+
+    def report(self) -> dict:
+        """Balances, fees and equity valued in each quote asset at the last prices"""
+        account = self.account
+        totals = {asset: account.free[asset] + account.locked[asset]
+                  for asset in set(account.free) | set(account.locked)}
+        equity: Dict[str, float] = defaultdict(float)
+        valued = set()
+        for symbol, book in self.engine.books.items():
+            base, quote = split_symbol(symbol)
+            if book.last_price is None or base in valued:
+                continue
+            equity[quote] += totals.get(base, 0.0) * book.last_price
+            valued.add(base)
+        for asset, amount in totals.items():
+            if asset not in valued:
+                equity[asset] += amount
+
+        orders = self.engine.orders.values()
+        return {
+            'events': self.events,
+            'prints': self.engine.prints,
+            'orders': len(self.engine.orders),
+            'filled_orders': sum(1 for order in orders if order.executed_qty > 0),
+            'fills': self.engine.trades,
+            'commission': dict(account.commission),
+            'balances': totals,
+            'equity': dict(equity)
+        }
+
+    def order_response(self, order: Order) -> dict:
+        """The order as the exchange's order endpoints describe it"""
+        _, quote = split_symbol(order.symbol)
+        response = {
+            'symbol': order.symbol,
+            'orderId': order.order_id,
+            'orderListId': order.order_list_id,
+            'clientOrderId': f"backtest-{order.order_id}",
+            'transactTime': order.active_at,
+            'price': f"{order.price or 0:.8f}",
+            'origQty': f"{order.quantity:.8f}",
+            'executedQty': f"{order.executed_qty:.8f}",
+            'cummulativeQuoteQty': f"{order.quote_qty:.8f}",
+            'status': order.status,
+            'timeInForce': 'GTC',
+            'type': order.type,
+            'side': order.side,
+            'fills': [{'price': f"{price:.8f}", 'qty': f"{qty:.8f}", 'commission': f"{commission:.8f}",
+                       'commissionAsset': quote} for price, qty, commission, _ in order.fills]
+        }
+        if order.stop_price is not None:
+            response['stopPrice'] = f"{order.stop_price:.8f}"
+        return response
+
+    async def _send(self, order: Order, wait_until_done: bool = False, lock: bool = True) -> dict:
+        base, quote = split_symbol(order.symbol)
+        if lock:
+            if order.is_buy:
+                price = order.price if order.price is not None else self.engine.last_price(order.symbol)
+                if price is None:
+                    raise SimulatedOrderError(-1013, f"No price for {order.symbol} yet.")
+                amount = order.quantity * price
+                if order.type == MARKET:
+                    # Nothing is reserved for market buys, but they must be affordable now
+                    if amount * (1 + self.engine.taker_fee) > self.account.free[quote] + 1e-9:
+                        raise SimulatedOrderError(-2010, "Account has insufficient balance for requested action.")
+                else:
+                    order.locked = self.account.lock(quote, amount)
+            else:
+                order.locked = self.account.lock(base, order.quantity)
+
+        future = asyncio.get_running_loop().create_future()
+        self._responses[order.order_id] = (future, wait_until_done)
+        self.engine.submit(order, self.now)
+        return await future
+
+    async def _cancel(self, order: Order) -> dict:
+        future = asyncio.get_running_loop().create_future()
+        self._cancels[order.order_id] = future
+        self.engine.cancel(order, self.now)
+        return await future
+
+    async def _publish(self, stream: str, event: Any) -> None:
+        for callback in self._subscribers[stream]:
+            result = callback(event)
+            if asyncio.iscoroutine(result):
+                self._tasks.add(asyncio.ensure_future(result))
+        if self._tasks:
+            await self._settle()
+
+    async def _settle(self) -> None:
+        """Run callbacks until each is done or blocked on the simulated exchange"""
+        for _ in range(self.MAX_SETTLE_SPINS):
+            for task in [task for task in self._tasks if task.done()]:
+                self._tasks.discard(task)
+                if not task.cancelled() and task.exception():
+                    logger.error(f"Error in backtest callback: {task.exception()}")
+            waiting = sum(1 for future, _ in self._responses.values() if not future.done()) + \
+                sum(1 for future in self._cancels.values() if not future.done())
+            if len(self._tasks) <= waiting:
+                # Orders and cancels already due reach the exchange without waiting for the next print
+                due = self.engine.next_activation
+                if due is None or due > self.now:
+                    return
+                self.engine.advance(self.now)
+            await asyncio.sleep(0)
+        logger.warning("Backtest callbacks kept running without waiting on the exchange")
+
+    def _on_execution(self, order: Order, execution_type: str, last_price: float, last_qty: float,
+                      commission: float, maker: bool, time: int) -> None:
+        base, quote = split_symbol(order.symbol)
+        account = self.account
+
+        if execution_type == TRADE:
+            if order.is_buy:
+                release = min(order.locked, last_qty * order.price) if order.locked else 0.0
+                account.locked[quote] -= release
+                order.locked -= release
+                account.free[quote] += release - last_price * last_qty - commission
+                account.free[base] += last_qty
+            else:
+                release = min(order.locked, last_qty)
+                account.locked[base] -= release
+                order.locked -= release
+                account.free[base] += release - last_qty
+                account.free[quote] += last_price * last_qty - commission
+            account.commission[quote] += commission
+        elif execution_type in (CANCELED, EXPIRED, REJECTED) and order.locked:
+            sibling = order.sibling
+            if sibling is not None and not sibling.done:
+                sibling.locked += order.locked  # The other OCO leg keeps the reservation
+            else:
+                account.unlock(quote if order.is_buy else base, order.locked)
+            order.locked = 0.0
+
+        for listener in self.execution_listeners:
+            listener(order, execution_type, last_price, last_qty, commission, maker, time)
+
+        pending = self._responses.get(order.order_id)
+        if pending is not None:
+            future, wait_until_done = pending
+            if future.done():
+                del self._responses[order.order_id]
+            elif execution_type == REJECTED:
+                future.set_exception(SimulatedOrderError(-2010, "Order would immediately match and take."))
+                del self._responses[order.order_id]
+            elif order.status in TERMINAL or (execution_type == NEW and not wait_until_done):
+                future.set_result(self.order_response(order))
+                del self._responses[order.order_id]
+
+        cancel = self._cancels.pop(order.order_id, None) if order.status in TERMINAL else None
+        if cancel is not None and not cancel.done():
+            if order.status == CANCELED:
+                cancel.set_result(self.order_response(order))
+            else:
+                cancel.set_exception(SimulatedOrderError(-2011, "Unknown order sent."))
+
+def _as_list(values) -> Iterable:
+    """Python scalars for numpy columns, which are much faster to loop over"""
+    return values.tolist() if hasattr(values, 'tolist') else values
@@ -0,0 +1,352 @@
+import heapq
+import itertools
+import logging
+from bisect import bisect_left, insort
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MARKET = 'MARKET'
+LIMIT = 'LIMIT'
+LIMIT_MAKER = 'LIMIT_MAKER'
+STOP_LOSS_LIMIT = 'STOP_LOSS_LIMIT'
+ORDER_TYPES = (MARKET, LIMIT, LIMIT_MAKER, STOP_LOSS_LIMIT)
+
+# Execution types, as in the exchange's executionReport
+NEW = 'NEW'
+TRADE = 'TRADE'
+CANCELED = 'CANCELED'
+EXPIRED = 'EXPIRED'
+REJECTED = 'REJECTED'
+
+PENDING_NEW = 'PENDING_NEW'
+PARTIALLY_FILLED = 'PARTIALLY_FILLED'
+FILLED = 'FILLED'
+TERMINAL = (FILLED, CANCELED, EXPIRED, REJECTED)
+
+class Order:
+    __slots__ = ('order_id', 'symbol', 'side', 'type', 'quantity', 'price', 'stop_price', 'status',
+                 'executed_qty', 'quote_qty', 'commission', 'fills', 'submitted_at', 'active_at',
+                 'updated_at', 'order_list_id', 'sibling', 'seq', 'locked', 'tag')
+
+    def __init__(self, order_id: int, symbol: str, side: str, order_type: str, quantity: float,
+                 price: Optional[float] = None, stop_price: Optional[float] = None):
+        self.order_id = order_id
+        self.symbol = symbol
+        self.side = side
+        self.type = order_type
+        self.quantity = quantity
+        self.price = price
+        self.stop_price = stop_price
+        self.status = PENDING_NEW
+        self.executed_qty = 0.0
+        self.quote_qty = 0.0
+        self.commission = 0.0
+        self.fills: List[Tuple[float, float, float, bool]] = []  # (price, qty, commission, maker)
+        self.submitted_at = 0
+        self.active_at = 0
+        self.updated_at = 0
+        self.order_list_id = -1
+        self.sibling: Optional['Order'] = None  # Other leg of an OCO
+        self.seq = 0
+        self.locked = 0.0  # Balance reserved for the order, managed by the account
+        self.tag = None
+
+    @property
+    def remaining(self) -> float:
+        return self.quantity - self.executed_qty
+
+    @property
+    def is_buy(self) -> bool:
+        return self.side == 'BUY'
+
+    @property
+    def done(self) -> bool:
+        return self.status in TERMINAL
+
+    @property
+    def average_price(self) -> float:
+        return self.quote_qty / self.executed_qty if self.executed_qty else 0.0
+
+    def __repr__(self):
+        return (f"Order(#{self.order_id} {self.symbol} {self.side} {self.type} "
+                f"{self.executed_qty}/{self.quantity} {self.status})")
+
+class _Book:
+    """
+    Resting orders of one symbol, each list sorted so that the orders a
+    print can reach form a prefix: key <= threshold
+    """
+
+    def __init__(self):
+        self.buys: List[tuple] = []  # (-limit, seq, order)
+        self.sells: List[tuple] = []  # (limit, seq, order)
+        self.buy_stops: List[tuple] = []  # (stop, seq, order)
+        self.sell_stops: List[tuple] = []  # (-stop, seq, order)
+        self.markets: List[Order] = []  # Active market orders, oldest first
+        self.last_price: Optional[float] = None
+
+class MatchingEngine:
+    """
+    Matches our own orders against replayed market prints
+
+    The replayed tape is taken as given: our orders never move the price,
+    they only consume the quantity printed, `participation` of it per print
+    at most, which is what produces partial fills. Market orders and
+    marketable limits fill at the print price as takers. A resting limit
+    fills as a maker at its own price once a print trades through it, or
+    at it with `fill_at_touch`, since our place in the queue is unknown.
+    Stop-limit orders turn into limits when a print reaches the stop.
+
+    Orders and cancels take effect `latency(order)` ms after they are sent,
+    at the first print at or after that time.
+    """
+
+    def __init__(self, maker_fee: float = 0.001, taker_fee: float = 0.001, participation: float = 1.0,
+                 fill_at_touch: bool = False, latency: Callable[[Order], float] = None,
+                 on_execution: Callable[..., None] = None):
+        """
+        Args:
+            maker_fee: Commission rate on resting fills, in the quote asset
+            taker_fee: Commission rate on aggressive fills, in the quote asset
+            participation: Share of each print's quantity our orders may take
+            fill_at_touch: Fill resting limits on prints at their price, not
+                only through it
+            latency: Milliseconds from sending an order or cancel until the
+                engine sees it, 0 by default
+            on_execution: Called as on_execution(order, execution_type,
+                last_price, last_qty, commission, maker, time) on every
+                state change of an order
+        """
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.participation = participation
+        self.fill_at_touch = fill_at_touch
+        self.latency = latency or (lambda order: 0)
+        self.on_execution = on_execution or (lambda *args: None)
+
+        self.books: Dict[str, _Book] = {}
+        self.orders: Dict[int, Order] = {}
+        self._inflight: List[tuple] = []  # Heap of (active_at, seq, action, order)
+        self._seq = itertools.count()
+        self.prints = 0
+        self.trades = 0
+
+    def book(self, symbol: str) -> _Book:
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = _Book()
+        return book
+
+    def last_price(self, symbol: str) -> Optional[float]:
+        book = self.books.get(symbol)
+        return book.last_price if book else None
+
+    def submit(self, order: Order, now: int) -> None:
+        """Send an order; it reaches the engine after the latency"""
+        if order.type not in ORDER_TYPES:
+            raise ValueError(f"Unsupported order type {order.type}")
+        order.seq = next(self._seq)
+        order.submitted_at = now
+        order.active_at = now + self.latency(order)
+        self.orders[order.order_id] = order
+        heapq.heappush(self._inflight, (order.active_at, order.seq, 'new', order))
+
+    def cancel(self, order: Order, now: int) -> None:
+        """Send a cancel; an order that fills before it arrives stays filled"""
+        heapq.heappush(self._inflight, (now + self.latency(order), next(self._seq), 'cancel', order))
+
+    @property
+    def next_activation(self) -> Optional[int]:
+        return self._inflight[0][0] if self._inflight else None
+
+    def on_trade(self, symbol: str, price: float, quantity: float, time: int) -> None:
+        """Replay one print"""
+        self.prints += 1
+        if self._inflight and self._inflight[0][0] <= time:
+            self._activate(time)
+
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.book(symbol)
+        book.last_price = price
+        # Fast path: nothing of ours can trade on this print
+        if not (book.markets or book.buys or book.sells or book.buy_stops or book.sell_stops):
+            return
+
+        if book.buy_stops and book.buy_stops[0][0] <= price:
+            self._trigger(book, book.buy_stops, price, time)
+        if book.sell_stops and book.sell_stops[0][0] <= -price:
+            self._trigger(book, book.sell_stops, -price, time)
+        available = quantity * self.participation
+        if book.markets:
+            available = self._fill_markets(book, price, available, time)
+
+        touch = self.fill_at_touch
+        buys = book.buys
+        while buys and available > 0 and (buys[0][0] < -price or (touch and buys[0][0] == -price)):
+            order = buys[0][2]
+            available = self._fill(order, -buys[0][0], available, True, time)
+            if order.done:
+                del buys[0]
+        sells = book.sells
+        while sells and available > 0 and (sells[0][0] < price or (touch and sells[0][0] == price)):
+            order = sells[0][2]
+            available = self._fill(order, sells[0][0], available, True, time)
+            if order.done:
+                del sells[0]
+
+    def on_bar(self, symbol: str, open_time: int, close_time: int, open: float, high: float, low: float,
+               close: float, volume: float) -> None:
+        """
+        Replay a bar as four prints, open, the nearer extreme, the other
+        extreme and close, each with a quarter of its volume
+        """
+        quarter = volume / 4
+        first, second = (high, low) if high - open <= open - low else (low, high)
+        span = close_time - open_time
+        self.on_trade(symbol, open, quarter, open_time)
+        self.on_trade(symbol, first, quarter, open_time + span // 3)
+        self.on_trade(symbol, second, quarter, open_time + 2 * span // 3)
+        self.on_trade(symbol, close, quarter, close_time)
+
+    def advance(self, time: int) -> None:
+        """Deliver orders and cancels due by time even without a print"""
+        if self._inflight and self._inflight[0][0] <= time:
+            self._activate(time)
+
+    def expire_all(self, time: int) -> None:
+        """End of replay: whatever is still open expires"""
+        self.advance(time)
+        for order in list(self.orders.values()):
+            if not order.done:
+                self._remove(order)
+                self._finish(order, EXPIRED, time)
+
+    def _activate(self, time: int) -> None:
+        inflight = self._inflight
+        while inflight and inflight[0][0] <= time:
+            active_at, _, action, order = heapq.heappop(inflight)
+            if action == 'cancel':
+                if not order.done:
+                    self._remove(order)
+                    self._finish(order, CANCELED, active_at)
+                continue
+            if order.done:  # An OCO leg expired before reaching the engine
+                continue
+            self._accept(order, active_at)
+
+    def _accept(self, order: Order, time: int) -> None:
+        book = self.book(order.symbol)
+        last = book.last_price
+        order.status = NEW
+        order.updated_at = time
+
+        if order.type == MARKET:
+            self.on_execution(order, NEW, 0.0, 0.0, 0.0, False, time)
+            book.markets.append(order)
+            return
+
+        if order.type == STOP_LOSS_LIMIT:
+            triggered = last is not None and (last >= order.stop_price if order.is_buy else last <= order.stop_price)
+            self.on_execution(order, NEW, 0.0, 0.0, 0.0, False, time)
+            if triggered:
+                self._rest_limit(book, order, time)
+            elif order.is_buy:
+                insort(book.buy_stops, (order.stop_price, order.seq, order))
+            else:
+                insort(book.sell_stops, (-order.stop_price, order.seq, order))
+            return
+
+        marketable = last is not None and (order.price >= last if order.is_buy else order.price <= last)
+        if order.type == LIMIT_MAKER and marketable:
+            self._finish(order, REJECTED, time)
+            return
+        self.on_execution(order, NEW, 0.0, 0.0, 0.0, False, time)
+        self._rest_limit(book, order, time)
+
+    def _rest_limit(self, book: _Book, order: Order, time: int) -> None:
+        """Enter a limit order, taking whatever the last print allows first"""
+        last = book.last_price
+        if last is not None and (order.price >= last if order.is_buy else order.price <= last):
+            # Marketable: takes liquidity at the last price, the rest waits for later prints
+            book.markets.append(order)
+        elif order.is_buy:
+            insort(book.buys, (-order.price, order.seq, order))
+        else:
+            insort(book.sells, (order.price, order.seq, order))
+
+    def _fill_markets(self, book: _Book, price: float, available: float, time: int) -> float:
+        markets = book.markets
+        while markets and available > 0:
+            order = markets[0]
+            if order.type != MARKET and (price > order.price if order.is_buy else price < order.price):
+                # A marketable limit the price moved away from goes back to rest
+                markets.pop(0)
+                if order.is_buy:
+                    insort(book.buys, (-order.price, order.seq, order))
+                else:
+                    insort(book.sells, (order.price, order.seq, order))
+                continue
+            available = self._fill(order, price, available, False, time)
+            if order.done:
+                markets.pop(0)
+        return available
+
+    def _trigger(self, book: _Book, stops: List[tuple], threshold: float, time: int) -> None:
+        end = 0
+        while end < len(stops) and stops[end][0] <= threshold:
+            end += 1
+        triggered = [order for _, _, order in stops[:end]]
+        del stops[:end]
+        for order in triggered:
+            self._rest_limit(book, order, time)
+
+    def _fill(self, order: Order, price: float, available: float, maker: bool, time: int) -> float:
+        quantity = min(order.remaining, available)
+        if quantity <= 0:
+            return available
+        if order.sibling is not None and not order.sibling.done:
+            # One leg of an OCO trading expires the other
+            self._remove(order.sibling)
+            self._finish(order.sibling, EXPIRED, time)
+
+        commission = price * quantity * (self.maker_fee if maker else self.taker_fee)
+        order.executed_qty += quantity
+        order.quote_qty += price * quantity
+        order.commission += commission
+        order.fills.append((price, quantity, commission, maker))
+        order.updated_at = time
+        if order.remaining <= 1e-12 * order.quantity:
+            order.executed_qty = order.quantity
+            order.status = FILLED
+        else:
+            order.status = PARTIALLY_FILLED
+        self.trades += 1
+        self.on_execution(order, TRADE, price, quantity, commission, maker, time)
+        return available - quantity
+
+    def _finish(self, order: Order, status: str, time: int) -> None:
+        order.status = status
+        order.updated_at = time
+        self.on_execution(order, status, 0.0, 0.0, 0.0, False, time)
+
+    def _remove(self, order: Order) -> None:
+        """Take an order out of whichever list it rests in"""
+        book = self.books.get(order.symbol)
+        if book is None:
+            return
+        if order in book.markets:
+            book.markets.remove(order)
+            return
+        candidates = (
+            (book.buys, (-order.price if order.price is not None else 0, order.seq, order)),
+            (book.sells, (order.price if order.price is not None else 0, order.seq, order)),
+            (book.buy_stops, (order.stop_price if order.stop_price is not None else 0, order.seq, order)),
+            (book.sell_stops, (-order.stop_price if order.stop_price is not None else 0, order.seq, order)),
+        )
+        for levels, entry in candidates:
+            i = bisect_left(levels, entry[:2])
+            if i < len(levels) and levels[i][2] is order:
+                del levels[i]
+                return
@@ -14,9 +14,22 @@ class Config:
     TAKE_PROFIT_PERCENTAGE = float(os.getenv('TAKE_PROFIT_PERCENTAGE', '2.0'))
     MAX_TRADES_PER_DAY = int(os.getenv('MAX_TRADES_PER_DAY', '10'))
 
+    # Endpoints, e.g. a local MockExchange; the exchange's own when unset
+    REST_BASE_URL = os.getenv('REST_BASE_URL')
+    STREAM_BASE_URL = os.getenv('STREAM_BASE_URL')
+    # Keep-alive connections pooled for REST requests
+    REST_MAX_CONNECTIONS = int(os.getenv('REST_MAX_CONNECTIONS', '10'))
+
     # WebSocket Settings
     WS_RECONNECT_ATTEMPTS = int(os.getenv('WS_RECONNECT_ATTEMPTS', '3'))
     WS_RECONNECT_DELAY = int(os.getenv('WS_RECONNECT_DELAY', '5'))  # seconds
+    # Directory to record raw stream frames into, for later replay
+    STREAM_RECORD_DIR = os.getenv('STREAM_RECORD_DIR')
+
+    # Latency tracing: seconds between summary logs (0 for none) and the
+    # local port serving Prometheus metrics on /metrics (unset for none)
+    LATENCY_SUMMARY_INTERVAL = float(os.getenv('LATENCY_SUMMARY_INTERVAL', '60'))
+    METRICS_PORT = int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None
 
-    # Trading Pairs
-    TRADING_PAIRS = os.getenv('TRADING_PAIRS')
\ No newline at end of file
+    # Trading Pairs, comma separated
+    TRADING_PAIRS = [pair.strip().upper() for pair in os.getenv('TRADING_PAIRS', 'BTCUSDT').split(',') if pair.strip()]
\ No newline at end of file
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+from .latency import Trace
+
+logger = logging.getLogger(__name__)
+
+def _event_symbol(event: Any) -> Any:
+    return getattr(event, 'symbol', None)
+
+class Subscription:
+    """
+    One consumer of the bus with its own bounded queue and delivery task
+
+    Policies when the queue is full:
+        block: publish() waits for room, pushing back on the socket reader
+        drop_oldest: the oldest queued event is discarded
+        conflate: only the latest event per key (symbol by default) is kept;
+            a new event replaces a queued one with the same key in place
+    """
+
+    POLICIES = ('block', 'drop_oldest', 'conflate')
+
+    def __init__(self, callback: Callable[[Any], Any], maxsize: int = 1000, policy: str = 'block',
+                 key: Callable[[Any], Any] = _event_symbol, name: Optional[str] = None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown policy {policy}, expected one of {self.POLICIES}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.callback = callback
+        self.maxsize = maxsize
+        self.policy = policy
+        self.key = key
+        self.name = name or getattr(callback, '__qualname__', repr(callback))
+        self.topics: Set[str] = set()
+
+        self._items = OrderedDict() if policy == 'conflate' else deque()
+        self._not_empty = asyncio.Event()
+        self._not_full = asyncio.Event()
+        self._not_full.set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.errors = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    async def put(self, event: Any, trace: Optional[Trace] = None) -> None:
+        self.published += 1
+        item = (event, trace)
+        if self.policy == 'conflate':
+            key = self.key(event)
+            if key in self._items:
+                self._items[key] = item
+                self.conflated += 1
+                return
+            if len(self._items) >= self.maxsize:
+                self._items.popitem(last=False)
+                self.dropped += 1
+            self._items[key] = item
+        else:
+            if len(self._items) >= self.maxsize:
+                if self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.maxsize:
+                        self._not_full.clear()
+                        await self._not_full.wait()
+            self._items.append(item)
+
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._not_empty.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            if not self._items:
+                self._not_empty.clear()
+                await self._not_empty.wait()
+                continue
+
+            if self.policy == 'conflate':
+                _, (event, trace) = self._items.popitem(last=False)
+            else:
+                event, trace = self._items.popleft()
+            self._not_full.set()
+
+            # The callback, and order code it awaits, stamps the event's trace
+            token = trace.dispatch().activate() if trace is not None else None
+            try:
+                result = self.callback(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error in subscriber {self.name}: {e}")
+            finally:
+                if token is not None:
+                    Trace.deactivate(token)
+            self.delivered += 1
+
+    def stats(self) -> dict:
+        return {
+            'topics': len(self.topics),
+            'policy': self.policy,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'maxsize': self.maxsize,
+            'published': self.published,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'conflated': self.conflated,
+            'errors': self.errors
+        }
+
+class EventBus:
+    """
+    Fan-out of market data events from socket readers to consumers
+
+    Each subscriber drains its own bounded queue in its own task, so a slow
+    strategy only backs up (or loses, depending on its policy) its own events
+    instead of stalling the reader for everybody.
+    """
+
+    WILDCARD = '*'
+
+    def __init__(self):
+        self._topics: Dict[str, List[Subscription]] = {}
+        self._subscriptions: List[Subscription] = []
+
+    def subscribe(self, topics: Iterable[str], callback: Callable[[Any], Any], maxsize: int = 1000,
+                  policy: str = 'block', key: Callable[[Any], Any] = _event_symbol,
+                  name: Optional[str] = None) -> Subscription:
+        """
+        Register a consumer for some topics ('*' for all of them)
+
+        Args:
+            topics: Topic names, e.g. stream names like "btcusdt@kline_1m"
+            callback: Function or coroutine function receiving each event
+            maxsize: Queue bound (distinct keys when conflating)
+            policy: 'block', 'drop_oldest' or 'conflate'
+            key: Conflation key of an event, its symbol by default
+            name: Name reported in stats()
+        """
+        subscription = Subscription(callback, maxsize, policy, key, name)
+        self._subscriptions.append(subscription)
+        for topic in topics:
+            self.add_topic(subscription, topic)
+        subscription.start()
+        return subscription
+
+    def add_topic(self, subscription: Subscription, topic: str) -> None:
+        if topic not in subscription.topics:
+            subscription.topics.add(topic)
+            self._topics.setdefault(topic, []).append(subscription)
+
+    def remove_topic(self, subscription: Subscription, topic: str) -> None:
+        subscription.topics.discard(topic)
+        subscribers = self._topics.get(topic, [])
+        if subscription in subscribers:
+            subscribers.remove(subscription)
+        if not subscribers:
+            self._topics.pop(topic, None)
+
+    async def unsubscribe(self, subscription: Subscription) -> None:
+        for topic in list(subscription.topics):
+            self.remove_topic(subscription, topic)
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        await subscription.stop()
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._topics or self.WILDCARD in self._topics
+
+    async def publish(self, topic: str, event: Any, trace: Optional[Trace] = None) -> None:
+        """
+        Queue event for every subscriber of topic; waits only on 'block'
+        subscribers that are full. Each subscriber times its own copy of
+        trace from here on.
+        """
+        for subscription in self._topics.get(topic, ()):
+            await subscription.put(event, trace)
+        if topic != self.WILDCARD:
+            for subscription in self._topics.get(self.WILDCARD, ()):
+                await subscription.put(event, trace)
+
+    def stats(self) -> Dict[str, dict]:
+        """Queue depth and drop/conflation counters per subscriber"""
+        return {subscription.name: subscription.stats() for subscription in self._subscriptions}
+
+    async def close(self) -> None:
+        for subscription in list(self._subscriptions):
+            await self.unsubscribe(subscription)
@@ -0,0 +1,289 @@
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """
+    Log-linear histogram of non-negative integers (nanoseconds here), HDR style
+
+    Values below 2**bits are counted exactly. Above that every power-of-two
+    range is split into 2**(bits - 1) equal buckets, so a recorded value is
+    known to within 2**-(bits - 1) of itself (0.8% at 8 bits) whatever its
+    magnitude. record() is a few integer operations and a list increment;
+    values above highest land in the last bucket, max stays exact.
+    """
+
+    def __init__(self, bits: int = 8, highest: int = 60 * 10 ** 9):
+        self.bits = bits
+        self.highest = highest
+        self._half_shift = bits - 1
+        self.counts: List[int] = [0] * (self._index(highest) + 1)
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        shift = value.bit_length() - self.bits
+        if shift <= 0:
+            return value
+        return (shift << self._half_shift) + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        """Largest value counted in bucket index"""
+        if index < 1 << self.bits:
+            return index
+        shift = (index >> self._half_shift) - 1
+        mantissa = index - (shift << self._half_shift)
+        return ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+        self.counts[self._index(min(value, self.highest))] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> int:
+        """Value at or below which percent (0-100) of the recorded values lie"""
+        if not self.count:
+            return 0
+        target = max(1, -int(-percent * self.count // 100))  # ceil
+        seen = 0
+        last = len(self.counts) - 1
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                if index == last:
+                    return self.max  # Values clipped to highest
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def merge(self, other: 'Histogram') -> None:
+        if (other.bits, other.highest) != (self.bits, self.highest):
+            raise ValueError("Only histograms with the same bits and highest can be merged")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+
+# The trace of the market data event being handled, set by the event bus
+# around each callback so order code further down can stamp it
+_current_trace: contextvars.ContextVar[Optional['Trace']] = contextvars.ContextVar('latency_trace', default=None)
+
+class Trace:
+    """
+    Timestamps of one market data event on its way to an order
+
+    mark(stage) records the time since the previous mark under stage, so
+    the stages add up to the event's tick-to-trade time.
+    """
+
+    __slots__ = ('tracer', 'symbol', 'received', 'last')
+
+    def __init__(self, tracer: 'LatencyTracer', symbol: str, received: int, last: int):
+        self.tracer = tracer
+        self.symbol = symbol
+        self.received = received
+        self.last = last
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter_ns()
+        self.tracer.record(stage, self.symbol, now - self.last)
+        if stage == 'rest':
+            self.tracer.record('tick_to_trade', self.symbol, now - self.received)
+        self.last = now
+
+    def dispatch(self) -> 'Trace':
+        """Copy for one subscriber, marked as taken off its queue"""
+        trace = Trace(self.tracer, self.symbol, self.received, self.last)
+        trace.mark('queue')
+        return trace
+
+    def activate(self) -> contextvars.Token:
+        return _current_trace.set(self)
+
+    @staticmethod
+    def deactivate(token: contextvars.Token) -> None:
+        _current_trace.reset(token)
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def stamp(stage: str) -> None:
+    """Mark stage on the trace of the event being handled, if it is traced"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.mark(stage)
+
+def format_ns(ns: float) -> str:
+    for unit, scale in (('s', 1e9), ('ms', 1e6), ('us', 1e3)):
+        if ns >= scale:
+            return f"{ns / scale:.2f}{unit}"
+    return f"{ns:.0f}ns"
+
+class LatencyTracer:
+    """
+    Per stage and per symbol latency histograms of the path from a market
+    data frame arriving to the order it triggers being acknowledged
+
+    Stages, each timed from the end of the previous one:
+        decode: socket receive to the typed record (WebSocketManager.feed)
+        queue: waiting in the subscriber's event bus queue
+        strategy: the handler up to its trading decision
+        rate_limit: decision to leaving the rate limiter with the order,
+            including anything the handler does to size it
+        rest: the order request until the exchange acknowledges it
+    and tick_to_trade from receive to acknowledgement.
+
+    Histograms are cumulative. They are served in the Prometheus text
+    format on http://host:port/metrics and logged every summary_interval
+    seconds once start() is called.
+    """
+
+    STAGES = ('decode', 'queue', 'strategy', 'rate_limit', 'rest', 'tick_to_trade')
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+    METRIC = 'binance_trader_latency_seconds'
+    MAX_METRIC = 'binance_trader_latency_max_seconds'
+
+    def __init__(self, bits: int = 8, highest: int = 60 * 10 ** 9):
+        self.bits = bits
+        self.highest = highest
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self._summary_task: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def trace(self, symbol: str, received: int) -> Trace:
+        """Start tracing an event received at received (perf_counter_ns) and just decoded"""
+        trace = Trace(self, symbol, received, received)
+        trace.mark('decode')
+        return trace
+
+    def record(self, stage: str, symbol: str, ns: int) -> None:
+        histogram = self.histograms.get((stage, symbol))
+        if histogram is None:
+            histogram = self.histograms[(stage, symbol)] = Histogram(self.bits, self.highest)
+        histogram.record(ns)
+
+    def histogram(self, stage: str, symbol: Optional[str] = None) -> Histogram:
+        """One symbol's histogram of a stage, or all symbols' merged"""
+        merged = Histogram(self.bits, self.highest)
+        for (name, histogram_symbol), histogram in self.histograms.items():
+            if name == stage and symbol in (None, histogram_symbol):
+                merged.merge(histogram)
+        return merged
+
+    def snapshot(self) -> Dict[str, Dict[str, dict]]:
+        """stage -> symbol -> count, mean, percentiles and max in nanoseconds"""
+        snapshot: Dict[str, Dict[str, dict]] = {}
+        for (stage, symbol), histogram in sorted(self.histograms.items()):
+            snapshot.setdefault(stage, {})[symbol] = {
+                'count': histogram.count,
+                'mean': histogram.mean,
+                **{f"p{q * 100:g}": histogram.percentile(q * 100) for q in self.QUANTILES},
+                'max': histogram.max,
+            }
+        return snapshot
+
+    def prometheus(self) -> str:
+        """Every histogram as a Prometheus summary, in seconds"""
+        lines = [f"# HELP {self.METRIC} Time from a market data frame arriving to its order being acknowledged, "
+                 f"by stage",
+                 f"# TYPE {self.METRIC} summary"]
+        for (stage, symbol), histogram in sorted(self.histograms.items()):
+            labels = f'stage="{stage}",symbol="{symbol}"'
+            for q in self.QUANTILES:
+                lines.append(f'{self.METRIC}{{{labels},quantile="{q:g}"}} {histogram.percentile(q * 100) / 1e9:.9f}')
+            lines.append(f"{self.METRIC}_sum{{{labels}}} {histogram.total / 1e9:.9f}")
+            lines.append(f"{self.METRIC}_count{{{labels}}} {histogram.count}")
+        lines.append(f"# HELP {self.MAX_METRIC} Slowest time seen, by stage")
+        lines.append(f"# TYPE {self.MAX_METRIC} gauge")
+        for (stage, symbol), histogram in sorted(self.histograms.items()):
+            lines.append(f'{self.MAX_METRIC}{{stage="{stage}",symbol="{symbol}"}} {histogram.max / 1e9:.9f}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> str:
+        """One line per stage, all symbols together"""
+        lines = []
+        for stage in self.STAGES:
+            histogram = self.histogram(stage)
+            if not histogram.count:
+                continue
+            lines.append(f"{stage:<14} n={histogram.count:<8} p50 {format_ns(histogram.percentile(50)):>9}  "
+                         f"p90 {format_ns(histogram.percentile(90)):>9}  p99 {format_ns(histogram.percentile(99)):>9}  "
+                         f"max {format_ns(histogram.max):>9}")
+        return '\n'.join(lines)
+
+    async def start(self, summary_interval: float = 60.0, port: Optional[int] = None, host: str = '127.0.0.1'):
+        """
+        Start the periodic summary log and the metrics endpoint
+
+        Args:
+            summary_interval: Seconds between summaries, 0 for none
+            port: Port of the /metrics endpoint, None for none (0 picks one)
+            host: Interface to serve on, local only by default
+        """
+        if summary_interval and self._summary_task is None:
+            self._summary_task = asyncio.create_task(self._log_summaries(summary_interval))
+        if port is not None and self._server is None:
+            self._server = await asyncio.start_server(self._serve_metrics, host, port)
+            logger.info(f"Serving latency metrics on http://{host}:{self.port}/metrics")
+
+    @property
+    def port(self) -> Optional[int]:
+        if self._server is None:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._summary_task:
+            self._summary_task.cancel()
+            try:
+                await self._summary_task
+            except asyncio.CancelledError:
+                pass
+            self._summary_task = None
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _log_summaries(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            summary = self.summary()
+            if summary:
+                logger.info(f"Latency since start:\n{summary}")
+
+    async def _serve_metrics(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await reader.readuntil(b'\r\n\r\n')
+            parts = request.split(b' ', 2)
+            path = parts[1].split(b'?')[0] if len(parts) > 1 else b''
+            if path == b'/metrics':
+                status, body = '200 OK', self.prometheus().encode()
+            else:
+                status, body = '404 Not Found', b'Not found\n'
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                         f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
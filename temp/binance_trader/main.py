@@ -13,9 +13,11 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 async def main():
+    client = None
     try:
         # Initialize the Binance client
-        client = BinanceClient()
+        client = await BinanceClient.create()
+        await client.start_user_data_stream()
 
         # Initialize trade manager
         trade_manager = TradeManager(client)
@@ -27,6 +29,7 @@ async def main():
 
         # Start trading
         await trade_manager.start_trading()
+        await client.tracer.start(Config.LATENCY_SUMMARY_INTERVAL, Config.METRICS_PORT)
 
         # Keep the main loop running
         while True:
@@ -36,7 +39,8 @@ async def main():
         logger.error(f"Error in main loop: {e}")
     finally:
         # Cleanup
-        client.close_all_connections()
+        if client is not None:
+            await client.close_all_connections()
 
 if __name__ == "__main__":
     asyncio.run(main())
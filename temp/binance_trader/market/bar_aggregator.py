@@ -0,0 +1,256 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+from ..api.decoder import Kline, Trade
+
+logger = logging.getLogger(__name__)
+
+BAR_TYPES = ('time', 'tick', 'volume', 'dollar')
+
+class _Bar:
+    __slots__ = ('open_time', 'close_time', 'event_time', 'open', 'high', 'low', 'close', 'volume',
+                 'quote_volume', 'trades')
+
+    def __init__(self, open_time: int, trade: Trade):
+        self.open_time = open_time
+        self.close_time = trade.trade_time
+        self.event_time = trade.event_time
+        self.open = self.high = self.low = self.close = trade.price
+        self.volume = 0.0
+        self.quote_volume = 0.0
+        self.trades = 0
+
+    def add(self, trade: Trade) -> None:
+        price = trade.price
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.close_time = trade.trade_time
+        self.event_time = trade.event_time
+        self.volume += trade.quantity
+        self.quote_volume += price * trade.quantity
+        self.trades += 1
+
+class BarAggregator:
+    """
+    Builds OHLCV bars for one symbol from its @trade stream
+
+    Bar types:
+        time: `size` seconds, aligned to the clock like exchange klines
+        tick: `size` trades
+        volume: at least `size` units of the base asset
+        dollar: at least `size` units of the quote asset
+    Activity bars close on the trade that reaches the threshold; that trade
+    is not split across bars.
+
+    Trades go through a small reorder buffer keyed by trade id, which the
+    exchange assigns sequentially per symbol. A trade arriving ahead of a
+    missing id is held until the gap fills, until `reorder_window` trades
+    are held or until it is `max_delay` old; then the gap is skipped.
+    Trades older than the last one aggregated are dropped and counted in
+    `late`.
+
+    Closed bars are Kline records (is_closed=True) so they can go straight
+    to BaseStrategy.process_candle.
+    """
+
+    def __init__(self, symbol: str, bar_type: str = 'time', size: float = 1,
+                 on_bar: Optional[Callable[[Kline], Any]] = None,
+                 reorder_window: int = 100, max_delay: float = 0.5):
+        """
+        Args:
+            symbol: Trading pair, e.g. 'BTCUSDT'
+            bar_type: 'time', 'tick', 'volume' or 'dollar'
+            size: Seconds, trades, base volume or quote volume per bar
+            on_bar: Function or coroutine function receiving each closed bar
+            reorder_window: Trades held at most while waiting for a missing id
+            max_delay: Seconds a held trade waits for a missing id
+        """
+        if bar_type not in BAR_TYPES:
+            raise ValueError(f"Unknown bar type {bar_type}, expected one of {BAR_TYPES}")
+        if size <= 0:
+            raise ValueError("Bar size must be positive")
+        if bar_type in ('time', 'tick') and int(size) != size:
+            raise ValueError(f"{bar_type} bars need a whole number size")
+
+        self.symbol = symbol
+        self.bar_type = bar_type
+        self.size = size
+        self.on_bar = on_bar
+        self.reorder_window = reorder_window
+        self.max_delay_ms = int(max_delay * 1000)
+        self.interval = self._interval_name()
+
+        self._size_ms = int(size * 1000)
+        self._bar: Optional[_Bar] = None
+        self._last_open_time: Optional[int] = None
+        self._held: List[Tuple[int, int, Trade]] = []  # Heap by trade id, then arrival
+        self._arrivals = itertools.count()
+        self._next_id: Optional[int] = None
+        self._clock: Optional[asyncio.Task] = None
+
+        self.trades = 0
+        self.bars = 0
+        self.late = 0
+        self.gaps = 0
+
+    def _interval_name(self) -> str:
+        size = f"{self.size:g}"
+        return {'time': f"{size}s", 'tick': f"{size}tick", 'volume': f"{size}vol",
+                'dollar': f"{size}quote"}[self.bar_type]
+
+    def add(self, trade: Trade) -> List[Kline]:
+        """Aggregate one trade; returns the bars it closed"""
+        closed: List[Kline] = []
+        if self._next_id is None:
+            self._next_id = trade.trade_id
+
+        if trade.trade_id < self._next_id:
+            self.late += 1
+            return closed
+        if trade.trade_id > self._next_id:
+            heapq.heappush(self._held, (trade.trade_id, next(self._arrivals), trade))
+            if len(self._held) > self.reorder_window:
+                self._skip_gap(closed)
+            return closed
+
+        self._aggregate(trade, closed)
+        self._drain(closed)
+        return closed
+
+    def flush(self, now: Optional[float] = None) -> List[Kline]:
+        """
+        Release held trades and close the current time bar once their time
+        is over; returns the bars closed. Called by the clock task, or by
+        hand when driving the aggregator outside the event loop.
+
+        Args:
+            now: Current time in ms, wall clock by default
+        """
+        now = time.time() * 1000 if now is None else now
+        closed: List[Kline] = []
+        while self._held and now - self._held[0][2].trade_time >= self.max_delay_ms:
+            self._skip_gap(closed)
+
+        bar = self._bar
+        if (self.bar_type == 'time' and bar is not None and not self._held
+                and now >= bar.open_time + self._size_ms + self.max_delay_ms):
+            closed.append(self._close_bar())
+        return closed
+
+    async def on_trade(self, trade: Trade) -> None:
+        """Trade stream callback"""
+        if not isinstance(trade, Trade) or trade.symbol != self.symbol:
+            return
+        await self._emit(self.add(trade))
+
+    def start(self) -> None:
+        """Start the clock that closes time bars when no trade arrives to do it"""
+        if self._clock is None:
+            self._clock = asyncio.create_task(self._run_clock())
+
+    async def stop(self) -> None:
+        if self._clock:
+            self._clock.cancel()
+            try:
+                await self._clock
+            except asyncio.CancelledError:
+                pass
+            self._clock = None
+
+    def stats(self) -> dict:
+        return {
+            'interval': self.interval,
+            'trades': self.trades,
+            'bars': self.bars,
+            'late': self.late,
+            'gaps': self.gaps,
+            'held': len(self._held)
+        }
+
+    async def _run_clock(self) -> None:
+        tick = min(self.size, 1) if self.bar_type == 'time' else 1
+        while True:
+            await asyncio.sleep(tick)
+            try:
+                await self._emit(self.flush())
+            except Exception as e:
+                logger.error(f"Error flushing {self.symbol} {self.interval} bars: {e}")
+
+    async def _emit(self, bars: List[Kline]) -> None:
+        if not self.on_bar:
+            return
+        for bar in bars:
+            result = self.on_bar(bar)
+            if asyncio.iscoroutine(result):
+                await result
+
+    def _skip_gap(self, closed: List[Kline]) -> None:
+        trade_id, _, trade = heapq.heappop(self._held)
+        if trade_id < self._next_id:  # Duplicate of one already aggregated
+            self.late += 1
+            return
+        self.gaps += trade_id - self._next_id
+        logger.warning(f"Skipping {self.symbol} trades {self._next_id}-{trade_id - 1}, never received")
+        self._next_id = trade_id
+        self._aggregate(trade, closed)
+        self._drain(closed)
+
+    def _drain(self, closed: List[Kline]) -> None:
+        held = self._held
+        while held and held[0][0] <= self._next_id:
+            _, _, trade = heapq.heappop(held)
+            if trade.trade_id < self._next_id:
+                self.late += 1
+            else:
+                self._aggregate(trade, closed)
+
+    def _aggregate(self, trade: Trade, closed: List[Kline]) -> None:
+        self._next_id = trade.trade_id + 1
+        bar = self._bar
+
+        if self.bar_type == 'time':
+            open_time = trade.trade_time - trade.trade_time % self._size_ms
+            if bar is not None and open_time > bar.open_time:
+                closed.append(self._close_bar())
+                bar = None
+            elif bar is None and self._last_open_time is not None and open_time <= self._last_open_time:
+                # Its bar was already closed by the clock
+                self.late += 1
+                return
+            if bar is None:
+                bar = self._bar = _Bar(open_time, trade)
+            elif open_time < bar.open_time:
+                self.late += 1
+                return
+        elif bar is None:
+            bar = self._bar = _Bar(trade.trade_time, trade)
+
+        bar.add(trade)
+        self.trades += 1
+
+        if self.bar_type == 'tick':
+            done = bar.trades >= self.size
+        elif self.bar_type == 'volume':
+            done = bar.volume >= self.size
+        elif self.bar_type == 'dollar':
+            done = bar.quote_volume >= self.size
+        else:
+            done = False
+        if done:
+            closed.append(self._close_bar())
+
+    def _close_bar(self) -> Kline:
+        bar = self._bar
+        self._bar = None
+        self.bars += 1
+        self._last_open_time = bar.open_time
+        close_time = bar.open_time + self._size_ms - 1 if self.bar_type == 'time' else bar.close_time
+        return Kline(self.symbol, self.interval, bar.event_time, bar.open_time, close_time,
+                     bar.open, bar.high, bar.low, bar.close, bar.volume, True)
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..api.decoder import DepthUpdate
+
+logger = logging.getLogger(__name__)
+
+BID = 'BID'
+ASK = 'ASK'
+
+class BookSide:
+    """Price levels of one side: a sorted price list plus a price -> quantity dict"""
+
+    def __init__(self):
+        self.prices: List[float] = []  # Ascending
+        self.quantities: Dict[float, float] = {}
+
+    def __len__(self):
+        return len(self.prices)
+
+    def clear(self) -> None:
+        self.prices.clear()
+        self.quantities.clear()
+
+    def set(self, price: float, quantity: float) -> None:
+        if quantity == 0:
+            if self.quantities.pop(price, None) is not None:
+                del self.prices[bisect_left(self.prices, price)]
+        else:
+            if price not in self.quantities:
+                insort(self.prices, price)
+            self.quantities[price] = quantity
+
+class OrderBook:
+    """Local copy of one symbol's order book"""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids = BookSide()
+        self.asks = BookSide()
+        self.last_update_id: Optional[int] = None
+
+    @property
+    def synced(self) -> bool:
+        return self.last_update_id is not None
+
+    def apply_snapshot(self, last_update_id: int, bids: List[Tuple[float, float]], asks: List[Tuple[float, float]]) -> None:
+        self.bids.clear()
+        self.asks.clear()
+        for price, quantity in bids:
+            self.bids.set(float(price), float(quantity))
+        for price, quantity in asks:
+            self.asks.set(float(price), float(quantity))
+        self.last_update_id = last_update_id
+
+    def apply_update(self, update: DepthUpdate) -> None:
+        for price, quantity in update.bids:
+            self.bids.set(price, quantity)
+        for price, quantity in update.asks:
+            self.asks.set(price, quantity)
+        self.last_update_id = update.final_update_id
+
+    def invalidate(self) -> None:
+        self.last_update_id = None
+
+    def best_bid(self) -> Optional[Tuple[float, float]]:
+        if not self.bids.prices:
+            return None
+        price = self.bids.prices[-1]
+        return price, self.bids.quantities[price]
+
+    def best_ask(self) -> Optional[Tuple[float, float]]:
+        if not self.asks.prices:
+            return None
+        price = self.asks.prices[0]
+        return price, self.asks.quantities[price]
+
+    def mid_price(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return (bid[0] + ask[0]) / 2
+
+    def spread(self) -> Optional[float]:
+        bid, ask = self.best_bid(), self.best_ask()
+        if bid is None or ask is None:
+            return None
+        return ask[0] - bid[0]
+
+    def quantity_at(self, side: str, price: float) -> float:
+        book_side = self.bids if side == BID else self.asks
+        return book_side.quantities.get(price, 0.0)
+
+    def cumulative_volume(self, side: str, price: float) -> float:
+        """Quantity available from the top of the book down to price (inclusive)"""
+        if side == BID:
+            prices = self.bids.prices[bisect_left(self.bids.prices, price):]
+            quantities = self.bids.quantities
+        else:
+            prices = self.asks.prices[:bisect_right(self.asks.prices, price)]
+            quantities = self.asks.quantities
+        return sum(quantities[p] for p in prices)
+
+    def levels(self, side: str, n: int = 10) -> List[Tuple[float, float]]:
+        """Top n levels, best first"""
+        if side == BID:
+            prices = self.bids.prices[:-n - 1:-1] if n else []
+            quantities = self.bids.quantities
+        else:
+            prices = self.asks.prices[:n]
+            quantities = self.asks.quantities
+        return [(p, quantities[p]) for p in prices]
+
+class OrderBookManager:
+    """
+    Keeps local order books in sync from the depth diff stream
+
+    Follows the exchange's procedure: diffs are buffered while a REST
+    snapshot is fetched, diffs already contained in the snapshot are
+    dropped, and the first applied diff must straddle the snapshot's
+    lastUpdateId. After that each diff must start right after the previous
+    one; a gap invalidates the book and triggers a fresh snapshot.
+    """
+
+    def __init__(self, fetch_snapshot: Callable[[str], Awaitable[dict]], max_buffer: int = 10000):
+        """
+        Args:
+            fetch_snapshot: Coroutine function returning the REST depth
+                snapshot ({'lastUpdateId', 'bids', 'asks'}) for a symbol
+            max_buffer: Diffs kept per symbol while waiting for a snapshot
+        """
+        self.fetch_snapshot = fetch_snapshot
+        self.max_buffer = max_buffer
+        self.books: Dict[str, OrderBook] = {}
+        self.resyncs: Dict[str, int] = {}
+        self._buffers: Dict[str, List[DepthUpdate]] = {}
+        self._snapshot_tasks: Dict[str, asyncio.Task] = {}
+
+    def get(self, symbol: str) -> Optional[OrderBook]:
+        """The book for symbol if it is currently in sync"""
+        book = self.books.get(symbol)
+        return book if book is not None and book.synced else None
+
+    async def on_depth_update(self, update: DepthUpdate) -> None:
+        """Depth stream callback"""
+        book = self.books.get(update.symbol)
+        if book is None:
+            book = self.books[update.symbol] = OrderBook(update.symbol)
+            self.resyncs[update.symbol] = 0
+
+        if not book.synced:
+            self._buffer(update)
+            return
+
+        if update.final_update_id <= book.last_update_id:
+            return
+        if update.first_update_id != book.last_update_id + 1:
+            logger.warning(
+                f"Gap in {update.symbol} depth stream: expected {book.last_update_id + 1}, "
+                f"got {update.first_update_id}. Resyncing"
+            )
+            book.invalidate()
+            self.resyncs[update.symbol] += 1
+            self._buffer(update)
+            return
+
+        book.apply_update(update)
+
+    def _buffer(self, update: DepthUpdate) -> None:
+        buffer = self._buffers.setdefault(update.symbol, [])
+        buffer.append(update)
+        if len(buffer) > self.max_buffer:
+            del buffer[0]
+
+        task = self._snapshot_tasks.get(update.symbol)
+        if task is None or task.done():
+            self._snapshot_tasks[update.symbol] = asyncio.create_task(self._sync(update.symbol))
+
+    async def _sync(self, symbol: str) -> None:
+        try:
+            snapshot = await self.fetch_snapshot(symbol)
+        except Exception as e:
+            logger.error(f"Error fetching {symbol} depth snapshot: {e}")
+            return
+
+        book = self.books[symbol]
+        last_update_id = snapshot['lastUpdateId']
+        buffer = [u for u in self._buffers.pop(symbol, []) if u.final_update_id > last_update_id]
+
+        if buffer and buffer[0].first_update_id > last_update_id + 1:
+            # Snapshot is older than anything buffered; the next diff starts another sync
+            logger.warning(f"{symbol} depth snapshot {last_update_id} is older than the buffered diffs")
+            self._buffers[symbol] = buffer
+            return
+
+        book.apply_snapshot(last_update_id, snapshot['bids'], snapshot['asks'])
+        for update in buffer:
+            if update.first_update_id > book.last_update_id + 1:
+                logger.warning(f"Gap in buffered {symbol} depth diffs. Resyncing")
+                self._buffers[symbol] = [u for u in buffer if u.final_update_id > book.last_update_id]
+                book.invalidate()
+                self.resyncs[symbol] += 1
+                return
+            book.apply_update(update)
+        logger.info(f"{symbol} order book synced at update {book.last_update_id}")
+
+    async def close(self) -> None:
+        for task in self._snapshot_tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._snapshot_tasks.values(), return_exceptions=True)
+        self._snapshot_tasks.clear()
@@ -1,19 +1,38 @@
 from abc import ABC, abstractmethod
+from typing import Callable, Dict, Optional
 import pandas as pd
 import numpy as np
 from ..api.client import BinanceClient
+from ..api.decoder import Kline
+from .candle_store import CandleStore
+from .indicators import ATR, EMA, MACD, RSI, SMA, BollingerBands, Indicator
 
 class BaseStrategy(ABC):
     def __init__(self, client: BinanceClient, symbol: str):
         self.client = client
         self.symbol = symbol
-        self.data = pd.DataFrame()
+        self.candles = CandleStore(capacity=100)  # Keep last 100 candles
+        self.indicators: Dict[tuple, Indicator] = {}
+        self._signals: dict = {}
+        self._signals_key: Optional[tuple] = None
 
     @abstractmethod
     def calculate_signals(self) -> dict:
         """Calculate trading signals based on strategy logic"""
         pass
 
+    def get_signals(self) -> dict:
+        """
+        calculate_signals() for the latest candle, computed once per candle
+        however many checks ask for it. Keyed by symbol and candle open time,
+        and dropped whenever a candle is added.
+        """
+        key = (self.symbol, self.candles.last('timestamp') if len(self.candles) else None)
+        if key != self._signals_key:
+            self._signals = self.calculate_signals()
+            self._signals_key = key
+        return self._signals
+
     @abstractmethod
     def should_enter_trade(self) -> bool:
         """Determine if we should enter a trade"""
@@ -24,34 +43,74 @@ class BaseStrategy(ABC):
         """Determine if we should exit a trade"""
         pass
 
+    @property
+    def data(self) -> pd.DataFrame:
+        """Stored candles as a DataFrame, for strategies written against pandas"""
+        return self.candles.to_frame()
+
     def update_data(self, kline_data: dict):
         """Update strategy data with new kline information"""
-        new_data = pd.DataFrame([{
+        self._add_candle({
             'timestamp': kline_data['k']['t'],
             'open': float(kline_data['k']['o']),
             'high': float(kline_data['k']['h']),
             'low': float(kline_data['k']['l']),
             'close': float(kline_data['k']['c']),
             'volume': float(kline_data['k']['v'])
-        }])
-        self.data = pd.concat([self.data, new_data]).tail(100)  # Keep last 100 candles
+        })
+
+    async def process_candle(self, kline: Kline):
+        """Update strategy data with a closed candle from the kline stream"""
+        self._add_candle({
+            'timestamp': kline.open_time,
+            'open': kline.open,
+            'high': kline.high,
+            'low': kline.low,
+            'close': kline.close,
+            'volume': kline.volume
+        })
+
+    def _add_candle(self, candle: dict):
+        self.candles.append(candle)
+        self._signals_key = None
+        for indicator in self.indicators.values():
+            indicator.update(*(candle[field] for field in indicator.inputs))
+
+    def indicator(self, key: tuple, factory: Callable[[], Indicator]) -> Indicator:
+        """
+        Get the running indicator registered under key, creating it with
+        factory() and warming it up from the stored candles on first use.
+        From then on update_data() advances it in O(1) per candle.
+        """
+        indicator = self.indicators.get(key)
+        if indicator is None:
+            indicator = factory()
+            columns = [self.candles.column(field).tolist() for field in indicator.inputs]
+            for values in zip(*columns):
+                indicator.update(*values)
+            self.indicators[key] = indicator
+        return indicator
 
     def calculate_rsi(self, period: int = 14) -> float:
         """Calculate Relative Strength Index"""
-        delta = self.data['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (1 + rs)).iloc[-1]
+        return self.indicator(('rsi', period), lambda: RSI(period, smoothing='sma')).value
 
     def calculate_ema(self, period: int) -> float:
         """Calculate Exponential Moving Average"""
-        return self.data['close'].ewm(span=period, adjust=False).mean().iloc[-1]
+        return self.indicator(('ema', period), lambda: EMA(period)).value
 
     def calculate_macd(self) -> tuple:
         """Calculate MACD (Moving Average Convergence Divergence)"""
-        exp1 = self.data['close'].ewm(span=12, adjust=False).mean()
-        exp2 = self.data['close'].ewm(span=26, adjust=False).mean()
-        macd = exp1 - exp2
-        signal = macd.ewm(span=9, adjust=False).mean()
-        return macd.iloc[-1], signal.iloc[-1]
\ No newline at end of file
+        return self.indicator(('macd', 12, 26, 9), MACD).value
+
+    def calculate_sma(self, period: int) -> float:
+        """Calculate Simple Moving Average"""
+        return self.indicator(('sma', period), lambda: SMA(period)).value
+
+    def calculate_atr(self, period: int = 14) -> float:
+        """Calculate Average True Range"""
+        return self.indicator(('atr', period), lambda: ATR(period)).value
+
+    def calculate_bollinger_bands(self, period: int = 20, num_std: float = 2.0) -> tuple:
+        """Calculate Bollinger Bands as (middle, upper, lower)"""
+        return self.indicator(('bollinger', period, num_std), lambda: BollingerBands(period, num_std)).value
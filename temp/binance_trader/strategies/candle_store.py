@@ -0,0 +1,76 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class CandleStore:
+    """
+    Fixed-capacity, column-oriented ring buffer of OHLCV candles
+
+    Every value is written twice, capacity slots apart, so the most recent
+    candles are always one contiguous slice of the underlying array and can
+    be handed out as zero-copy NumPy views. Appending never allocates.
+    """
+
+    FIELDS: Tuple[str, ...] = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, capacity: int = 100, fields: Tuple[str, ...] = FIELDS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self._index = {field: i for i, field in enumerate(self.fields)}
+        self._buffer = np.zeros((len(self.fields), 2 * capacity), dtype=np.float64)
+        self._pos = 0  # Slot the next candle goes to
+        self._size = 0
+        self.version = 0  # Bumped on every append, for callers caching derived data
+        self._frame: Optional[pd.DataFrame] = None
+        self._frame_version = -1
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, candle: dict) -> None:
+        """Add a candle given as a dict with (at least) every field"""
+        pos = self._pos
+        for i, field in enumerate(self.fields):
+            value = candle[field]
+            self._buffer[i, pos] = value
+            self._buffer[i, pos + self.capacity] = value
+
+        self._pos = (pos + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        self.version += 1
+
+    def column(self, field: str, n: Optional[int] = None) -> np.ndarray:
+        """Read-only view of the last n values of field, oldest first"""
+        n = self._size if n is None else min(n, self._size)
+        end = self._pos + self.capacity
+        view = self._buffer[self._index[field], end - n:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self, field: str, offset: int = 0) -> float:
+        """Value of field offset candles before the latest one"""
+        if offset >= self._size:
+            raise IndexError("Not enough candles stored")
+        return float(self._buffer[self._index[field], self._pos + self.capacity - 1 - offset])
+
+    def last_candle(self) -> Optional[dict]:
+        if not self._size:
+            return None
+        return {field: self.last(field) for field in self.fields}
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Copy of the stored candles as a DataFrame, for strategies still
+        working on pandas. Rebuilt at most once per appended candle.
+        """
+        if self._frame_version != self.version:
+            frame = pd.DataFrame({field: self.column(field).copy() for field in self.fields})
+            if 'timestamp' in self._index:
+                frame['timestamp'] = frame['timestamp'].astype(np.int64)
+            self._frame = frame
+            self._frame_version = self.version
+        return self._frame
@@ -0,0 +1,265 @@
+import math
+from collections import deque
+from typing import Optional, Tuple
+
+
+class Indicator:
+    """
+    Base class for stateful indicators updated in O(1) per bar
+
+    Subclasses list the candle fields update() takes in `inputs`, so callers
+    holding a candle dict can feed any indicator the same way:
+    indicator.update(*(candle[field] for field in indicator.inputs))
+    """
+
+    inputs: Tuple[str, ...] = ('close',)
+
+    def __init__(self, period: int):
+        if period < 1:
+            raise ValueError("period must be at least 1")
+        self.period = period
+        self.count = 0
+
+    @property
+    def ready(self) -> bool:
+        """True once enough bars were seen for a full window"""
+        return self.count >= self.period
+
+    @property
+    def value(self):
+        raise NotImplementedError
+
+    def update(self, *args):
+        raise NotImplementedError
+
+
+class RollingSum:
+    """Sum of the last `period` values"""
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self._since_resum = 0
+
+    def __len__(self):
+        return len(self.window)
+
+    def add(self, value: float) -> float:
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+
+        # Re-add the window now and then so subtraction error can't accumulate
+        self._since_resum += 1
+        if self._since_resum >= 1000:
+            self.total = math.fsum(self.window)
+            self._since_resum = 0
+        return self.total
+
+
+class SMA(Indicator):
+    """Simple moving average"""
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self._sum = RollingSum(period)
+
+    @property
+    def value(self) -> float:
+        return self._sum.total / self.period if self.ready else math.nan
+
+    def update(self, close: float) -> float:
+        self._sum.add(close)
+        self.count += 1
+        return self.value
+
+
+class EMA(Indicator):
+    """
+    Exponential moving average, seeded with the first close
+
+    Uses the same arithmetic as pandas' ewm(span=period, adjust=False), so
+    the values match a full recomputation over the same history.
+    """
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self.alpha = 1.0 / (1.0 + (period - 1) / 2.0)
+        self._value: Optional[float] = None
+
+    @property
+    def value(self) -> float:
+        return math.nan if self._value is None else self._value
+
+    def update(self, close: float) -> float:
+        if self._value is None:
+            self._value = close
+        else:
+            old_weight = 1.0 - self.alpha
+            self._value = (old_weight * self._value + self.alpha * close) / (old_weight + self.alpha)
+        self.count += 1
+        return self._value
+
+
+class RSI(Indicator):
+    """
+    Relative Strength Index
+
+    smoothing='wilder' uses Wilder's running average of gains and losses,
+    seeded with the simple average of the first `period` changes.
+    smoothing='sma' uses a plain rolling mean and, like the pandas version
+    BaseStrategy.calculate_rsi always used, counts the first bar as a
+    zero change.
+    """
+
+    def __init__(self, period: int = 14, smoothing: str = 'wilder'):
+        super().__init__(period)
+        if smoothing not in ('wilder', 'sma'):
+            raise ValueError(f"Unknown RSI smoothing: {smoothing}")
+        self.smoothing = smoothing
+        self._prev_close: Optional[float] = None
+        self._gains = RollingSum(period)
+        self._losses = RollingSum(period)
+        self._avg_gain = math.nan
+        self._avg_loss = math.nan
+
+    @property
+    def ready(self) -> bool:
+        if self.smoothing == 'sma':
+            return self.count >= self.period
+        # Needs `period` price changes, i.e. period + 1 closes
+        return self.count > self.period
+
+    @property
+    def value(self) -> float:
+        if not self.ready:
+            return math.nan
+        if self._avg_loss == 0:
+            return 100.0 if self._avg_gain > 0 else math.nan
+        rs = self._avg_gain / self._avg_loss
+        return 100 - (100 / (1 + rs))
+
+    def update(self, close: float) -> float:
+        prev_close, self._prev_close = self._prev_close, close
+        self.count += 1
+        if prev_close is None:
+            if self.smoothing == 'wilder':
+                return self.value
+            prev_close = close
+
+        delta = close - prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if self.smoothing == 'sma' or self.count <= self.period + 1:
+            self._gains.add(gain)
+            self._losses.add(loss)
+            if len(self._gains) == self.period:
+                self._avg_gain = self._gains.total / self.period
+                self._avg_loss = self._losses.total / self.period
+        else:
+            self._avg_gain = (self._avg_gain * (self.period - 1) + gain) / self.period
+            self._avg_loss = (self._avg_loss * (self.period - 1) + loss) / self.period
+        return self.value
+
+
+class MACD(Indicator):
+    """MACD line, its signal line and the histogram between them"""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        super().__init__(slow)
+        self._fast = EMA(fast)
+        self._slow = EMA(slow)
+        self._signal = EMA(signal)
+
+    @property
+    def macd(self) -> float:
+        return self._fast.value - self._slow.value
+
+    @property
+    def signal(self) -> float:
+        return self._signal.value
+
+    @property
+    def histogram(self) -> float:
+        return self.macd - self.signal
+
+    @property
+    def value(self) -> Tuple[float, float]:
+        return self.macd, self.signal
+
+    def update(self, close: float) -> Tuple[float, float]:
+        self._fast.update(close)
+        self._slow.update(close)
+        self._signal.update(self.macd)
+        self.count += 1
+        return self.value
+
+
+class ATR(Indicator):
+    """Average True Range with Wilder smoothing"""
+
+    inputs = ('high', 'low', 'close')
+
+    def __init__(self, period: int = 14):
+        super().__init__(period)
+        self._prev_close: Optional[float] = None
+        self._true_ranges = RollingSum(period)
+        self._value = math.nan
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self._prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        self.count += 1
+
+        if self.count < self.period:
+            self._true_ranges.add(true_range)
+        elif self.count == self.period:
+            self._value = self._true_ranges.add(true_range) / self.period
+        else:
+            self._value = (self._value * (self.period - 1) + true_range) / self.period
+        return self._value
+
+
+class BollingerBands(Indicator):
+    """Rolling mean plus/minus num_std sample standard deviations"""
+
+    def __init__(self, period: int = 20, num_std: float = 2.0):
+        if period < 2:
+            raise ValueError("period must be at least 2")
+        super().__init__(period)
+        self.num_std = num_std
+        self._window = deque(maxlen=period)
+        self._mean = 0.0
+        self._m2 = 0.0  # Sum of squared deviations from the mean (Welford)
+
+    @property
+    def value(self) -> Tuple[float, float, float]:
+        """(middle, upper, lower)"""
+        if not self.ready:
+            return math.nan, math.nan, math.nan
+        std = math.sqrt(max(self._m2, 0.0) / (self.period - 1))
+        return self._mean, self._mean + self.num_std * std, self._mean - self.num_std * std
+
+    def update(self, close: float) -> Tuple[float, float, float]:
+        if len(self._window) < self.period:
+            delta = close - self._mean
+            self._mean += delta / (len(self._window) + 1)
+            self._m2 += delta * (close - self._mean)
+        else:
+            oldest = self._window[0]
+            old_mean = self._mean
+            self._mean += (close - oldest) / self.period
+            self._m2 += (close - oldest) * (close - self._mean + oldest - old_mean)
+        self._window.append(close)
+        self.count += 1
+        return self.value
@@ -1,5 +1,6 @@
 from .base_strategy import BaseStrategy
 import numpy as np
+import pandas as pd
 
 class ScalpingStrategy(BaseStrategy):
     def __init__(self, client, symbol, rsi_period=14, rsi_overbought=70, rsi_oversold=30):
@@ -9,14 +10,14 @@ class ScalpingStrategy(BaseStrategy):
         self.rsi_oversold = rsi_oversold
 
     def calculate_signals(self) -> dict:
-        if len(self.data) < 30:  # Need enough data for calculations
+        if len(self.candles) < 30:  # Need enough data for calculations
             return {'valid': False}
 
         rsi = self.calculate_rsi(self.rsi_period)
         ema_20 = self.calculate_ema(20)
         macd, signal = self.calculate_macd()
         
-        current_price = self.data['close'].iloc[-1]
+        current_price = self.candles.last('close')
         
         return {
             'valid': True,
@@ -30,7 +31,7 @@ class ScalpingStrategy(BaseStrategy):
         }
 
     def should_enter_trade(self) -> bool:
-        signals = self.calculate_signals()
+        signals = self.get_signals()
         if not signals['valid']:
             return False
 
@@ -45,7 +46,7 @@ class ScalpingStrategy(BaseStrategy):
         return False
 
     def should_exit_trade(self) -> bool:
-        signals = self.calculate_signals()
+        signals = self.get_signals()
         if not signals['valid']:
             return True  # Exit if we can't calculate signals
 
@@ -57,16 +58,49 @@ class ScalpingStrategy(BaseStrategy):
 
         return False
 
+    @staticmethod
+    def history_positions(closes, rsi_period=14, rsi_overbought=70, rsi_oversold=30) -> np.ndarray:
+        """
+        Replay the entry/exit rules over a whole close history at once
+
+        Returns the position (1 = in trade, 0 = flat) held after each bar's
+        close, as TradeManager would hold it trading this strategy live.
+        Used for backtests and parameter sweeps.
+        """
+        if rsi_oversold >= rsi_overbought:
+            raise ValueError("rsi_oversold must be below rsi_overbought")
+
+        close = pd.Series(np.asarray(closes, dtype=np.float64))
+        delta = close.diff()
+        gain = (delta.where(delta > 0, 0)).rolling(window=rsi_period).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=rsi_period).mean()
+        rsi = (100 - (100 / (1 + gain / loss))).to_numpy()
+
+        prev1 = close.shift(1).to_numpy()
+        prev2 = close.shift(2).to_numpy()
+        close = close.to_numpy()
+        is_bullish = (close > prev1) & (prev1 > prev2)
+        is_bearish = (close < prev1) & (prev1 < prev2)
+        valid = np.arange(len(close)) >= 29  # calculate_signals needs 30 candles
+
+        enter = valid & ((is_bullish & (rsi < rsi_oversold)) | (is_bearish & (rsi > rsi_overbought)))
+        exit_ = ~valid | (is_bullish & (rsi > rsi_overbought)) | (is_bearish & (rsi < rsi_oversold))
+
+        # With oversold < overbought entry and exit never fire on the same bar,
+        # so the in-trade state is just the last of them carried forward
+        state = np.where(enter, 1.0, np.where(exit_, 0.0, np.nan))
+        return pd.Series(state).ffill().fillna(0.0).to_numpy()
+
     def _is_bullish_setup(self) -> bool:
-        if len(self.data) < 3:
+        if len(self.candles) < 3:
             return False
         
-        last_closes = self.data['close'].tail(3)
-        return (last_closes.iloc[-1] > last_closes.iloc[-2] > last_closes.iloc[-3])
+        last_closes = self.candles.column('close', 3)
+        return (last_closes[-1] > last_closes[-2] > last_closes[-3])
 
     def _is_bearish_setup(self) -> bool:
-        if len(self.data) < 3:
+        if len(self.candles) < 3:
             return False
         
-        last_closes = self.data['close'].tail(3)
-        return (last_closes.iloc[-1] < last_closes.iloc[-2] < last_closes.iloc[-3])
\ No newline at end of file
+        last_closes = self.candles.column('close', 3)
+        return (last_closes[-1] < last_closes[-2] < last_closes[-3])
\ No newline at end of file
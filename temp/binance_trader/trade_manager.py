@@ -1,13 +1,24 @@
 import logging
+import math
 from typing import Dict, Optional
 from .api.client import BinanceClient
+from .api.decoder import Kline
 from .strategies.base_strategy import BaseStrategy
 from .config import Config
+from .latency import stamp
 from binance.enums import *
 
 logger = logging.getLogger(__name__)
 
 class TradeManager:
+    """
+    Runs one strategy per symbol on its closed klines and trades its signals
+
+    Each symbol's klines go to their own handler, and so to their own event
+    bus queue and task: while one symbol waits on an order, the others keep
+    being handled.
+    """
+
     def __init__(self, client: BinanceClient):
         self.client = client
         self.active_trades: Dict[str, dict] = {}
@@ -24,7 +35,7 @@ class TradeManager:
             for symbol in self.strategies.keys():
                 await self.client.start_kline_socket(
                     symbol,
-                    self._handle_kline_data,
+                    self._kline_handler(symbol),
                     interval='1m'
                 )
             logger.info("Started trading system")
@@ -42,107 +53,146 @@ class TradeManager:
             logger.error(f"Error stopping trading system: {e}")
             raise
 
-    async def _handle_kline_data(self, msg):
+    def _kline_handler(self, symbol: str):
+        """A handler of symbol's own, so it gets its own bus subscription"""
+        async def handle_kline(kline: Kline):
+            await self._handle_kline_data(kline)
+        handle_kline.__qualname__ = f"{type(self).__name__}[{symbol}]"
+        return handle_kline
+
+    async def _handle_kline_data(self, kline: Kline):
         """Handle incoming kline/candlestick data"""
         try:
-            if 'data' not in msg:
-                logger.warning(f"Received invalid message format: {msg}")
+            if not isinstance(kline, Kline):
+                logger.warning(f"Received invalid message format: {kline}")
                 return
-                
-            kline_data = msg['data']['k']
-            symbol = kline_data['s']
-            
+
+            symbol = kline.symbol
             if symbol not in self.strategies:
                 return
-                
-            # Extract relevant kline data
-            candle = {
-                'open_time': kline_data['t'],
-                'close_time': kline_data['T'],
-                'symbol': symbol,
-                'interval': kline_data['i'],
-                'open': float(kline_data['o']),
-                'high': float(kline_data['h']),
-                'low': float(kline_data['l']),
-                'close': float(kline_data['c']),
-                'volume': float(kline_data['v']),
-                'is_closed': kline_data['x']
-            }
-            
+
             # Only process completed candles
-            if not candle['is_closed']:
+            if not kline.is_closed:
                 return
                 
             strategy = self.strategies[symbol]
-            await strategy.process_candle(candle)
+            await strategy.process_candle(kline)
 
             # Check for trade signals
             if symbol not in self.active_trades:
-                if strategy.should_enter_trade():
-                    self._enter_trade(symbol)
+                signal = strategy.should_enter_trade()
+                stamp('strategy')
+                if signal:
+                    await self._enter_trade(symbol)
             else:
-                if strategy.should_exit_trade():
-                    self._exit_trade(symbol)
+                signal = strategy.should_exit_trade()
+                stamp('strategy')
+                if signal:
+                    await self._exit_trade(symbol)
 
         except Exception as e:
             logger.error(f"Error handling kline data: {e}")
 
-    def _enter_trade(self, symbol: str):
+    @staticmethod
+    def _round_quantity(quantity: float, step_size: float) -> float:
+        """quantity rounded down to a multiple of the symbol's LOT_SIZE step"""
+        decimals = max(0, -math.floor(math.log10(step_size) + 1e-9))
+        return round(math.floor(quantity / step_size + 1e-9) * step_size, decimals)
+
+    @staticmethod
+    def _fill_price(order: dict) -> float:
+        """Average fill price; MARKET order responses carry price 0"""
+        executed = float(order['executedQty'])
+        if executed:
+            return float(order['cummulativeQuoteQty']) / executed
+        return float(order['price'])
+
+    async def _enter_trade(self, symbol: str):
         """Enter a new trade"""
         try:
             # Calculate position size based on account balance and risk parameters
-            account = self.client.get_account_balance()
-            usdt_balance = float(next(
-                (asset['free'] for asset in account['balances'] 
-                if asset['asset'] == 'USDT'),
-                0
-            ))
+            usdt_balance = await self.client.get_free_balance('USDT')
             
             position_size = min(
                 Config.MAX_POSITION_SIZE,
                 usdt_balance * 0.1  # Use 10% of available balance
             )
 
+            # Position size is in USDT, the order quantity in the base asset,
+            # rounded down to what the symbol's LOT_SIZE filter accepts
+            price = self.strategies[symbol].candles.last('close')
+            rules = await self.client.get_trading_rules(symbol)
+            quantity = self._round_quantity(position_size / price, rules['step_size'])
+            if quantity < max(rules['min_qty'], rules['step_size']):
+                logger.warning(f"Position size {position_size:.2f} is below the minimum quantity for {symbol}")
+                return
+
             # Place market buy order
-            order = self.client.place_order(
+            order = await self.client.place_order(
                 symbol=symbol,
                 side=SIDE_BUY,
                 order_type=ORDER_TYPE_MARKET,
-                quantity=position_size
+                quantity=quantity
             )
+            if not float(order['executedQty']):
+                logger.warning(f"Entry order for {symbol} was not filled: {order['status']}")
+                return
 
             # Record the trade
+            entry_price = self._fill_price(order)
             self.active_trades[symbol] = {
-                'entry_price': float(order['price']),
+                'entry_price': entry_price,
                 'quantity': float(order['executedQty']),
                 'order_id': order['orderId']
             }
 
-            logger.info(f"Entered trade for {symbol} at {order['price']}")
+            logger.info(f"Entered trade for {symbol} at {entry_price}")
 
         except Exception as e:
             logger.error(f"Error entering trade: {e}")
 
-    def _exit_trade(self, symbol: str):
+    async def _exit_trade(self, symbol: str):
         """Exit an existing trade"""
         try:
             trade = self.active_trades.get(symbol)
             if not trade:
                 return
 
+            # A commission charged in the base asset leaves less than was
+            # bought, so sell what is actually free, rounded to the LOT_SIZE step
+            rules = await self.client.get_trading_rules(symbol)
+            free = await self.client.get_free_balance(rules['base_asset'])
+            quantity = self._round_quantity(min(trade['quantity'], free), rules['step_size'])
+            if quantity < max(rules['min_qty'], rules['step_size']):
+                logger.warning(f"Nothing left to sell for {symbol}: {free} {rules['base_asset']} free")
+                return
+
             # Place market sell order
-            order = self.client.place_order(
+            order = await self.client.place_order(
                 symbol=symbol,
                 side=SIDE_SELL,
                 order_type=ORDER_TYPE_MARKET,
-                quantity=trade['quantity']
+                quantity=quantity
             )
+            executed = float(order['executedQty'])
+            if not executed:
+                logger.warning(f"Exit order for {symbol} was not filled: {order['status']}")
+                return
 
             # Calculate profit/loss
             entry_price = trade['entry_price']
-            exit_price = float(order['price'])
+            exit_price = self._fill_price(order)
             pl_percent = ((exit_price - entry_price) / entry_price) * 100
 
+            if order['status'] != ORDER_STATUS_FILLED:
+                # Keep what is still held for the next exit signal
+                trade['quantity'] -= executed
+                logger.warning(
+                    f"Exit for {symbol} only partly filled at {exit_price}: {executed} sold, "
+                    f"{trade['quantity']} left. P/L: {pl_percent:.2f}%"
+                )
+                return
+
             logger.info(
                 f"Exited trade for {symbol} at {exit_price}. "
                 f"P/L: {pl_percent:.2f}%"
@@ -0,0 +1,306 @@
+import asyncio
+import itertools
+import logging
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .api.decoder import Trade
+
+logger = logging.getLogger(__name__)
+
+TAKE_PROFIT = 'TAKE_PROFIT'
+STOP_LOSS = 'STOP_LOSS'
+TRAILING_STOP = 'TRAILING_STOP'
+
+class TriggerEvent:
+    __slots__ = ('position_id', 'symbol', 'side', 'quantity', 'kind', 'level', 'price', 'time', 'tag')
+
+    def __init__(self, position_id: int, symbol: str, side: str, quantity: float, kind: str,
+                 level: float, price: float, time: Optional[int], tag: Any):
+        self.position_id = position_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.kind = kind
+        self.level = level
+        self.price = price
+        self.time = time
+        self.tag = tag
+
+    @property
+    def exit_side(self) -> str:
+        """Side of the order that closes the position"""
+        return 'SELL' if self.side == 'BUY' else 'BUY'
+
+    def __repr__(self):
+        return f"TriggerEvent(#{self.position_id} {self.symbol} {self.kind} {self.level} @ {self.price})"
+
+class _Position:
+    __slots__ = ('position_id', 'symbol', 'side', 'quantity', 'take_profit', 'stop_loss', 'trail', 'tag')
+
+    def __init__(self, position_id, symbol, side, quantity, take_profit, stop_loss, trail, tag):
+        self.position_id = position_id
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.take_profit = take_profit
+        self.stop_loss = stop_loss
+        self.trail = trail
+        self.tag = tag
+
+class _TrailingIndex:
+    """
+    Trailing stops of one symbol, one direction and one trail fraction
+
+    A long stop sits at peak * (1 - trail) and fires once the price falls
+    to it. Whenever the price makes a new high every peak below it becomes
+    that price, so stops are grouped by peak and those groups only ever
+    merge: a tick raises the low groups into one and fires the high ones,
+    both found by bisection. Shorts are the same with prices negated and
+    a (1 + trail) factor.
+    """
+
+    def __init__(self, trail: float, sign: int):
+        self.trail = trail
+        self.sign = sign
+        self.factor = 1 - trail if sign > 0 else 1 + trail
+        self.peaks: List[float] = []  # Ascending, in signed price
+        self.members: Dict[float, Set[int]] = {}
+        self.peak_of: Dict[int, float] = {}
+
+    def __len__(self):
+        return len(self.peak_of)
+
+    def add(self, position_id: int, price: float) -> None:
+        peak = self.sign * price
+        if peak not in self.members:
+            insort(self.peaks, peak)
+            self.members[peak] = set()
+        self.members[peak].add(position_id)
+        self.peak_of[position_id] = peak
+
+    def remove(self, position_id: int) -> None:
+        peak = self.peak_of.pop(position_id, None)
+        if peak is None:
+            return
+        members = self.members[peak]
+        members.discard(position_id)
+        if not members:
+            del self.members[peak]
+            del self.peaks[bisect_left(self.peaks, peak)]
+
+    def level(self, position_id: int) -> float:
+        return self.sign * self.peak_of[position_id] * self.factor
+
+    def update(self, price: float) -> List[Tuple[int, float]]:
+        """Move the stops with price; returns (position_id, stop level) of those hit"""
+        signed = self.sign * price
+        peaks = self.peaks
+        factor = self.factor
+
+        # Groups whose stop is at or beyond the price fire
+        start = bisect_left(peaks, signed / factor)
+        while start > 0 and peaks[start - 1] * factor >= signed:
+            start -= 1
+        while start < len(peaks) and peaks[start] * factor < signed:
+            start += 1
+        fired = []
+        for peak in peaks[start:]:
+            for position_id in self.members.pop(peak):
+                del self.peak_of[position_id]
+                fired.append((position_id, self.sign * peak * factor))
+        del peaks[start:]
+
+        # Groups below a new extreme are dragged up to it
+        end = bisect_left(peaks, signed)
+        if end:
+            merged = self.members.setdefault(signed, set())
+            for peak in peaks[:end]:
+                for position_id in self.members.pop(peak):
+                    merged.add(position_id)
+                    self.peak_of[position_id] = signed
+            del peaks[:end]
+            if not peaks or peaks[0] != signed:
+                peaks.insert(0, signed)
+        return fired
+
+class _SymbolTriggers:
+    """Trigger levels of one symbol in price-sorted lists"""
+
+    def __init__(self):
+        self.above: List[Tuple[float, int, str]] = []  # Fire when price >= level
+        self.below: List[Tuple[float, int, str]] = []  # Fire when price <= level
+        self.trailing: Dict[Tuple[int, float], _TrailingIndex] = {}
+        self.last_price: Optional[float] = None
+
+    def __len__(self):
+        return len(self.above) + len(self.below) + sum(len(index) for index in self.trailing.values())
+
+class TriggerEngine:
+    """
+    Take-profit, stop-loss and trailing-stop levels of open positions,
+    checked against every trade instead of polling prices over REST
+
+    Levels are kept per symbol in two sorted lists: those that fire when
+    the price rises to them (long take-profit, short stop-loss) and those
+    that fire when it falls to them (long stop-loss, short take-profit).
+    A tick finds everything it crossed with one bisection per list, so its
+    cost grows with the triggers fired, not with the positions open.
+    The legs of a position are one-cancels-other: the first to fire
+    removes the rest.
+    """
+
+    def __init__(self, on_trigger: Optional[Callable[[TriggerEvent], Any]] = None):
+        """
+        Args:
+            on_trigger: Function or coroutine function receiving each fired
+                TriggerEvent, e.g. to send the closing market order
+        """
+        self.on_trigger = on_trigger
+        self._symbols: Dict[str, _SymbolTriggers] = {}
+        self._positions: Dict[int, _Position] = {}
+        self._position_ids = itertools.count(1)
+        self.ticks = 0
+        self.fired = 0
+
+    def add(self, symbol: str, side: str, quantity: float, take_profit: Optional[float] = None,
+            stop_loss: Optional[float] = None, trailing: Optional[float] = None,
+            reference_price: Optional[float] = None, tag: Any = None) -> int:
+        """
+        Watch an open position
+
+        Args:
+            symbol: Trading pair
+            side: Side of the entry, 'BUY' for a long and 'SELL' for a short
+            quantity: Position size, passed through to the event
+            take_profit: Price to take profit at
+            stop_loss: Price to stop out at
+            trailing: Trailing stop distance as a fraction, e.g. 0.01 for 1%
+            reference_price: Price the trailing stop starts from, the last
+                traded price by default
+            tag: Anything to get back on the event, e.g. the entry order
+
+        Returns:
+            Position id for remove()
+        """
+        if side not in ('BUY', 'SELL'):
+            raise ValueError(f"Unknown side {side}")
+        if take_profit is None and stop_loss is None and trailing is None:
+            raise ValueError("Position needs at least one trigger")
+        if trailing is not None and not 0 < trailing < 1:
+            raise ValueError("Trailing distance must be a fraction between 0 and 1")
+
+        triggers = self._symbols.setdefault(symbol, _SymbolTriggers())
+        if trailing is not None:
+            reference_price = reference_price if reference_price is not None else triggers.last_price
+            if reference_price is None:
+                raise ValueError(f"No price seen for {symbol} yet, pass reference_price")
+
+        position_id = next(self._position_ids)
+        long = side == 'BUY'
+        if take_profit is not None:
+            insort(triggers.above if long else triggers.below, (take_profit, position_id, TAKE_PROFIT))
+        if stop_loss is not None:
+            insort(triggers.below if long else triggers.above, (stop_loss, position_id, STOP_LOSS))
+        if trailing is not None:
+            sign = 1 if long else -1
+            index = triggers.trailing.get((sign, trailing))
+            if index is None:
+                index = triggers.trailing[(sign, trailing)] = _TrailingIndex(trailing, sign)
+            index.add(position_id, reference_price)
+
+        self._positions[position_id] = _Position(position_id, symbol, side, quantity, take_profit,
+                                                 stop_loss, trailing, tag)
+        return position_id
+
+    def remove(self, position_id: int) -> bool:
+        """Stop watching a position, e.g. after closing it some other way"""
+        position = self._positions.pop(position_id, None)
+        if position is None:
+            return False
+
+        triggers = self._symbols[position.symbol]
+        long = position.side == 'BUY'
+        if position.take_profit is not None:
+            self._discard(triggers.above if long else triggers.below, (position.take_profit, position_id, TAKE_PROFIT))
+        if position.stop_loss is not None:
+            self._discard(triggers.below if long else triggers.above, (position.stop_loss, position_id, STOP_LOSS))
+        if position.trail is not None:
+            key = (1 if long else -1, position.trail)
+            index = triggers.trailing.get(key)
+            if index is not None:
+                index.remove(position_id)
+                if not len(index):
+                    del triggers.trailing[key]
+        return True
+
+    def check(self, symbol: str, price: float, time: Optional[int] = None) -> List[TriggerEvent]:
+        """Fire every trigger of symbol crossed at price; returns the events"""
+        triggers = self._symbols.get(symbol)
+        if triggers is None:
+            self._symbols[symbol] = triggers = _SymbolTriggers()
+        triggers.last_price = price
+        self.ticks += 1
+
+        hits: List[Tuple[int, str, float]] = []
+        end = bisect_right(triggers.above, (price, float('inf'), ''))
+        if end:
+            hits.extend((position_id, kind, level) for level, position_id, kind in triggers.above[:end])
+            del triggers.above[:end]
+        start = bisect_left(triggers.below, (price, -1, ''))
+        if start < len(triggers.below):
+            hits.extend((position_id, kind, level) for level, position_id, kind in triggers.below[start:])
+            del triggers.below[start:]
+        for index in list(triggers.trailing.values()):
+            hits.extend((position_id, TRAILING_STOP, level) for position_id, level in index.update(price))
+
+        events = []
+        for position_id, kind, level in hits:
+            position = self._positions.get(position_id)
+            if position is None:
+                continue  # Another leg of the same position fired on this tick
+            self.remove(position_id)
+            events.append(TriggerEvent(position_id, symbol, position.side, position.quantity, kind,
+                                       level, price, time, position.tag))
+        self.fired += len(events)
+        return events
+
+    async def on_trade(self, trade: Trade) -> None:
+        """Trade stream callback"""
+        if not isinstance(trade, Trade):
+            return
+        for event in self.check(trade.symbol, trade.price, trade.trade_time):
+            logger.info(f"{event.kind} hit for position {event.position_id} on {event.symbol} at {event.price}")
+            if not self.on_trigger:
+                continue
+            try:
+                result = self.on_trigger(event)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"Error handling trigger {event}: {e}")
+
+    def trailing_level(self, position_id: int) -> Optional[float]:
+        """Where a position's trailing stop currently is"""
+        position = self._positions.get(position_id)
+        if position is None or position.trail is None:
+            return None
+        key = (1 if position.side == 'BUY' else -1, position.trail)
+        return self._symbols[position.symbol].trailing[key].level(position_id)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def stats(self) -> dict:
+        return {
+            'positions': len(self._positions),
+            'triggers': {symbol: len(triggers) for symbol, triggers in self._symbols.items() if len(triggers)},
+            'ticks': self.ticks,
+            'fired': self.fired
+        }
+
+    @staticmethod
+    def _discard(levels: List[Tuple[float, int, str]], entry: Tuple[float, int, str]) -> None:
+        i = bisect_left(levels, entry)
+        if i < len(levels) and levels[i] == entry:
+            del levels[i]
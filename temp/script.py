@@ -10,6 +10,7 @@ import asyncio
 import websockets
 from dotenv import load_dotenv
 import os
+from binance_trader.trigger_engine import TAKE_PROFIT, TriggerEngine
 
 load_dotenv()
 
@@ -123,24 +124,15 @@ def place_take_profit_and_stop_loss(order_side, entry_price, take_profit_percent
         print(f"Take Profit Price: {take_profit_price_str}")
         print(f"Stop Loss Price: {stop_loss_price_str}")
 
-        # Размещение ордеров
-        take_profit_order = client.create_order(
+        # Размещение ордеров: обе ноги одним OCO-запросом
+        bracket_order = client.create_oco_order(
             symbol=SYMBOL,
             side=SIDE_SELL if order_side == SIDE_BUY else SIDE_BUY,
-            type=ORDER_TYPE_LIMIT,
-            price=take_profit_price_str,
             quantity=ORDER_SIZE,
-            timeInForce='GTC'
-        )
-
-        stop_loss_order = client.create_order(
-            symbol=SYMBOL,
-            side=SIDE_SELL if order_side == SIDE_BUY else SIDE_BUY,
-            type=ORDER_TYPE_STOP_LOSS_LIMIT,
-            price=stop_loss_price_str,
+            price=take_profit_price_str,
             stopPrice=stop_loss_price_str,
-            quantity=ORDER_SIZE,
-            timeInForce='GTC'
+            stopLimitPrice=stop_loss_price_str,
+            stopLimitTimeInForce='GTC'
         )
         print("Тейк-профит и стоп-лосс установлены!")
     except Exception as e:
@@ -148,35 +140,33 @@ def place_take_profit_and_stop_loss(order_side, entry_price, take_profit_percent
 
 # Мониторинг позиции
 def monitor_position(entry_price, side, take_profit_percent, stop_loss_percent):
-    """Следит за позицией и закрывает её при достижении условий"""
-    while True:
-        try:
-            current_price = fetch_price_data(SYMBOL, TIMEFRAME, limit=1)[-1]
-            if side == SIDE_BUY:
-                # Условие тейк-профита
-                if current_price >= entry_price * (1 + take_profit_percent):
-                    print(f"Цена достигла тейк-профита: {current_price}. Закрываем позицию.")
-                    place_order(SYMBOL, SIDE_SELL, ORDER_SIZE)
-                    break
-                # Условие стоп-лосса
-                elif current_price <= entry_price * (1 - stop_loss_percent):
-                    print(f"Цена достигла стоп-лосса: {current_price}. Закрываем позицию.")
-                    place_order(SYMBOL, SIDE_SELL, ORDER_SIZE)
-                    break
-            else:  # Если позиция SELL
-                if current_price <= entry_price * (1 - take_profit_percent):
-                    print(f"Цена достигла тейк-профита: {current_price}. Закрываем позицию.")
-                    place_order(SYMBOL, SIDE_BUY, ORDER_SIZE)
-                    break
-                elif current_price >= entry_price * (1 + stop_loss_percent):
-                    print(f"Цена достигла стоп-лосса: {current_price}. Закрываем позицию.")
-                    place_order(SYMBOL, SIDE_BUY, ORDER_SIZE)
-                    break
-
-            time.sleep(5)  # Проверяем каждые 5 секунд
-        except Exception as e:
-            print(f"Ошибка при мониторинге позиции: {e}")
-            break
+    """Следит за позицией по потоку сделок и закрывает её при достижении условий"""
+    asyncio.run(watch_position(entry_price, side, take_profit_percent, stop_loss_percent))
+
+async def watch_position(entry_price, side, take_profit_percent, stop_loss_percent):
+    """Проверяет уровни на каждой сделке вместо опроса REST раз в 5 секунд"""
+    direction = 1 if side == SIDE_BUY else -1
+    engine = TriggerEngine()
+    engine.add(
+        SYMBOL, side, ORDER_SIZE,
+        take_profit=entry_price * (1 + direction * take_profit_percent),
+        stop_loss=entry_price * (1 - direction * stop_loss_percent)
+    )
+
+    url = f"wss://testnet.binance.vision/ws/{SYMBOL.lower()}@trade"
+    try:
+        async with websockets.connect(url) as ws:
+            while True:
+                data = json.loads(await ws.recv())
+                if data.get("e") != "trade":
+                    continue
+                for event in engine.check(SYMBOL, float(data["p"]), data["T"]):
+                    name = "тейк-профита" if event.kind == TAKE_PROFIT else "стоп-лосса"
+                    print(f"Цена достигла {name}: {event.price}. Закрываем позицию.")
+                    place_order(SYMBOL, event.exit_side, event.quantity)
+                    return
+    except Exception as e:
+        print(f"Ошибка при мониторинге позиции: {e}")
 
 # Логика торговли
 def trade_logic():
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Both code trees are run as scripts from their own directory
+# (python3 src/main.py, binance_trader.main from temp/), so mirror that here
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, "src"), os.path.join(ROOT, "temp")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
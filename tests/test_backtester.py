@@ -0,0 +1,257 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from binance_trader.api.decoder import Kline, Trade
+from binance_trader.backtest.backtester import Backtester, SimulatedOrderError
+from binance_trader.backtest.matching_engine import (CANCELED, EXPIRED, FILLED, PARTIALLY_FILLED, REJECTED,
+                                                     MatchingEngine, Order)
+from binance_trader.strategies.base_strategy import BaseStrategy
+from binance_trader.trade_manager import TradeManager
+
+
+class Recorder:
+    def __init__(self):
+        self.executions = []
+
+    def __call__(self, order, execution_type, price, qty, commission, maker, time):
+        self.executions.append((order.order_id, execution_type, price, qty, maker, time))
+
+
+def engine_with(**options):
+    recorder = Recorder()
+    return MatchingEngine(maker_fee=0.001, taker_fee=0.002, on_execution=recorder, **options), recorder
+
+
+def test_market_order_fills_partially_across_prints():
+    engine, recorder = engine_with(participation=0.5)
+    engine.on_trade("BTCUSDT", 100.0, 1.0, 0)
+    order = Order(1, "BTCUSDT", "BUY", "MARKET", 3.0)
+    engine.submit(order, 0)
+
+    engine.on_trade("BTCUSDT", 101.0, 2.0, 10)
+    assert order.status == PARTIALLY_FILLED and order.executed_qty == 1.0
+    engine.on_trade("BTCUSDT", 102.0, 10.0, 20)
+
+    assert order.status == FILLED
+    assert order.fills == [(101.0, 1.0, 101.0 * 0.002, False), (102.0, 2.0, 204.0 * 0.002, False)]
+    assert [e[1] for e in recorder.executions] == ["NEW", "TRADE", "TRADE"]
+
+
+def test_latency_delays_orders_and_cancels():
+    engine, _ = engine_with(latency=lambda order: 50)
+    engine.on_trade("BTCUSDT", 100.0, 1.0, 0)
+    order = Order(1, "BTCUSDT", "SELL", "MARKET", 1.0)
+    engine.submit(order, 0)
+
+    engine.on_trade("BTCUSDT", 99.0, 1.0, 40)
+    assert order.executed_qty == 0
+    engine.on_trade("BTCUSDT", 98.0, 1.0, 50)
+    assert order.fills[0][0] == 98.0
+
+    limit = Order(2, "BTCUSDT", "BUY", "LIMIT", 1.0, price=90.0)
+    engine.submit(limit, 50)
+    engine.on_trade("BTCUSDT", 97.0, 1.0, 100)
+    engine.cancel(limit, 100)
+    engine.on_trade("BTCUSDT", 89.0, 1.0, 120)  # Cancel still in flight
+    assert limit.status == FILLED
+
+    late = Order(3, "BTCUSDT", "BUY", "LIMIT", 1.0, price=80.0)
+    engine.submit(late, 120)
+    engine.on_trade("BTCUSDT", 89.0, 1.0, 170)
+    engine.cancel(late, 170)
+    engine.on_trade("BTCUSDT", 89.0, 1.0, 220)
+    assert late.status == CANCELED
+
+
+def test_resting_limit_is_maker_and_marketable_limit_is_taker():
+    engine, recorder = engine_with()
+    engine.on_trade("BTCUSDT", 100.0, 1.0, 0)
+    resting = Order(1, "BTCUSDT", "BUY", "LIMIT", 1.0, price=99.0)
+    crossing = Order(2, "BTCUSDT", "SELL", "LIMIT", 1.0, price=95.0)
+    engine.submit(resting, 0)
+    engine.submit(crossing, 0)
+
+    engine.on_trade("BTCUSDT", 99.5, 5.0, 1)
+    assert crossing.fills == [(99.5, 1.0, 99.5 * 0.002, False)]
+    engine.on_trade("BTCUSDT", 99.0, 5.0, 2)
+    assert resting.executed_qty == 0  # Touch only
+    engine.on_trade("BTCUSDT", 98.9, 5.0, 3)
+    assert resting.fills == [(99.0, 1.0, 99.0 * 0.001, True)]
+
+    touch_engine, _ = engine_with(fill_at_touch=True)
+    touch_engine.on_trade("BTCUSDT", 100.0, 1.0, 0)
+    touched = Order(3, "BTCUSDT", "BUY", "LIMIT", 1.0, price=99.0)
+    touch_engine.submit(touched, 0)
+    touch_engine.on_trade("BTCUSDT", 99.0, 5.0, 1)
+    assert touched.status == FILLED
+
+
+def test_stop_loss_limit_triggers_and_oco_expires_other_leg():
+    engine, recorder = engine_with()
+    engine.on_trade("BTCUSDT", 100.0, 1.0, 0)
+    take_profit = Order(1, "BTCUSDT", "SELL", "LIMIT_MAKER", 1.0, price=110.0)
+    stop = Order(2, "BTCUSDT", "SELL", "STOP_LOSS_LIMIT", 1.0, price=94.0, stop_price=95.0)
+    take_profit.sibling, stop.sibling = stop, take_profit
+    engine.submit(take_profit, 0)
+    engine.submit(stop, 0)
+
+    engine.on_trade("BTCUSDT", 96.0, 1.0, 1)
+    assert stop.executed_qty == 0
+    engine.on_trade("BTCUSDT", 94.5, 1.0, 2)  # Triggers, limit 94 is marketable
+
+    assert stop.status == FILLED and stop.fills[0][0] == 94.5
+    assert take_profit.status == EXPIRED
+    engine.on_trade("BTCUSDT", 111.0, 1.0, 3)
+    assert take_profit.executed_qty == 0
+
+    maker = Order(3, "BTCUSDT", "BUY", "LIMIT_MAKER", 1.0, price=120.0)
+    engine.submit(maker, 3)
+    engine.on_trade("BTCUSDT", 111.0, 1.0, 4)
+    assert maker.status == REJECTED
+
+
+def test_bar_is_replayed_as_four_prints():
+    engine, _ = engine_with()
+    engine.on_trade("BTCUSDT", 100.0, 1.0, 0)
+    buy = Order(1, "BTCUSDT", "BUY", "LIMIT", 1.0, price=96.0)
+    sell = Order(2, "BTCUSDT", "SELL", "LIMIT", 1.0, price=104.0)
+    engine.submit(buy, 0)
+    engine.submit(sell, 0)
+
+    engine.on_bar("BTCUSDT", 60_000, 119_999, 100.0, 105.0, 95.0, 101.0, 8.0)
+
+    assert buy.status == FILLED and sell.status == FILLED
+    assert buy.updated_at > sell.updated_at  # The high comes first: it is nearer the open
+    assert engine.last_price("BTCUSDT") == 101.0
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_client_orders_update_balances():
+    async def scenario():
+        backtester = Backtester({"USDT": 1000.0}, maker_fee=0.0, taker_fee=0.001)
+        client = backtester.client
+        results = {}
+
+        async def on_trade(trade):
+            if trade.trade_id == 0:
+                results["buy"] = await client.place_order("BTCUSDT", "BUY", "MARKET", 2.0)
+                results["oco"] = await client.place_oco_order("BTCUSDT", "SELL", 2.0, price=110.0,
+                                                              stop_price=95.0, stop_limit_price=94.0)
+                results["balance"] = await client.get_account_balance()
+
+        await client.start_trade_socket("BTCUSDT", on_trade)
+        prices = [100.0, 101.0, 105.0, 111.0, 90.0]
+        report = await backtester.run(Trade("BTCUSDT", i, i, p, 5.0, i, False) for i, p in enumerate(prices))
+        return results, report
+
+    results, report = run(scenario())
+
+    assert results["buy"]["status"] == "FILLED"
+    assert float(results["buy"]["cummulativeQuoteQty"]) == 202.0
+    balances = {b["asset"]: (float(b["free"]), float(b["locked"])) for b in results["balance"]["balances"]}
+    assert balances["BTC"] == (0.0, 2.0)
+    assert balances["USDT"][0] == pytest.approx(1000 - 202 - 0.202)
+
+    # Take profit at 110 on the print at 111, stop leg expired
+    assert report["balances"]["BTC"] == pytest.approx(0.0)
+    assert report["balances"]["USDT"] == pytest.approx(1000 - 202.202 + 220)
+    assert report["filled_orders"] == 2 and report["orders"] == 3
+
+
+def test_client_rejects_what_the_exchange_would():
+    async def scenario():
+        backtester = Backtester({"USDT": 100.0})
+        client = backtester.client
+        errors = []
+
+        async def on_trade(trade):
+            if trade.trade_id:
+                return
+            for args in (("BUY", "MARKET", 10.0), ("SELL", "MARKET", 1.0), ("BUY", "LIMIT", 1.0)):
+                try:
+                    await client.place_order("BTCUSDT", *args)
+                except SimulatedOrderError as e:
+                    errors.append(e.code)
+            order = await client.place_order("BTCUSDT", "BUY", "LIMIT", 0.5, price=50.0)
+            cancelled = await client.cancel_order("BTCUSDT", order["orderId"])
+            errors.append(cancelled["status"])
+
+        await client.start_trade_socket("BTCUSDT", on_trade)
+        await backtester.run([Trade("BTCUSDT", 0, 0, 100.0, 1.0, 0, False),
+                              Trade("BTCUSDT", 1, 1, 100.0, 1.0, 1, False)])
+        return errors, backtester.account
+
+    errors, account = run(scenario())
+    assert errors == [-2010, -2010, -1102, CANCELED]
+    assert account.free["USDT"] == 100.0 and account.locked["USDT"] == 0.0
+
+
+class ThresholdStrategy(BaseStrategy):
+    """Long below 95, out above 105"""
+
+    def calculate_signals(self) -> dict:
+        return {'valid': True, 'close': self.candles.last('close')}
+
+    def should_enter_trade(self) -> bool:
+        return self.get_signals()['close'] < 95
+
+    def should_exit_trade(self) -> bool:
+        return self.get_signals()['close'] > 105
+
+
+def test_drives_trade_manager_unchanged():
+    closes = [100, 96, 94, 92, 97, 103, 106, 104, 93, 99, 108]
+
+    async def scenario():
+        backtester = Backtester({"USDT": 10_000.0}, taker_fee=0.001, latency=5)
+        manager = TradeManager(backtester.client)
+        manager.add_strategy("BTCUSDT", ThresholdStrategy(backtester.client, "BTCUSDT"))
+        await manager.start_trading()
+
+        bars = [Kline("BTCUSDT", "1m", i * 60_000 + 59_999, i * 60_000, i * 60_000 + 59_999,
+                      c, c + 0.5, c - 0.5, c, 1000.0, True) for i, c in enumerate(closes)]
+        report = await backtester.run(bars)
+        await manager.stop_trading()
+        return report, manager, backtester
+
+    report, manager, backtester = run(scenario())
+
+    # Entries after the closes at 94 and 93, exits after 106 and 108. The 5ms latency misses each next bar's
+    # open print, so orders fill at its high, the first extreme replayed.
+    orders = list(backtester.engine.orders.values())
+    assert [(o.side, o.status) for o in orders] == [("BUY", FILLED), ("SELL", FILLED), ("BUY", FILLED),
+                                                    ("SELL", EXPIRED)]
+    assert [o.fills[0][0] for o in orders[:3]] == [92.5, 104.5, 99.5]
+    assert "BTCUSDT" in manager.active_trades  # The last exit never filled
+    assert report["balances"]["BTC"] == pytest.approx(manager.active_trades["BTCUSDT"]["quantity"], abs=1e-8)
+
+
+def test_array_replay_throughput():
+    n = 200_000
+    rng = np.random.default_rng(1)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 1e-4, n)))
+    backtester = Backtester({"USDT": 1_000.0})
+    report = run(backtester.run_trades("BTCUSDT", np.arange(n), prices, np.ones(n)))
+    assert report["events"] == n and report["prints"] == n
+
+
+def test_orders_must_satisfy_the_lot_size_filter():
+    async def scenario():
+        backtester = Backtester({"USDT": 1_000.0}, step_size=0.001, min_qty=0.01)
+        errors = []
+        for quantity in (0.1025832342, 0.005):
+            try:
+                await backtester.client.place_order("BTCUSDT", "BUY", "LIMIT", quantity, price=90.0)
+            except SimulatedOrderError as e:
+                errors.append(e.code)
+        accepted = await backtester.client.place_order("BTCUSDT", "BUY", "LIMIT", 0.102, price=90.0)
+        return errors, accepted
+
+    errors, accepted = run(scenario())
+    assert errors == [-1013, -1013]
+    assert accepted["status"] == NEW
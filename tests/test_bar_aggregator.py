@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+
+from binance_trader.api.decoder import Kline, Trade
+from binance_trader.market.bar_aggregator import BarAggregator
+
+
+def trade(trade_id, time_ms, price, quantity=1.0):
+    return Trade("BTCUSDT", time_ms, trade_id, price, quantity, time_ms, False)
+
+
+def ohlcv(bar):
+    return (bar.open, bar.high, bar.low, bar.close, bar.volume)
+
+
+def test_time_bars_close_on_next_bucket():
+    aggregator = BarAggregator("BTCUSDT", "time", 1)
+    trades = [trade(1, 1000, 10), trade(2, 1400, 12), trade(3, 1900, 9), trade(4, 2100, 11), trade(5, 4500, 13)]
+
+    closed = [bar for t in trades for bar in aggregator.add(t)]
+
+    assert [(b.open_time, b.close_time) for b in closed] == [(1000, 1999), (2000, 2999)]
+    assert ohlcv(closed[0]) == (10, 12, 9, 9, 3.0)
+    assert ohlcv(closed[1]) == (11, 11, 11, 11, 1.0)
+    assert all(isinstance(b, Kline) and b.is_closed and b.interval == "1s" for b in closed)
+
+    # Nothing traded since 4500: the clock closes the bar
+    assert aggregator.flush(now=5000) == []
+    flushed = aggregator.flush(now=5600)
+    assert [(b.open_time, b.close) for b in flushed] == [(4000, 13)]
+
+
+def test_n_second_bars_align_to_the_clock():
+    aggregator = BarAggregator("BTCUSDT", "time", 5)
+    closed = [bar for i, t in enumerate(range(3000, 16000, 1000)) for bar in aggregator.add(trade(i, t, 100 + i))]
+
+    assert [(b.open_time, b.close_time, b.open, b.close) for b in closed] == [
+        (0, 4999, 100, 101), (5000, 9999, 102, 106), (10000, 14999, 107, 111)]
+
+
+@pytest.mark.parametrize("bar_type, size, volumes", [
+    ("tick", 3, [5.5, 7.5]),
+    ("volume", 4.0, [4.5, 4.0, 4.5]),
+    ("dollar", 900.0, [9.0]),
+])
+def test_activity_bars(bar_type, size, volumes):
+    aggregator = BarAggregator("BTCUSDT", bar_type, size)
+    quantities = [2.0, 2.5, 1.0, 3.0, 0.5, 4.0, 1.0]
+    closed = [bar for i, q in enumerate(quantities) for bar in aggregator.add(trade(i, i * 10, 100.0, q))]
+
+    assert [bar.volume for bar in closed] == volumes
+    assert closed[0].open_time == 0
+
+
+def test_out_of_order_trades_are_reordered():
+    aggregator = BarAggregator("BTCUSDT", "tick", 4)
+    arrival = [trade(1, 10, 1), trade(3, 30, 3), trade(2, 20, 2), trade(5, 50, 5), trade(4, 40, 4)]
+
+    closed = [bar for t in arrival for bar in aggregator.add(t)]
+
+    assert [ohlcv(b)[:4] for b in closed] == [(1, 4, 1, 4)]
+    assert aggregator.late == 0 and aggregator.gaps == 0
+
+    # Duplicate of an aggregated trade
+    assert aggregator.add(trade(3, 30, 3)) == []
+    assert aggregator.late == 1
+
+
+def test_missing_trade_is_skipped_after_reorder_window():
+    aggregator = BarAggregator("BTCUSDT", "tick", 2, reorder_window=2)
+    closed = [bar for t in [trade(1, 10, 1), trade(3, 30, 3), trade(4, 40, 4)] for bar in aggregator.add(t)]
+    assert closed == [] and aggregator.stats()["held"] == 2
+
+    closed = aggregator.add(trade(5, 50, 5))
+    assert [(b.open, b.close) for b in closed] == [(1, 3), (4, 5)]
+    assert aggregator.gaps == 1
+
+    # Too late now
+    assert aggregator.add(trade(2, 20, 2)) == []
+    assert aggregator.late == 1
+
+
+def test_missing_trade_is_skipped_after_max_delay():
+    aggregator = BarAggregator("BTCUSDT", "time", 1, max_delay=0.5)
+    aggregator.add(trade(1, 1000, 1))
+    aggregator.add(trade(3, 1200, 3))
+
+    assert aggregator.flush(now=1500) == []
+    assert aggregator.flush(now=1700) == []  # Trade 3 released into the open bar
+    closed = aggregator.flush(now=2500)
+    assert [ohlcv(b)[:4] for b in closed] == [(1, 3, 1, 3)]
+    assert aggregator.gaps == 1
+
+
+def test_on_trade_emits_bars_to_callback():
+    received = []
+
+    async def on_bar(bar):
+        received.append(bar)
+
+    async def scenario():
+        aggregator = BarAggregator("BTCUSDT", "tick", 2, on_bar=on_bar)
+        for i in range(5):
+            await aggregator.on_trade(trade(i, i, float(i)))
+        await aggregator.on_trade(Trade("ETHUSDT", 0, 99, 1.0, 1.0, 0, False))
+        return aggregator
+
+    aggregator = asyncio.run(scenario())
+    assert [(b.open, b.close) for b in received] == [(0, 1), (2, 3)]
+    assert aggregator.trades == 5
+
+
+def test_invalid_configuration():
+    with pytest.raises(ValueError):
+        BarAggregator("BTCUSDT", "renko")
+    with pytest.raises(ValueError):
+        BarAggregator("BTCUSDT", "tick", 2.5)
@@ -0,0 +1,53 @@
+import asyncio
+
+from binance_trader.api.decoder import Kline
+from binance_trader.strategies.base_strategy import BaseStrategy
+
+
+class CountingStrategy(BaseStrategy):
+    def __init__(self):
+        super().__init__(client=None, symbol='TRXUSDT')
+        self.calculations = 0
+
+    def calculate_signals(self) -> dict:
+        self.calculations += 1
+        return {'valid': True, 'close': self.candles.last('close')}
+
+    def should_enter_trade(self) -> bool:
+        return self.get_signals()['close'] > 1
+
+    def should_exit_trade(self) -> bool:
+        return self.get_signals()['close'] < 1
+
+
+def add_candle(strategy, open_time, close):
+    asyncio.run(strategy.process_candle(
+        Kline('TRXUSDT', '1m', open_time + 60000, open_time, open_time + 59999, close, close, close, close, 1.0, True)
+    ))
+
+
+def test_signals_are_computed_once_per_candle():
+    strategy = CountingStrategy()
+    add_candle(strategy, 0, 2.0)
+
+    assert strategy.should_enter_trade()
+    assert not strategy.should_exit_trade()
+    strategy.get_signals()
+    assert strategy.calculations == 1
+
+    add_candle(strategy, 60000, 0.5)
+
+    assert strategy.should_exit_trade()
+    assert strategy.get_signals()['close'] == 0.5
+    assert strategy.calculations == 2
+
+
+def test_new_data_for_the_same_open_time_invalidates_signals():
+    strategy = CountingStrategy()
+    add_candle(strategy, 0, 2.0)
+    strategy.get_signals()
+
+    add_candle(strategy, 0, 3.0)
+
+    assert strategy.get_signals()['close'] == 3.0
+    assert strategy.calculations == 2
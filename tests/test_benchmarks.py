@@ -0,0 +1,43 @@
+import json
+
+from benchmarks.harness import Benchmark, compare, measure
+from benchmarks.run import main
+
+
+def test_measure_reports_time_per_operation():
+    calls = []
+    result = measure(Benchmark("append", lambda: lambda: calls.append(1)), repeat=3, min_time=0.001)
+
+    assert result["iterations"] >= 1 and result["repeat"] == 3
+    assert 0 < result["min_ns"] <= result["median_ns"]
+    assert len(calls) >= 4 * result["iterations"]
+
+
+def test_compare_flags_slowdowns_past_the_threshold():
+    baseline = {"results": {"a": {"median_ns": 100.0}, "b": {"median_ns": 100.0}, "gone": {"median_ns": 1.0}}}
+    current = {"results": {"a": {"median_ns": 109.0}, "b": {"median_ns": 125.0}, "new": {"median_ns": 1.0}}}
+
+    comparison = compare(current, baseline, threshold=0.1)
+
+    assert set(comparison) == {"a", "b"}
+    assert not comparison["a"]["regressed"]
+    assert comparison["b"]["regressed"] and abs(comparison["b"]["change"] - 0.25) < 1e-12
+
+
+def test_run_saves_results_and_fails_on_regression(tmp_path, capsys):
+    output, baseline = str(tmp_path / "latest.json"), str(tmp_path / "baseline.json")
+    options = ["-k", "rest.sign_payload", "-k", "decode.trade", "--repeat", "2", "--min-time", "0.001",
+               "--output", output, "--baseline", baseline]
+
+    assert main(options + ["--save-baseline"]) == 0
+    with open(baseline) as f:
+        saved = json.load(f)
+    assert set(saved["results"]) == {"rest.sign_payload", "decode.trade"}
+    assert main(options + ["--threshold", "10"]) == 0
+
+    for result in saved["results"].values():
+        result["median_ns"] /= 1000
+    with open(baseline, "w") as f:
+        json.dump(saved, f)
+    assert main(options) == 1
+    assert "REGRESSION" in capsys.readouterr().out
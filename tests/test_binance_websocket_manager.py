@@ -0,0 +1,97 @@
+import asyncio
+import json
+
+import websockets
+
+from binance_trader.api.websocket_manager import WebSocketManager
+
+
+class CombinedStreamServer:
+    """Local stand-in for the exchange's /stream endpoint"""
+
+    def __init__(self):
+        self.sockets = []
+        self.requests = []
+
+    async def handler(self, websocket):
+        self.sockets.append(websocket)
+        websocket.streams = set()
+        async for message in websocket:
+            request = json.loads(message)
+            self.requests.append((len(self.sockets) - 1, request))
+            if request["method"] == "SUBSCRIBE":
+                websocket.streams.update(request["params"])
+            else:
+                websocket.streams.difference_update(request["params"])
+            await websocket.send(json.dumps({"result": None, "id": request["id"]}))
+
+    async def publish(self, stream, data):
+        for websocket in self.sockets:
+            if stream in websocket.streams:
+                await websocket.send(json.dumps({"stream": stream, "data": data}))
+
+
+def run_with_server(scenario):
+    async def main():
+        server = CombinedStreamServer()
+        async with websockets.serve(server.handler, "127.0.0.1", 0) as ws_server:
+            port = ws_server.sockets[0].getsockname()[1]
+            manager = WebSocketManager(max_streams_per_connection=2)
+            manager.WEBSOCKET_BASE_URL = f"ws://127.0.0.1:{port}/stream"
+            manager.CONTROL_MESSAGE_INTERVAL = 0.01
+            try:
+                return await scenario(server, manager)
+            finally:
+                await manager.close()
+
+    return asyncio.run(main())
+
+
+async def settle():
+    await asyncio.sleep(0.1)
+
+
+def test_streams_are_sharded_and_batched():
+    async def scenario(server, manager):
+        received = []
+        streams = [f"sym{i}usdt@kline_1m" for i in range(5)]
+        for stream in streams:
+            await manager.connect_socket(stream, received.append)
+        await settle()
+
+        for stream in streams:
+            await server.publish(stream, {"s": stream})
+        await settle()
+        return server, received
+
+    server, received = run_with_server(scenario)
+
+    assert len(server.sockets) == 3
+    assert [(conn, r["params"]) for conn, r in server.requests] == [
+        (0, ["sym0usdt@kline_1m", "sym1usdt@kline_1m"]),
+        (1, ["sym2usdt@kline_1m", "sym3usdt@kline_1m"]),
+        (2, ["sym4usdt@kline_1m"]),
+    ]
+    assert sorted(msg["s"] for msg in received) == [f"sym{i}usdt@kline_1m" for i in range(5)]
+
+
+def test_unsubscribe_stops_routing_and_frees_room():
+    async def scenario(server, manager):
+        first, second = [], []
+        await manager.subscribe(["a@trade", "b@trade"], first.append)
+        await settle()
+        await manager.unsubscribe(["a@trade"])
+        await manager.connect_socket("c@trade", second.append)
+        await settle()
+
+        for stream in ("a@trade", "b@trade", "c@trade"):
+            await server.publish(stream, {"s": stream})
+        await settle()
+        return server, manager, first, second
+
+    server, manager, first, second = run_with_server(scenario)
+
+    assert len(server.sockets) == 1
+    assert [r["method"] for _, r in server.requests] == ["SUBSCRIBE", "UNSUBSCRIBE", "SUBSCRIBE"]
+    assert [msg["s"] for msg in first] == ["b@trade"]
+    assert [msg["s"] for msg in second] == ["c@trade"]
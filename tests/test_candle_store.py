@@ -0,0 +1,42 @@
+import numpy as np
+
+from binance_trader.strategies.candle_store import CandleStore
+
+
+def candle(i):
+    return {'timestamp': i * 60000, 'open': i, 'high': i + 1, 'low': i - 1, 'close': i + 0.5, 'volume': 10 * i}
+
+
+def test_keeps_last_capacity_candles_in_order():
+    store = CandleStore(capacity=5)
+    for i in range(12):
+        store.append(candle(i))
+
+    assert len(store) == 5
+    assert store.column('close').tolist() == [7.5, 8.5, 9.5, 10.5, 11.5]
+    assert store.column('close', 2).tolist() == [10.5, 11.5]
+    assert store.last('volume') == 110
+    assert store.last('volume', offset=4) == 70
+
+
+def test_columns_are_read_only_views():
+    store = CandleStore(capacity=3)
+    for i in range(4):
+        store.append(candle(i))
+
+    closes = store.column('close')
+
+    assert np.shares_memory(closes, store._buffer)
+    assert not closes.flags.writeable
+
+
+def test_frame_is_rebuilt_only_after_append():
+    store = CandleStore(capacity=3)
+    store.append(candle(1))
+
+    frame = store.to_frame()
+    assert store.to_frame() is frame
+    assert frame['timestamp'].tolist() == [60000]
+
+    store.append(candle(2))
+    assert store.to_frame()['close'].tolist() == [1.5, 2.5]
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+import pytest
+
+from binance_trader.api.client import BinanceClient
+from binance_trader.config import Config
+from simulation.mock_exchange import MockExchange
+
+
+@pytest.fixture
+def mock_config(monkeypatch):
+    def point_at(exchange):
+        for name, value in (("API_KEY", "mock"), ("API_SECRET", "mock"), ("USE_TESTNET", False),
+                            ("REST_BASE_URL", exchange.rest_url), ("STREAM_BASE_URL", exchange.stream_url),
+                            ("STREAM_RECORD_DIR", None)):
+            monkeypatch.setattr(Config, name, value)
+    return point_at
+
+
+def test_orders_run_concurrently_without_stalling_streams(mock_config):
+    symbols = ["BTCUSDT", "S0001USDT", "S0002USDT"]
+
+    async def scenario():
+        exchange = MockExchange(len(symbols), trade_rate=100, rest_latency=0.3)
+        async with exchange:
+            mock_config(exchange)
+            client = await BinanceClient.create()
+            arrivals = []
+            try:
+                for symbol in symbols:
+                    await client.start_trade_socket(symbol, lambda trade: arrivals.append(time.perf_counter()))
+                await asyncio.sleep(0.5)
+
+                started = time.perf_counter()
+                orders = await asyncio.gather(*(client.place_order(symbol, "BUY", "MARKET", 1) for symbol in symbols),
+                                              client.get_account_balance())
+                elapsed = time.perf_counter() - started
+            finally:
+                await client.close_all_connections()
+        during = [t for t in arrivals if started < t < started + elapsed]
+        return orders, elapsed, during
+
+    orders, elapsed, during = asyncio.run(scenario())
+
+    assert [order["status"] for order in orders[:3]] == ["FILLED"] * 3
+    assert {balance["asset"] for balance in orders[3]["balances"]} >= {"USDT"}
+    assert elapsed < 0.6  # Four 0.3s round trips at once, not one after another
+    assert len(during) > 20  # Trades kept arriving while the orders were out
+
+
+def test_create_fails_when_the_exchange_is_unreachable(mock_config):
+    async def scenario():
+        exchange = MockExchange()
+        async with exchange:
+            mock_config(exchange)
+        # Stopped: nothing listens on its port any more
+        with pytest.raises(Exception):
+            await BinanceClient.create()
+
+    asyncio.run(scenario())
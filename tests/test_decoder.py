@@ -0,0 +1,48 @@
+import json
+
+from binance_trader.api.decoder import DepthUpdate, Kline, Ticker, Trade, decode_payload, loads, peek_stream
+
+KLINE = {
+    "e": "kline", "E": 1700000060001, "s": "TRXUSDT",
+    "k": {"t": 1700000000000, "T": 1700000059999, "s": "TRXUSDT", "i": "1m",
+          "o": "0.10", "c": "0.11", "h": "0.12", "l": "0.09", "v": "1500.5", "x": True}
+}
+
+
+def test_kline_is_decoded_into_typed_record():
+    kline = decode_payload(KLINE)
+
+    assert isinstance(kline, Kline)
+    assert (kline.symbol, kline.interval, kline.open_time, kline.is_closed) == ("TRXUSDT", "1m", 1700000000000, True)
+    assert (kline.open, kline.high, kline.low, kline.close, kline.volume) == (0.10, 0.12, 0.09, 0.11, 1500.5)
+    assert not hasattr(kline, "__dict__")
+
+
+def test_trade_ticker_and_depth_records():
+    trade = decode_payload({"e": "trade", "E": 2, "s": "BTCUSDT", "t": 9, "p": "100.5", "q": "0.2", "T": 1, "m": True})
+    ticker = decode_payload({"e": "24hrTicker", "E": 3, "s": "BTCUSDT", "c": "101", "o": "99",
+                             "h": "102", "l": "98", "v": "10", "q": "1000"})
+    depth = decode_payload({"e": "depthUpdate", "E": 4, "s": "BTCUSDT", "U": 5, "u": 7,
+                            "b": [["100.0", "1.5"]], "a": [["101.0", "0"]]})
+
+    assert isinstance(trade, Trade) and (trade.price, trade.quantity, trade.is_buyer_maker) == (100.5, 0.2, True)
+    assert isinstance(ticker, Ticker) and ticker.last_price == 101.0
+    assert isinstance(depth, DepthUpdate)
+    assert (depth.first_update_id, depth.final_update_id) == (5, 7)
+    assert (depth.bids, depth.asks) == ([(100.0, 1.5)], [(101.0, 0.0)])
+
+
+def test_unknown_payloads_pass_through():
+    payload = {"e": "bookTickerLike", "x": 1}
+
+    assert decode_payload(payload) is payload
+
+
+def test_peek_stream_reads_name_without_parsing():
+    frame = json.dumps({"stream": "trxusdt@kline_1m", "data": KLINE}, separators=(",", ":"))
+
+    assert peek_stream(frame) == "trxusdt@kline_1m"
+    assert peek_stream(frame.encode()) == "trxusdt@kline_1m"
+    assert peek_stream('{"result":null,"id":1}') is None
+    assert loads(frame)["data"] == KLINE
+    assert peek_stream('{"stream": "a@trade", "data": {}}') == "a@trade"
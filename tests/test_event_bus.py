@@ -0,0 +1,95 @@
+import asyncio
+
+from binance_trader.api.decoder import Ticker
+from binance_trader.event_bus import EventBus
+
+
+def ticker(symbol, price):
+    return Ticker(symbol, 0, price, price, price, price, 1.0, price)
+
+
+def test_drop_oldest_keeps_newest_events():
+    async def scenario():
+        bus = EventBus()
+        received = []
+        gate = asyncio.Event()
+
+        async def slow(event):
+            await gate.wait()
+            received.append(event)
+
+        subscription = bus.subscribe(["trades"], slow, maxsize=2, policy="drop_oldest")
+        for i in range(6):
+            await bus.publish("trades", i)
+            await asyncio.sleep(0)
+        stats = bus.stats()[subscription.name]
+        gate.set()
+        await asyncio.sleep(0.01)
+        await bus.close()
+        return received, stats
+
+    received, stats = asyncio.run(scenario())
+
+    # Event 0 was already taken by the consumer when it blocked
+    assert received == [0, 4, 5]
+    assert stats["dropped"] == 3
+    assert stats["depth"] == 2 and stats["max_depth"] == 2
+
+
+def test_conflate_keeps_latest_per_symbol():
+    async def scenario():
+        bus = EventBus()
+        received = []
+        gate = asyncio.Event()
+
+        async def slow(event):
+            await gate.wait()
+            received.append((event.symbol, event.last_price))
+
+        subscription = bus.subscribe(["*"], slow, policy="conflate")
+        await bus.publish("btcusdt@ticker", ticker("BTCUSDT", 1))
+        await asyncio.sleep(0)
+        for price in (2, 3, 4):
+            await bus.publish("btcusdt@ticker", ticker("BTCUSDT", price))
+            await bus.publish("ethusdt@ticker", ticker("ETHUSDT", price * 10))
+        gate.set()
+        await asyncio.sleep(0.01)
+        stats = subscription.stats()
+        await bus.close()
+        return received, stats
+
+    received, stats = asyncio.run(scenario())
+
+    assert received == [("BTCUSDT", 1), ("BTCUSDT", 4), ("ETHUSDT", 40)]
+    assert stats["conflated"] == 4
+
+
+def test_block_applies_backpressure_without_stalling_others():
+    async def scenario():
+        bus = EventBus()
+        fast = []
+        gate = asyncio.Event()
+
+        async def slow(event):
+            await gate.wait()
+
+        bus.subscribe(["a"], slow, maxsize=1, policy="block")
+        bus.subscribe(["b"], fast.append)
+
+        await bus.publish("a", 1)
+        await asyncio.sleep(0)  # Consumer takes event 1 and blocks on it
+        await bus.publish("a", 2)  # Fills the queue
+        blocked = asyncio.ensure_future(bus.publish("a", 3))
+        await bus.publish("b", "x")
+        await asyncio.sleep(0.01)
+        was_blocked = not blocked.done()
+
+        gate.set()
+        await asyncio.wait_for(blocked, 1)
+        await bus.close()
+        return was_blocked, fast
+
+    was_blocked, fast = asyncio.run(scenario())
+
+    assert was_blocked
+    assert fast == ["x"]
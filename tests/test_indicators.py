@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from binance_trader.strategies.indicators import EMA, MACD, RSI, SMA, BollingerBands
+
+
+def closes(size=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(30000 + np.cumsum(rng.normal(scale=5, size=size)))
+
+
+def run(indicator, values):
+    return [indicator.update(value) for value in values]
+
+
+def test_moving_averages_match_pandas():
+    close = closes()
+
+    assert np.allclose(run(SMA(20), close), close.rolling(20).mean(), equal_nan=True)
+    assert run(EMA(20), close) == close.ewm(span=20, adjust=False).mean().tolist()
+
+
+def test_sma_rsi_matches_legacy_calculation():
+    close = closes()
+    delta = close.diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
+
+    assert np.allclose(run(RSI(14, smoothing='sma'), close), 100 - 100 / (1 + gain / loss), equal_nan=True)
+
+
+def test_wilder_rsi_is_ready_after_period_changes():
+    rsi = RSI(3)
+    values = run(rsi, [1.0, 2.0, 3.0, 2.0, 3.0])
+
+    assert np.isnan(values[2])
+    assert values[3] == 100 - 100 / (1 + (2 / 3) / (1 / 3))
+    assert values[4] == 100 - 100 / (1 + ((2 / 3) * 2 + 1) / 3 / ((1 / 3) * 2 / 3))
+
+
+def test_macd_and_bollinger_match_pandas():
+    close = closes()
+    macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+    mid, std = close.rolling(20).mean(), close.rolling(20).std()
+
+    macd_values = run(MACD(), close)
+    bands = run(BollingerBands(20), close)
+
+    assert np.allclose([m for m, _ in macd_values], macd)
+    assert np.allclose([s for _, s in macd_values], macd.ewm(span=9, adjust=False).mean())
+    assert np.allclose([b[1] for b in bands], mid + 2 * std, equal_nan=True)
+    assert np.allclose([b[2] for b in bands], mid - 2 * std, equal_nan=True)
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pytest
+
+from data.kline_downloader import KlineDownloader
+from data.kline_store import KlineStore, interval_ms, rows_to_columns
+
+MINUTE = 60_000
+START = 1_704_067_200_000  # 2024-01-01 00:00 UTC
+
+
+class KlineServer:
+    """Local stand-in for GET /api/v3/klines with deterministic prices"""
+
+    def __init__(self, throttle_first=0):
+        self.requests = []
+        self.throttle_left = throttle_first
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                server.requests.append(query)
+                if server.throttle_left:
+                    server.throttle_left -= 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+
+                step = interval_ms(query["interval"])
+                start, end = int(query["startTime"]), int(query["endTime"])
+                first = start + -start % step
+                rows = [server.kline(t, step) for t in range(first, end + 1, step)][:int(query["limit"])]
+                body = json.dumps(rows).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("X-MBX-USED-WEIGHT-1M", str(2 * len(server.requests)))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/api"
+
+    @staticmethod
+    def kline(open_time, step):
+        price = 100 + (open_time // step) % 50
+        return [open_time, f"{price}", f"{price + 1}", f"{price - 1}", f"{price + 0.5}", "10.0",
+                open_time + step - 1, "1000.0", 42, "5.0", "500.0", "0"]
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def test_download_many_series_then_resume(tmp_path):
+    store = KlineStore(str(tmp_path))
+    end = START + 2500 * MINUTE
+
+    with KlineServer() as server:
+        downloader = KlineDownloader(store, max_concurrency=4, base_url=server.url)
+        written = asyncio.run(downloader.download(["btcusdt", "ETHUSDT"], ["1m", "1h"], START, end))
+        assert written == {"BTCUSDT 1m": 2500, "BTCUSDT 1h": 42, "ETHUSDT 1m": 2500, "ETHUSDT 1h": 42}
+        assert len(server.requests) == 3 + 1 + 3 + 1
+
+        later = end + 1200 * MINUTE
+        written = asyncio.run(downloader.download(["BTCUSDT"], ["1m"], START, later))
+        assert written == {"BTCUSDT 1m": 1200}
+        assert [int(r["startTime"]) for r in server.requests[8:]] == [end, end + 1000 * MINUTE]
+
+    columns = store.load_columns("BTCUSDT", "1m")
+    np.testing.assert_array_equal(columns["open_time"], np.arange(START, later, MINUTE))
+    assert columns["trades"].dtype == np.int64 and columns["close"][0] == float(KlineServer.kline(START, MINUTE)[4])
+    assert store.last_open_time("BTCUSDT", "1m") == later - MINUTE
+
+
+def test_throttled_requests_are_retried(tmp_path):
+    store = KlineStore(str(tmp_path))
+    with KlineServer(throttle_first=2) as server:
+        downloader = KlineDownloader(store, base_url=server.url)
+        written = asyncio.run(downloader.download(["BTCUSDT"], ["1m"], START, START + 10 * MINUTE))
+    assert written == {"BTCUSDT 1m": 10}
+    assert len(server.requests) == 3
+
+
+def test_store_merges_and_loads_ranges_across_months(tmp_path):
+    store = KlineStore(str(tmp_path))
+    step = interval_ms("1h")
+    january_end = START + 31 * 24 * step
+
+    def columns(times):
+        rows = [KlineServer.kline(t, step) for t in times]
+        return rows_to_columns(rows)
+
+    store.write("BTCUSDT", "1h", columns(range(january_end - 10 * step, january_end + 10 * step, step)))
+    # Overlapping rewrite: the newer rows win, nothing is duplicated
+    rewritten = columns(range(january_end - 2 * step, january_end + 2 * step, step))
+    rewritten["close"][:] = 1.0
+    store.write("BTCUSDT", "1h", rewritten)
+
+    assert sorted(p.name for p in (tmp_path / "BTCUSDT" / "1h").iterdir()) == ["2024-01.npz", "2024-02.npz"]
+    frame = store.load("BTCUSDT", "1h")
+    assert len(frame) == 20 and frame.index.is_monotonic_increasing
+    assert (frame["close"].iloc[8:12] == 1.0).all()
+
+    february = store.load_columns("BTCUSDT", "1h", start=january_end, end=january_end + 3 * step)
+    assert february["open_time"].tolist() == [january_end, january_end + step, january_end + 2 * step]
+
+
+def test_unsupported_interval():
+    with pytest.raises(ValueError):
+        interval_ms("1M")
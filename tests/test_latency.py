@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from binance_trader.api.websocket_manager import WebSocketManager
+from binance_trader.latency import Histogram, LatencyTracer, stamp
+from binance_trader.strategies.base_strategy import BaseStrategy
+from binance_trader.trade_manager import TradeManager
+
+
+def test_histogram_percentiles_within_precision():
+    histogram = Histogram(bits=8)
+    for value in range(1, 1_000_001):
+        histogram.record(value * 1000)
+
+    for percent in (50, 90, 99, 99.9):
+        exact = percent / 100 * 1_000_000 * 1000
+        assert histogram.percentile(percent) == pytest.approx(exact, rel=2 ** -7)
+    assert histogram.percentile(100) == histogram.max == 10 ** 9
+    assert histogram.min == 1000 and histogram.mean == pytest.approx(500_000.5 * 1000)
+
+    other = Histogram(bits=8)
+    other.record(5 * 10 ** 9)
+    histogram.merge(other)
+    assert histogram.count == 1_000_001 and histogram.max == 5 * 10 ** 9
+
+
+def test_values_past_highest_keep_exact_max():
+    histogram = Histogram(bits=4, highest=1000)
+    histogram.record(10 ** 6)
+    histogram.record(3)
+    assert histogram.percentile(50) == 3
+    assert histogram.percentile(100) == 10 ** 6
+
+
+class IdleSocket:
+    async def recv(self):
+        await asyncio.Event().wait()
+
+    async def send(self, message):
+        pass
+
+    async def close(self):
+        pass
+
+
+async def idle_connect(url):
+    return IdleSocket()
+
+
+class StampingClient:
+    """Stamps the two order stages where BinanceClient.place_order does"""
+
+    async def get_free_balance(self, asset):
+        return 1000.0
+
+    async def get_trading_rules(self, symbol):
+        return {'base_asset': symbol[:-4], 'quote_asset': symbol[-4:], 'step_size': 0.001, 'min_qty': 0.001}
+
+    async def place_order(self, symbol, side, order_type, quantity, price=None):
+        stamp('rate_limit')
+        await asyncio.sleep(0.01)
+        stamp('rest')
+        return {'orderId': 1, 'status': 'FILLED', 'price': '0.0', 'executedQty': str(quantity),
+                'cummulativeQuoteQty': str(quantity * 100)}
+
+
+class AlwaysStrategy(BaseStrategy):
+    def calculate_signals(self) -> dict:
+        return {'valid': True}
+
+    def should_enter_trade(self) -> bool:
+        return True
+
+    def should_exit_trade(self) -> bool:
+        return True
+
+
+def kline_frame(symbol, i, closed=True):
+    return json.dumps({'stream': f"{symbol.lower()}@kline_1m", 'data': {
+        'e': 'kline', 'E': i * 60_000, 's': symbol, 'k': {
+            't': i * 60_000, 'T': i * 60_000 + 59_999, 's': symbol, 'i': '1m', 'o': '100', 'c': '100',
+            'h': '101', 'l': '99', 'v': '1', 'x': closed}}})
+
+
+def test_traces_klines_from_feed_to_order_ack():
+    async def scenario():
+        tracer = LatencyTracer()
+        manager = WebSocketManager(connect=idle_connect, tracer=tracer)
+        trade_manager = TradeManager(StampingClient())
+        for symbol in ('BTCUSDT', 'ETHUSDT'):
+            trade_manager.add_strategy(symbol, AlwaysStrategy(None, symbol))
+            await manager.connect_socket(f"{symbol.lower()}@kline_1m", trade_manager._handle_kline_data)
+
+        for i in range(4):
+            await manager.feed(kline_frame('BTCUSDT', i))
+            await manager.feed(kline_frame('ETHUSDT', i, closed=False))
+        await asyncio.sleep(0.2)
+        await manager.close()
+        return tracer
+
+    tracer = asyncio.run(scenario())
+    snapshot = tracer.snapshot()
+
+    assert snapshot['decode']['BTCUSDT']['count'] == 4 and snapshot['decode']['ETHUSDT']['count'] == 4
+    assert snapshot['queue']['ETHUSDT']['count'] == 4
+    assert 'ETHUSDT' not in snapshot['strategy']  # Open candles never reach a decision
+    assert snapshot['strategy']['BTCUSDT']['count'] == 4  # Enter, exit, enter, exit
+    assert snapshot['rest']['BTCUSDT']['count'] == 4
+    assert snapshot['rest']['BTCUSDT']['p50'] >= 10 ** 7
+    tick_to_trade = snapshot['tick_to_trade']['BTCUSDT']
+    assert tick_to_trade['count'] == 4 and tick_to_trade['p50'] >= snapshot['rest']['BTCUSDT']['p50']
+    assert tracer.histogram('decode').count == 8
+
+
+def test_serves_prometheus_metrics_and_logs_summaries(caplog):
+    async def scenario():
+        tracer = LatencyTracer()
+        for ns in (1_000, 2_000, 4_000_000):
+            tracer.record('rest', 'BTCUSDT', ns)
+        tracer.record('decode', 'ETHUSDT', 500)
+        with caplog.at_level('INFO', logger='binance_trader.latency'):
+            await tracer.start(summary_interval=0.05, port=0)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{tracer.port}") as client:
+                metrics = await client.get('/metrics')
+                missing = await client.get('/')
+            await asyncio.sleep(0.1)
+            await tracer.stop()
+        return metrics, missing
+
+    metrics, missing = asyncio.run(scenario())
+
+    assert metrics.status_code == 200 and missing.status_code == 404
+    lines = metrics.text.splitlines()
+    assert '# TYPE binance_trader_latency_seconds summary' in lines
+    assert 'binance_trader_latency_seconds{stage="rest",symbol="BTCUSDT",quantile="0.99"} 0.004000000' in lines
+    assert 'binance_trader_latency_seconds_count{stage="rest",symbol="BTCUSDT"} 3' in lines
+    assert 'binance_trader_latency_max_seconds{stage="decode",symbol="ETHUSDT"} 0.000000500' in lines
+    assert any('rest' in record.message and 'p99' in record.message for record in caplog.records)
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import httpx
+import websockets
+
+from api.rest_api_manager import RESTAPIManager
+from binance_trader.api.decoder import Kline, Trade
+from binance_trader.api.websocket_manager import WebSocketManager
+from simulation.load_harness import run_load
+from simulation.mock_exchange import MockExchange
+
+
+def run(exchange, scenario):
+    async def main():
+        async with exchange:
+            return await scenario(exchange)
+
+    return asyncio.run(main())
+
+
+def test_orders_and_brackets_move_balances():
+    async def scenario(exchange):
+        manager = RESTAPIManager("key", "secret", base_url=exchange.rest_url)
+        await asyncio.sleep(0.1)  # Let some trades go out first
+        try:
+            bought = await manager.place_order("BTCUSDT", "BUY", "MARKET", 2)
+            price = float(bought["fills"][0]["price"])
+            bracket = await manager.place_bracket_order("BTCUSDT", "SELL", 2, take_profit_price=price * 2,
+                                                        stop_price=price / 2)
+            response = await manager._request("GET", "/v3/account")
+            during = {b["asset"]: b for b in response.json()["balances"]}
+            await manager.cancel_bracket_order("BTCUSDT", bracket["order_list_id"])
+            response = await manager._request("GET", "/v3/account")
+            after = {b["asset"]: b for b in response.json()["balances"]}
+            rejected = await manager._request("POST", "/v3/order",
+                                              "symbol=BTCUSDT&side=BUY&type=MARKET&quantity=1000000")
+        finally:
+            await manager.close()
+        return bought, bracket, during, after, rejected
+
+    exchange = MockExchange(balances={"USDT": 1000.0})
+    bought, bracket, during, after, rejected = run(exchange, scenario)
+
+    assert bought["status"] == "FILLED" and float(bought["executedQty"]) == 2
+    assert bracket["status"] == "EXECUTING" and len(bracket["order_ids"]) == 2
+    assert (float(during["BTC"]["free"]), float(during["BTC"]["locked"])) == (0.0, 2.0)  # Shared by both legs
+    assert (float(after["BTC"]["free"]), float(after["BTC"]["locked"])) == (2.0, 0.0)
+    assert rejected.status_code == 400 and rejected.json()["code"] == -2010
+    assert exchange.stats()["tick_to_order_ms"]["count"] == 3  # Rejected orders arrive too
+
+
+def test_streams_reach_the_combined_stream_manager_across_disconnects():
+    async def scenario(exchange):
+        manager = WebSocketManager(url=exchange.stream_url)
+        manager.CONTROL_MESSAGE_INTERVAL = 0.01
+        received = []
+        await manager.subscribe(["btcusdt@trade", "btcusdt@kline_1m"], received.append)
+        await asyncio.sleep(1.0)
+        await manager.close()
+        return received
+
+    exchange = MockExchange(trade_rate=200, bar_ms=100, disconnect_every=0.3)
+    received = run(exchange, scenario)
+
+    trades = [event for event in received if isinstance(event, Trade)]
+    closed = [event for event in received if isinstance(event, Kline) and event.is_closed]
+    assert trades and closed
+    assert exchange.disconnects >= 2 and exchange.connections_opened >= 3
+    late = [trade for trade in trades if trade.event_time > trades[0].event_time + 700]
+    assert late  # Still receiving after being dropped
+
+
+def test_user_data_stream_reports_executions():
+    async def scenario(exchange):
+        async with httpx.AsyncClient(base_url=exchange.rest_url) as client:
+            listen_key = (await client.post("/v3/userDataStream")).json()["listenKey"]
+            async with websockets.connect(f"{exchange.ws_url}/{listen_key}") as ws:
+                await asyncio.sleep(0.05)
+                await client.post("/v3/order", params={"symbol": "BTCUSDT", "side": "BUY", "type": "MARKET",
+                                                       "quantity": 1})
+                events = [json.loads(await asyncio.wait_for(ws.recv(), 1)) for _ in range(4)]
+            keepalive = await client.put("/v3/userDataStream", params={"listenKey": "unknown"})
+        return events, keepalive
+
+    events, keepalive = run(MockExchange(), scenario)
+
+    assert [(e["e"], e.get("x")) for e in events] == [("executionReport", "NEW"), ("outboundAccountPosition", None),
+                                                      ("executionReport", "TRADE"),
+                                                      ("outboundAccountPosition", None)]
+    assert events[2]["X"] == "FILLED"
+    assert keepalive.json()["code"] == -1125
+
+
+def test_harness_reports_throughput_and_memory(tmp_path):
+    async def scenario(exchange):
+        return await run_load("src", exchange, duration=2.5, sample_interval=0.5, log_path=str(tmp_path / "bot.log"))
+
+    report = run(MockExchange(2, trade_rate=50), scenario)
+
+    assert report["symbols"] == 2
+    assert report["exchange"]["frames_sent"] > 0
+    assert report["exchange"]["connections_opened"] == 2  # One single-stream socket per pair
+    assert len(report["memory"]["samples"]) >= 4
+    assert report["memory"]["peak_mb"] > 0
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+
+from simulation import optimizer as optimizer_module
+from simulation.optimizer import ParameterOptimizer, ema_crossover_positions
+
+
+def prices(size=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(scale=0.002, size=size)))
+
+
+GRID = {'short_period': [5, 12], 'long_period': [26, 50]}
+
+
+def test_pool_matches_serial_grid_search():
+    data = prices()
+
+    parallel = ParameterOptimizer(data, max_workers=2).grid_search(GRID)
+    serial = ParameterOptimizer(data, max_workers=1).grid_search(GRID)
+
+    assert parallel == serial
+    assert len(parallel) == 4
+    assert parallel[0]['pnl'] >= parallel[-1]['pnl']
+
+
+def test_rejected_parameters_are_skipped():
+    def evaluate(window, period):
+        if period < 0:
+            raise ValueError("negative period")
+        return ema_crossover_positions(window, period, 26)
+
+    results = ParameterOptimizer(prices(), evaluate, max_workers=1).grid_search({'period': [-1, 5]})
+
+    assert [r['params'] for r in results] == [{'period': 5}]
+
+
+def test_results_are_cached_on_disk(tmp_path, monkeypatch):
+    data = prices()
+    first = ParameterOptimizer(data, max_workers=1, cache_dir=str(tmp_path)).grid_search(GRID)
+    assert len(os.listdir(tmp_path)) == 4
+
+    def must_not_run(*args):
+        raise AssertionError("result should come from the cache")
+
+    monkeypatch.setattr(optimizer_module, "_score", must_not_run)
+    assert ParameterOptimizer(data, max_workers=1, cache_dir=str(tmp_path)).grid_search(GRID) == first
+
+
+def test_walk_forward_splits():
+    optimizer = ParameterOptimizer(prices(), max_workers=2)
+
+    report = optimizer.walk_forward(GRID, train_size=1000, test_size=500)
+
+    assert [split['test'] for split in report] == [(1000, 1500), (1500, 2000), (2000, 2500), (2500, 3000)]
+    for split in report:
+        best = optimizer.grid_search(GRID, *split['train'])[0]
+        assert split['params'] == best['params']
+        assert split['test_result']['params'] == split['params']
@@ -0,0 +1,92 @@
+import asyncio
+
+from binance_trader.api.decoder import DepthUpdate
+from binance_trader.market.order_book import ASK, BID, OrderBook, OrderBookManager
+
+
+def diff(first, final, bids=(), asks=()):
+    return DepthUpdate("BTCUSDT", 0, first, final, list(bids), list(asks))
+
+
+SNAPSHOT = {
+    "lastUpdateId": 100,
+    "bids": [["99.0", "1.0"], ["98.0", "2.0"], ["97.0", "3.0"]],
+    "asks": [["101.0", "1.5"], ["102.0", "2.5"]],
+}
+
+
+def test_book_queries():
+    book = OrderBook("BTCUSDT")
+    book.apply_snapshot(1, SNAPSHOT["bids"], SNAPSHOT["asks"])
+
+    assert book.best_bid() == (99.0, 1.0)
+    assert book.best_ask() == (101.0, 1.5)
+    assert book.spread() == 2.0 and book.mid_price() == 100.0
+    assert book.quantity_at(BID, 98.0) == 2.0 and book.quantity_at(ASK, 98.0) == 0.0
+    assert book.cumulative_volume(BID, 98.0) == 3.0
+    assert book.cumulative_volume(ASK, 102.0) == 4.0
+    assert book.levels(BID, 2) == [(99.0, 1.0), (98.0, 2.0)]
+
+    book.apply_update(diff(2, 2, bids=[(99.0, 0.0), (99.5, 4.0)], asks=[(101.0, 0.0)]))
+
+    assert book.best_bid() == (99.5, 4.0)
+    assert book.best_ask() == (102.0, 2.5)
+    assert len(book.bids) == 3
+
+
+def run_stream(updates, snapshots):
+    async def scenario():
+        snapshots_left = list(snapshots)
+        fetches = []
+
+        async def fetch_snapshot(symbol):
+            fetches.append(symbol)
+            await asyncio.sleep(0)
+            return snapshots_left.pop(0)
+
+        manager = OrderBookManager(fetch_snapshot)
+        for update in updates:
+            await manager.on_depth_update(update)
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.01)
+        await manager.close()
+        return manager, fetches
+
+    return asyncio.run(scenario())
+
+
+def test_snapshot_and_buffered_diffs_are_merged():
+    updates = [
+        diff(90, 99, bids=[(50.0, 1.0)]),  # Already in the snapshot
+        diff(98, 102, bids=[(99.0, 5.0)]),  # Straddles lastUpdateId
+        diff(103, 105, asks=[(101.0, 0.0)]),
+        diff(106, 106, bids=[(98.0, 0.0)]),
+    ]
+
+    manager, fetches = run_stream(updates, [SNAPSHOT])
+    book = manager.get("BTCUSDT")
+
+    assert fetches == ["BTCUSDT"]
+    assert book.last_update_id == 106
+    assert book.quantity_at(BID, 50.0) == 0.0
+    assert book.best_bid() == (99.0, 5.0)
+    assert book.best_ask() == (102.0, 2.5)
+    assert book.levels(BID) == [(99.0, 5.0), (97.0, 3.0)]
+
+
+def test_gap_triggers_resync():
+    second_snapshot = {"lastUpdateId": 110, "bids": [["95.0", "1.0"]], "asks": [["96.0", "1.0"]]}
+    updates = [
+        diff(101, 101),
+        diff(102, 103),
+        diff(105, 108),  # 104 is missing
+        diff(109, 111, bids=[(95.0, 2.0)]),
+    ]
+
+    manager, fetches = run_stream(updates, [SNAPSHOT, second_snapshot])
+    book = manager.get("BTCUSDT")
+
+    assert fetches == ["BTCUSDT", "BTCUSDT"]
+    assert manager.resyncs["BTCUSDT"] == 1
+    assert book.last_update_id == 111
+    assert book.best_bid() == (95.0, 2.0)
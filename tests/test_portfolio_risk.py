@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from risk.portfolio_risk import PortfolioRiskManager
+from risk.risk_manager import RiskManager
+
+
+def test_long_exits_match_risk_manager():
+    rng = np.random.default_rng(3)
+    entries = rng.uniform(90, 110, size=500)
+    portfolio = PortfolioRiskManager(stop_loss=0.02, take_profit=0.05, capacity=4)
+    ids = [portfolio.open_position("BTCUSDT", "BUY", 1.0, entry) for entry in entries]
+
+    for price in (100.0, 97.5, 104.0):
+        result = portfolio.update_prices({"BTCUSDT": price})
+        scalar = RiskManager(stop_loss=0.02, take_profit=0.05)
+        expected = {i for i, entry in zip(ids, entries) if scalar.manage_risk(entry, price) == "SELL"}
+        assert set(result["exits"].tolist()) == expected
+        np.testing.assert_allclose(result["unrealized_pnl"], price - entries)
+
+
+def test_short_positions_and_reasons():
+    portfolio = PortfolioRiskManager(stop_loss=0.1, take_profit=0.2)
+    short_id = portfolio.open_position("ETHUSDT", "SELL", 2.0, 100.0)
+    long_id = portfolio.open_position("ETHUSDT", "BUY", 1.0, 100.0, take_profit=0.05)
+
+    result = portfolio.update_prices({"ETHUSDT": 111.0})
+    assert result["exits"].tolist() == [short_id, long_id]
+    assert result["reasons"].tolist() == ["STOP_LOSS", "TAKE_PROFIT"]
+    assert result["unrealized_pnl"].tolist() == [-22.0, 11.0]
+
+    result = portfolio.update_prices({"ETHUSDT": 80.0})
+    assert result["exits"].tolist() == [short_id, long_id]
+    assert result["reasons"].tolist() == ["TAKE_PROFIT", "STOP_LOSS"]
+
+
+def test_exposure_per_asset():
+    portfolio = PortfolioRiskManager(0.5, 0.5, max_exposure=250.0)
+    portfolio.open_position("BTCUSDT", "BUY", 3.0, 100.0)
+    portfolio.open_position("BTCUSDT", "SELL", 1.0, 100.0)
+    portfolio.open_position("ETHUSDT", "BUY", 10.0, 10.0)
+    portfolio.open_position("TRXUSDT", "BUY", 10.0, 1.0)
+
+    result = portfolio.update_prices({"BTCUSDT": 140.0, "ETHUSDT": 12.0})
+
+    assert result["exposure"] == {"BTCUSDT": 280.0, "ETHUSDT": 120.0, "TRXUSDT": 0.0}
+    assert result["exposure_breaches"] == ["BTCUSDT"]
+    # TRXUSDT has no price yet: no PnL and no exit decision
+    assert result["unrealized_pnl"].tolist() == [120.0, -40.0, 20.0, 0.0]
+    assert len(result["exits"]) == 0
+
+
+def test_close_keeps_book_dense_and_books_pnl():
+    portfolio = PortfolioRiskManager(0.5, 0.5, capital=1000.0, max_drawdown=0.05)
+    first = portfolio.open_position("BTCUSDT", "BUY", 1.0, 100.0)
+    second = portfolio.open_position("ETHUSDT", "BUY", 1.0, 50.0)
+    third = portfolio.open_position("BTCUSDT", "SELL", 1.0, 100.0)
+
+    portfolio.update_prices({"BTCUSDT": 120.0, "ETHUSDT": 60.0})
+    assert portfolio.close_position(first) == 20.0
+    assert portfolio.count == 2
+
+    result = portfolio.update_prices({"BTCUSDT": 130.0})
+    assert result["position_ids"].tolist() == [third, second]
+    assert result["unrealized_pnl"].tolist() == [-30.0, 10.0]
+    assert result["equity"] == pytest.approx(1000.0)
+    assert not result["drawdown_breach"]
+
+    result = portfolio.update_prices({"BTCUSDT": 180.0})
+    assert result["drawdown"] == pytest.approx(60 / 1010)
+    assert result["drawdown_breach"]
+
+    assert portfolio.close_positions(result["position_ids"]) == pytest.approx(-70.0)
+    assert portfolio.count == 0
+    assert portfolio.realized_pnl == pytest.approx(-50.0)
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+import pytest
+
+from binance_trader.api.rate_limiter import RateLimit, RateLimiter
+
+
+def test_waiters_are_released_in_order_at_window_rollover():
+    async def scenario():
+        limiter = RateLimiter(max_requests=3, time_window=0.2)
+        released = []
+
+        async def request(name, weight):
+            await limiter.acquire(weight)
+            released.append((name, time.time()))
+
+        await asyncio.gather(*(request(name, 1) for name in "abc"))
+        window_end = limiter.limits[0].window_start + 0.2
+        await asyncio.gather(request("d", 2), request("e", 1), request("f", 1))
+        return released, window_end
+
+    released, window_end = asyncio.run(scenario())
+
+    assert [name for name, _ in released] == list("abcdef")
+    for name, at in released[3:]:
+        assert at >= window_end - 0.01
+
+
+def test_all_limits_are_enforced_together():
+    async def scenario():
+        limiter = RateLimiter(limits=[
+            RateLimit(100, 60),
+            RateLimit(2, 60, kind='ORDERS'),
+        ])
+        await limiter.acquire(1, orders=1)
+        await limiter.acquire(1, orders=1)
+        await limiter.acquire(20)  # Not an order, still fits
+
+        blocked = asyncio.ensure_future(limiter.acquire(1, orders=1))
+        await asyncio.sleep(0.05)
+        assert not blocked.done()
+        blocked.cancel()
+        await limiter.stop()
+        return limiter
+
+    limiter = asyncio.run(scenario())
+
+    assert [limit.used for limit in limiter.limits] == [22, 2]
+
+
+def test_used_weight_header_corrects_the_count():
+    async def scenario():
+        limiter = RateLimiter(limits=[RateLimit(10, 60, header='X-MBX-USED-WEIGHT-1M')])
+        limiter.update_from_headers({'x-mbx-used-weight-1m': '10'})
+
+        waiter = asyncio.ensure_future(limiter.acquire(1))
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+
+        limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '4'})
+        await asyncio.wait_for(waiter, 1)
+        return limiter
+
+    limiter = asyncio.run(scenario())
+
+    assert limiter.limits[0].used == 5
+
+
+def test_request_heavier_than_limit_is_rejected():
+    limiter = RateLimiter(max_requests=10, time_window=60)
+
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.acquire(11))
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import httpx
+
+from api.rest_api_manager import RESTAPIManager
+
+
+def test_sign_payload():
+    manager = RESTAPIManager("key", "secret")
+
+    signed = manager.sign_payload({"symbol": "TRXUSDT", "quantity": 20})
+
+    query = "symbol=TRXUSDT&quantity=20"
+    expected = hmac.new(b"secret", query.encode(), hashlib.sha256).hexdigest()
+    assert signed == f"{query}&signature={expected}"
+
+
+def test_place_order_reuses_one_client():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"orderId": len(requests)})
+
+    async def scenario():
+        manager = RESTAPIManager("key", "secret", transport=httpx.MockTransport(handler))
+        first = await manager.place_order("TRXUSDT", "BUY", "MARKET", 20)
+        client = manager.client
+        second = await manager.place_order("TRXUSDT", "SELL", "MARKET", 20)
+        assert manager.client is client
+        await manager.close()
+        return first, second, manager
+
+    first, second, manager = asyncio.run(scenario())
+
+    assert (first, second) == ({"orderId": 1}, {"orderId": 2})
+    assert requests[0].url.path == "/api/v3/order"
+    assert requests[0].headers["X-MBX-APIKEY"] == "key"
+    assert "signature=" in requests[0].url.query.decode()
+    assert len(manager.timings) == 2
+    assert manager._client is None
+
+
+class PingHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"path": urlsplit(self.path).path}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_start_prewarms_connection_and_records_timings():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    class LocalManager(RESTAPIManager):
+        BASE_URL = f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    async def scenario():
+        async with LocalManager("key", "secret") as manager:
+            response = await manager._request("GET", "/v3/ping")
+            assert response.json() == {"path": "/api/v3/ping"}
+        return manager
+
+    try:
+        manager = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    warmup, ping = manager.timings
+    assert not warmup["reused"] and warmup["connect"] is not None
+    assert ping["reused"] and ping["connect"] is None
+    assert ping["ttfb"] is not None
+    assert manager.latency_summary()["total"]["count"] == 2
+
+
+class MockExchange:
+    """Answers the OCO endpoints the way the exchange does"""
+
+    def __init__(self):
+        self.requests = []
+
+    def __call__(self, request):
+        self.requests.append(request)
+        params = dict(request.url.params)
+        if request.method == "DELETE":
+            return httpx.Response(200, json={"orderListId": int(params["orderListId"]), "listOrderStatus": "ALL_DONE"})
+
+        reports = [
+            {"orderId": 11, "type": params["aboveType"], "price": params["abovePrice"], "status": "NEW"},
+            {"orderId": 12, "type": params["belowType"], "price": params["belowPrice"], "status": "NEW"}
+        ]
+        return httpx.Response(200, json={
+            "orderListId": 7,
+            "contingencyType": "OCO",
+            "listOrderStatus": "EXECUTING",
+            "orders": [{"orderId": r["orderId"]} for r in reports],
+            "orderReports": reports
+        })
+
+
+def test_bracket_order_is_one_oco_request():
+    exchange = MockExchange()
+
+    async def scenario():
+        manager = RESTAPIManager("key", "secret", transport=httpx.MockTransport(exchange))
+        bracket = await manager.place_bracket_order("TRXUSDT", "SELL", 20, "0.2100", "0.1950")
+        tracked = dict(manager.brackets)
+        await manager.cancel_bracket_order("TRXUSDT", bracket["order_list_id"])
+        await manager.close()
+        return bracket, tracked, manager
+
+    bracket, tracked, manager = asyncio.run(scenario())
+
+    place, cancel = exchange.requests
+    assert place.method == "POST" and place.url.path == "/api/v3/orderList/oco"
+    params = dict(place.url.params)
+    assert params["aboveType"] == "LIMIT_MAKER" and params["abovePrice"] == "0.2100"
+    assert params["belowType"] == "STOP_LOSS_LIMIT" and params["belowStopPrice"] == "0.1950"
+    assert "signature" in params
+
+    assert tracked == {7: bracket}
+    assert bracket["order_ids"] == [11, 12]
+    assert bracket["take_profit"]["price"] == "0.2100"
+    assert bracket["stop_loss"]["price"] == "0.1950"
+    assert cancel.method == "DELETE" and cancel.url.path == "/api/v3/orderList"
+    assert manager.brackets == {}
+
+
+def test_bracket_for_short_puts_stop_above():
+    exchange = MockExchange()
+
+    async def scenario():
+        manager = RESTAPIManager("key", "secret", transport=httpx.MockTransport(exchange))
+        return await manager.place_bracket_order("TRXUSDT", "BUY", 20, "0.1900", "0.2050", "0.2060")
+
+    bracket = asyncio.run(scenario())
+
+    params = dict(exchange.requests[0].url.params)
+    assert params["aboveType"] == "STOP_LOSS_LIMIT"
+    assert (params["aboveStopPrice"], params["abovePrice"]) == ("0.2050", "0.2060")
+    assert params["belowType"] == "LIMIT_MAKER" and params["belowPrice"] == "0.1900"
+    assert bracket["stop_loss"]["price"] == "0.2060"
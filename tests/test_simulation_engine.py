@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from simulation.simulation_engine import SimulationEngine
+from strategies.strategy_manager import StrategyManager
+
+
+def test_streaming_backtest_matches_full_backtest():
+    rng = np.random.default_rng(42)
+    data = pd.Series(100 + np.cumsum(rng.normal(size=400)))
+    engine = SimulationEngine(StrategyManager())
+
+    full = engine.run_backtest(data)
+    streaming = engine.run_backtest(data, streaming=True)
+
+    assert streaming == full
+    assert {"BUY", "SELL"} <= set(streaming)
+
+
+def test_streaming_backtest_resets_state_between_runs():
+    data = pd.Series([1.0, 2.0, 3.0, 2.0, 1.0])
+    engine = SimulationEngine(StrategyManager())
+
+    assert engine.run_backtest(data, streaming=True) == engine.run_backtest(data, streaming=True)
+
+
+def test_vectorized_backtest_signals_match_streaming():
+    rng = np.random.default_rng(7)
+    data = pd.Series(100 + np.cumsum(rng.normal(size=400)))
+    engine = SimulationEngine(StrategyManager())
+
+    result = engine.run_vectorized_backtest(data.to_numpy())
+
+    assert result['signals'].tolist() == engine.run_backtest(data, streaming=True)
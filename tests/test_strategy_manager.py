@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+from strategies.strategy_manager import StrategyManager
+
+
+def random_walk(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(100 + np.cumsum(rng.normal(size=size)))
+
+
+def test_update_matches_pandas_ema():
+    prices = random_walk(500)
+    strategy = StrategyManager()
+
+    for price in prices:
+        strategy.update(price)
+
+    assert strategy._short_ema == strategy.calculate_ema(prices, 12).iloc[-1]
+    assert strategy._long_ema == strategy.calculate_ema(prices, 26).iloc[-1]
+
+
+def test_flat_prices_hold():
+    strategy = StrategyManager()
+
+    assert strategy.evaluate_signal(pd.Series([1.0, 1.0, 1.0])) == "HOLD"
+    assert [strategy.update(1.0) for _ in range(3)] == ["HOLD"] * 3
+
+
+def test_evaluate_signals_matches_per_bar_signals():
+    prices = random_walk(300, seed=1)
+    strategy = StrategyManager()
+
+    result = strategy.evaluate_signals(prices.to_numpy())
+
+    expected = [strategy.evaluate_signal(prices[:i+1]) for i in range(len(prices))]
+    assert result['signals'].tolist() == expected
+
+
+def test_evaluate_signals_pnl_includes_fees():
+    prices = random_walk(300, seed=2).to_numpy()
+    strategy = StrategyManager()
+    fee_rate = 0.001
+
+    result = strategy.evaluate_signals(prices, fee_rate=fee_rate)
+
+    equity, position = 1.0, 0.0
+    for i, signal in enumerate(result['signals']):
+        if i:
+            equity *= 1 + position * (prices[i] / prices[i-1] - 1)
+        target = {'BUY': 1.0, 'SELL': 0.0}.get(signal, position)
+        equity *= 1 - fee_rate * abs(target - position)
+        position = target
+
+    assert np.isclose(result['equity'][-1], equity)
+    assert np.isclose(result['pnl'], equity - 1.0)
+    assert result['pnl'] < strategy.evaluate_signals(prices, fee_rate=0.0)['pnl']
@@ -0,0 +1,137 @@
+import asyncio
+import gzip
+import json
+import os
+import time
+
+import pytest
+
+from api.websocket_manager import WebSocketManager as RawWebSocketManager
+from binance_trader.api.decoder import Trade
+from binance_trader.api.stream_recorder import StreamRecorder, StreamReplayer, read_frames, segment_paths
+from binance_trader.api.websocket_manager import WebSocketManager
+
+
+def trade_frame(stream, trade_id, price):
+    return json.dumps({"stream": stream, "data": {"e": "trade", "E": trade_id, "s": stream.split("@")[0].upper(),
+                                                   "t": trade_id, "p": str(price), "q": "1.0", "T": trade_id,
+                                                   "m": False}})
+
+
+def test_frames_round_trip_across_segments(tmp_path):
+    directory = str(tmp_path / "recording")
+    recorder = StreamRecorder(directory, segment_bytes=2000)
+    frames = [trade_frame("btcusdt@trade", i, 100 + i) for i in range(50)] + [b"\x00binary"]
+    for frame in frames:
+        recorder.record("connection-1", frame)
+    recorder.close()
+
+    assert len(segment_paths(directory)) > 1
+    recorded = list(read_frames(directory))
+    assert [frame for _, _, frame in recorded] == frames
+    times = [received for received, _, _ in recorded]
+    assert times == sorted(times)
+
+    # A new recorder appends segments, a crash mid-frame loses only that frame
+    recorder = StreamRecorder(directory)
+    recorder.record("other", "later")
+    recorder.close()
+    last = segment_paths(directory)[-1]
+    with gzip.open(last, "rb") as f:
+        data = f.read()
+    with gzip.open(last, "wb") as f:
+        f.write(data[:-2])
+
+    assert [frame for _, _, frame in read_frames(directory)] == frames
+    assert list(read_frames(directory, {"other"})) == []
+
+
+def record(directory, frames, spacing=0.0):
+    recorder = StreamRecorder(directory)
+    for source, frame in frames:
+        recorder.record(source, frame)
+        if spacing:
+            time.sleep(spacing)
+    recorder.close()
+
+
+def test_replay_through_combined_stream_manager(tmp_path):
+    directory = str(tmp_path / "recording")
+    frames = [trade_frame("btcusdt@trade", i, 100 + i) for i in range(5)]
+    frames.insert(2, trade_frame("ethusdt@trade", 99, 10))  # Not subscribed: filtered as live
+    frames.insert(0, json.dumps({"result": None, "id": 1}))
+    record(directory, [("connection-1", frame) for frame in frames])
+
+    async def scenario():
+        replayer = StreamReplayer(directory, speed=None)
+        manager = WebSocketManager(connect=replayer.connect)
+        manager.CONTROL_MESSAGE_INTERVAL = 0
+        received = []
+        await manager.connect_socket("btcusdt@trade", received.append)
+        await asyncio.wait_for(replayer.finished.wait(), 5)
+        await asyncio.sleep(0.05)
+        await manager.close()
+        return received, replayer
+
+    received, replayer = asyncio.run(scenario())
+
+    assert all(isinstance(trade, Trade) for trade in received)
+    assert [trade.trade_id for trade in received] == [0, 1, 2, 3, 4]
+    assert replayer.replayed == len(frames)
+    assert json.loads(replayer.sockets[0].sent[0])["params"] == ["btcusdt@trade"]
+
+
+def test_single_stream_manager_records_and_replays(tmp_path):
+    directory = str(tmp_path / "recording")
+    live = [json.dumps({"e": "trade", "t": i}) for i in range(3)]
+
+    async def scenario():
+        # Record what a manager receives, with a replay of fixed frames standing in for the exchange
+        source_directory = str(tmp_path / "source")
+        record(source_directory, [("btcusdt@trade", frame) for frame in live])
+        recorder = StreamRecorder(directory)
+        manager = RawWebSocketManager("btcusdt@trade", recorder=recorder,
+                                      connect=StreamReplayer(source_directory, speed=None).connect)
+        task = asyncio.create_task(manager.connect())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        recorder.close()
+
+        published = []
+
+        async def publish(stream, message):
+            published.append((stream, message))
+
+        replayer = StreamReplayer(directory, speed=None)
+        assert replayer.sources == ["btcusdt@trade"]
+        replayed = RawWebSocketManager("ethusdt@trade", publish)
+        await replayer.replay(replayed.feed)
+        return published
+
+    assert asyncio.run(scenario()) == [("ethusdt@trade", frame) for frame in live]
+
+
+def test_replay_speed(tmp_path):
+    directory = str(tmp_path / "recording")
+    record(directory, [("s", str(i)) for i in range(5)], spacing=0.05)
+
+    async def timed(speed):
+        replayer = StreamReplayer(directory, speed=speed)
+        received = []
+        started = time.perf_counter()
+        await replayer.replay(received.append)
+        return time.perf_counter() - started, received
+
+    real_time, received = asyncio.run(timed(1.0))
+    doubled, _ = asyncio.run(timed(2.0))
+    unpaced, _ = asyncio.run(timed(None))
+
+    assert received == ["0", "1", "2", "3", "4"]
+    assert real_time >= 0.19
+    assert 0.09 <= doubled < real_time
+    assert unpaced < 0.05
+
+    with pytest.raises(ValueError):
+        StreamReplayer(directory, speed=0)
+    with pytest.raises(FileNotFoundError):
+        StreamReplayer(os.path.join(directory, "missing"))
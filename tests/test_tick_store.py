@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data import tick_store
+from data.tick_store import TickStore
+from simulation.simulation_engine import SimulationEngine
+from strategies.strategy_manager import StrategyManager
+
+
+def trades(times, first_id=0):
+    times = np.asarray(times, dtype=np.int64)
+    return {
+        "time": times,
+        "trade_id": np.arange(first_id, first_id + len(times)),
+        "price": 100 + np.sin(times / 1e4),
+        "quantity": np.full(len(times), 0.5),
+        "is_buyer_maker": times % 2 == 0,
+    }
+
+
+def test_slices_are_zero_copy_views(tmp_path, monkeypatch):
+    monkeypatch.setattr(tick_store, "INDEX_STRIDE", 64)
+    store = TickStore(str(tmp_path))
+    writer = store.writer("btcusdt")
+    rng = np.random.default_rng(0)
+    times = np.cumsum(rng.integers(0, 5, size=5000)) + 1_000_000  # Repeated timestamps included
+    for chunk in np.array_split(times, 7):
+        writer.append(trades(chunk, first_id=int(np.searchsorted(times, chunk[0]))))
+
+    reader = store.reader("BTCUSDT")
+    assert len(reader) == 5000
+    for start, end in [(None, None), (1_000_000, 1_000_050), (int(times[1234]), int(times[4321])),
+                       (int(times[-1]), None), (0, 10), (int(times[-1]) + 1, None)]:
+        columns = reader.slice(start, end)
+        mask = np.ones(len(times), dtype=bool)
+        if start is not None:
+            mask &= times >= start
+        if end is not None:
+            mask &= times < end
+        np.testing.assert_array_equal(columns["time"], times[mask])
+        if len(columns["price"]):
+            assert isinstance(columns["price"], np.memmap)
+            assert not columns["price"].flags.owndata
+
+    lo, hi = reader.rows(int(times[100]), int(times[200]))
+    assert (lo, hi) == (np.searchsorted(times, times[100]), np.searchsorted(times, times[200]))
+
+
+def test_reader_picks_up_appends_and_ignores_torn_writes(tmp_path):
+    store = TickStore(str(tmp_path))
+    writer = store.writer("BTCUSDT", "bars", "1m")
+    bars = {"time": np.arange(3) * 60_000, "open": [1.0, 2, 3], "high": [1.0, 2, 3], "low": [1.0, 2, 3],
+            "close": [1.0, 2, 3], "volume": [1.0, 1, 1], "close_time": np.arange(3) * 60_000 + 59_999}
+    writer.append(bars)
+    reader = store.reader("BTCUSDT", "bars", "1m")
+
+    # Bytes written without the metadata commit, as after a crash
+    with open(tmp_path / "BTCUSDT" / "bars_1m" / "close.bin", "ab") as f:
+        f.write(np.array([99.0]).tobytes())
+    assert reader.refresh() == 3
+    assert reader.slice()["close"].tolist() == [1.0, 2.0, 3.0]
+
+    writer = store.writer("BTCUSDT", "bars", "1m")  # Truncates the torn tail
+    writer.append({k: np.asarray(v)[:1] + (180_000 if k in ("time", "close_time") else 3) for k, v in bars.items()})
+    assert reader.refresh() == 4
+    assert reader.slice(120_000)["close"].tolist() == [3.0, 4.0]
+
+    with pytest.raises(ValueError):
+        writer.append({k: np.asarray(v)[:1] for k, v in bars.items()})  # Older than the last row
+
+
+def test_iter_chunks_and_streaming_backtest_on_mapped_prices(tmp_path):
+    store = TickStore(str(tmp_path))
+    writer = store.writer("BTCUSDT")
+    writer.append(trades(np.arange(0, 300_000, 100)))
+    reader = store.reader("BTCUSDT")
+
+    chunks = list(reader.iter_chunks(1000, 201_000, chunk_rows=500))
+    assert [len(c["time"]) for c in chunks] == [500, 500, 500, 500]
+    assert chunks[0]["time"][0] == 1000 and chunks[-1]["time"][-1] == 200_900
+
+    prices = reader.slice(50_000, 250_000)["price"]
+    engine = SimulationEngine(StrategyManager())
+    assert engine.run_backtest(prices, streaming=True) == engine.run_backtest(
+        pd.Series(np.array(prices)), streaming=True)
+
+
+def test_schema_mismatch_is_rejected(tmp_path):
+    store = TickStore(str(tmp_path))
+    store.writer("BTCUSDT")
+    with pytest.raises(ValueError):
+        tick_store.SeriesWriter(str(tmp_path / "BTCUSDT" / "trades"), tick_store.BAR_COLUMNS)
+    with pytest.raises(ValueError):
+        store.writer("BTCUSDT", "bars")
@@ -0,0 +1,119 @@
+import asyncio
+
+from binance_trader.api.decoder import Kline
+from binance_trader.event_bus import EventBus
+from binance_trader.strategies.base_strategy import BaseStrategy
+from binance_trader.trade_manager import TradeManager
+
+
+class BusClient:
+    """Kline sockets on an EventBus, orders answered after a per-symbol delay"""
+
+    def __init__(self, delays):
+        self.bus = EventBus()
+        self.delays = delays
+        self.orders = []
+
+    async def start_kline_socket(self, symbol, callback, interval='1m'):
+        self.bus.subscribe([f"{symbol.lower()}@kline_{interval}"], callback)
+
+    async def close_all_connections(self):
+        await self.bus.close()
+
+    async def get_free_balance(self, asset):
+        return 1000.0
+
+    async def get_trading_rules(self, symbol):
+        return {'base_asset': symbol[:-4], 'quote_asset': symbol[-4:], 'step_size': 0.001, 'min_qty': 0.001}
+
+    async def place_order(self, symbol, side, order_type, quantity, price=None):
+        await asyncio.sleep(self.delays[symbol])
+        self.orders.append((symbol, side))
+        return {'orderId': len(self.orders), 'status': 'FILLED', 'price': '0.0', 'executedQty': str(quantity),
+                'cummulativeQuoteQty': str(quantity * 100)}
+
+
+class AlwaysStrategy(BaseStrategy):
+    def calculate_signals(self) -> dict:
+        return {'valid': True}
+
+    def should_enter_trade(self) -> bool:
+        return True
+
+    def should_exit_trade(self) -> bool:
+        return True
+
+
+def kline(symbol, i):
+    return Kline(symbol, '1m', i * 60_000 + 59_999, i * 60_000, i * 60_000 + 59_999, 100.0, 101.0, 99.0, 100.0,
+                 1.0, True)
+
+
+def test_slow_order_on_one_symbol_does_not_hold_up_others():
+    async def scenario():
+        client = BusClient({'BTCUSDT': 1.0, 'ETHUSDT': 0.0})
+        manager = TradeManager(client)
+        for symbol in client.delays:
+            manager.add_strategy(symbol, AlwaysStrategy(client, symbol))
+        await manager.start_trading()
+
+        for i in range(4):
+            for symbol in client.delays:
+                await client.bus.publish(f"{symbol.lower()}@kline_1m", kline(symbol, i))
+        await asyncio.sleep(0.2)
+        orders = list(client.orders)
+        names = sorted(client.bus.stats())
+        await manager.stop_trading()
+        return orders, names
+
+    orders, names = asyncio.run(scenario())
+
+    # BTCUSDT's first entry is still out; ETHUSDT went on entering and exiting
+    assert orders == [('ETHUSDT', 'BUY'), ('ETHUSDT', 'SELL'), ('ETHUSDT', 'BUY'), ('ETHUSDT', 'SELL')]
+    assert names == ['TradeManager[BTCUSDT]', 'TradeManager[ETHUSDT]']
+
+
+class LotSizeClient:
+    """Enforces a 0.001 LOT_SIZE step like the exchange; fills as told by fills"""
+
+    def __init__(self, balances, fills):
+        self.balances = balances
+        self.fills = list(fills)
+        self.orders = []
+
+    async def get_free_balance(self, asset):
+        return self.balances.get(asset, 0.0)
+
+    async def get_trading_rules(self, symbol):
+        return {'base_asset': 'BTC', 'quote_asset': 'USDT', 'step_size': 0.001, 'min_qty': 0.001}
+
+    async def place_order(self, symbol, side, order_type, quantity, price=None):
+        if abs(quantity * 1000 - round(quantity * 1000)) > 1e-6:
+            raise ValueError("APIError(code=-1013): Filter failure: LOT_SIZE")
+        self.orders.append((side, quantity))
+        status, executed = self.fills.pop(0)
+        executed = quantity if executed is None else executed
+        return {'orderId': len(self.orders), 'status': status, 'price': '0.0', 'executedQty': str(executed),
+                'cummulativeQuoteQty': str(executed * 97)}
+
+
+def test_quantities_are_rounded_to_the_lot_size_and_partial_exits_keep_the_rest():
+    async def scenario():
+        # The entry's commission is taken in BTC, so less than was bought is free to sell
+        client = LotSizeClient({'USDT': 1000.0, 'BTC': 1.0289}, [('FILLED', None), ('EXPIRED', 0.5),
+                                                                 ('FILLED', None)])
+        manager = TradeManager(client)
+        manager.add_strategy('BTCUSDT', AlwaysStrategy(client, 'BTCUSDT'))
+        states = []
+        for i in range(3):
+            await manager._handle_kline_data(Kline('BTCUSDT', '1m', i, i, i, 97.0, 97.0, 97.0, 97.0, 1.0, True))
+            states.append(dict(manager.active_trades.get('BTCUSDT', {})))
+            client.balances['BTC'] = 0.528
+        return client.orders, states
+
+    orders, states = asyncio.run(scenario())
+
+    assert orders == [('BUY', 1.030), ('SELL', 1.028), ('SELL', 0.528)]  # 100 USDT / 97 = 1.0309...
+    assert states[0]['quantity'] == 1.030
+    assert abs(states[1]['quantity'] - 0.530) < 1e-9  # Partly filled: the rest is still held
+    assert states[2] == {}
@@ -0,0 +1,151 @@
+import asyncio
+import random
+
+import pytest
+
+from binance_trader.api.decoder import Trade
+from binance_trader.trigger_engine import STOP_LOSS, TAKE_PROFIT, TRAILING_STOP, TriggerEngine
+
+
+def test_long_and_short_brackets():
+    engine = TriggerEngine()
+    long_id = engine.add("BTCUSDT", "BUY", 1.0, take_profit=110, stop_loss=95)
+    short_id = engine.add("BTCUSDT", "SELL", 2.0, take_profit=90, stop_loss=105)
+
+    assert engine.check("BTCUSDT", 100) == []
+    assert engine.check("ETHUSDT", 200) == []
+
+    events = engine.check("BTCUSDT", 106)
+    assert [(e.position_id, e.kind, e.level, e.exit_side) for e in events] == [(short_id, STOP_LOSS, 105, "BUY")]
+
+    events = engine.check("BTCUSDT", 94)
+    assert [(e.position_id, e.kind, e.level, e.exit_side) for e in events] == [(long_id, STOP_LOSS, 95, "SELL")]
+    assert len(engine) == 0
+
+
+def test_one_leg_cancels_the_other():
+    engine = TriggerEngine()
+    position_id = engine.add("BTCUSDT", "BUY", 1.0, take_profit=110, stop_loss=95)
+
+    assert [e.kind for e in engine.check("BTCUSDT", 111)] == [TAKE_PROFIT]
+    assert engine.check("BTCUSDT", 90) == []
+    assert engine.stats()["triggers"] == {}
+    assert not engine.remove(position_id)
+
+
+def test_trailing_stop_follows_the_price():
+    engine = TriggerEngine()
+    long_id = engine.add("BTCUSDT", "BUY", 1.0, trailing=0.1, reference_price=100)
+    short_id = engine.add("BTCUSDT", "SELL", 1.0, trailing=0.1, reference_price=100)
+
+    assert engine.trailing_level(long_id) == pytest.approx(90)
+    assert engine.trailing_level(short_id) == pytest.approx(110)
+
+    assert engine.check("BTCUSDT", 105) == []
+    assert engine.trailing_level(long_id) == pytest.approx(94.5)
+    assert engine.check("BTCUSDT", 95) == []
+    assert engine.trailing_level(short_id) == pytest.approx(104.5)
+
+    assert [(e.position_id, e.kind) for e in engine.check("BTCUSDT", 104.6)] == [(short_id, TRAILING_STOP)]
+    events = engine.check("BTCUSDT", 94.4)
+    assert [(e.position_id, e.kind) for e in events] == [(long_id, TRAILING_STOP)]
+    assert events[0].level == pytest.approx(94.5)
+
+
+def test_trailing_stops_added_at_different_peaks():
+    engine = TriggerEngine()
+    first = engine.add("BTCUSDT", "BUY", 1.0, trailing=0.05, reference_price=100)
+    engine.check("BTCUSDT", 104)
+    second = engine.add("BTCUSDT", "BUY", 1.0, trailing=0.05)  # From the last price, 104
+    third = engine.add("BTCUSDT", "BUY", 1.0, trailing=0.05, reference_price=90)
+
+    assert engine.trailing_level(first) == engine.trailing_level(second) == pytest.approx(98.8)
+    assert engine.check("BTCUSDT", 95) != []
+    assert len(engine) == 1 and engine.trailing_level(third) == pytest.approx(90.25)  # Dragged up to 95
+
+    assert engine.remove(third)
+    assert engine.stats()["triggers"] == {}
+
+
+def test_matches_brute_force_scan():
+    rng = random.Random(7)
+    engine = TriggerEngine()
+    open_positions = {}
+    for _ in range(2000):
+        entry = rng.uniform(90, 110)
+        side = rng.choice(["BUY", "SELL"])
+        direction = 1 if side == "BUY" else -1
+        take_profit = entry * (1 + direction * rng.uniform(0.01, 0.1))
+        stop_loss = entry * (1 - direction * rng.uniform(0.01, 0.1))
+        position_id = engine.add("BTCUSDT", side, 1.0, take_profit=take_profit, stop_loss=stop_loss)
+        open_positions[position_id] = (side, take_profit, stop_loss)
+
+    price = 100.0
+    for _ in range(500):
+        price *= 1 + rng.gauss(0, 0.005)
+        expected = set()
+        for position_id, (side, take_profit, stop_loss) in list(open_positions.items()):
+            if side == "BUY":
+                hit = price >= take_profit or price <= stop_loss
+            else:
+                hit = price <= take_profit or price >= stop_loss
+            if hit:
+                expected.add(position_id)
+                del open_positions[position_id]
+        assert {e.position_id for e in engine.check("BTCUSDT", price)} == expected
+    assert len(engine) == len(open_positions)
+
+
+def test_on_trade_calls_handler():
+    received = []
+
+    async def close_position(event):
+        received.append((event.symbol, event.kind, event.tag, event.time))
+
+    async def scenario():
+        engine = TriggerEngine(on_trigger=close_position)
+        engine.add("BTCUSDT", "BUY", 1.0, stop_loss=95, tag="order-1")
+        await engine.on_trade(Trade("BTCUSDT", 0, 1, 100.0, 1.0, 1000, False))
+        await engine.on_trade(Trade("BTCUSDT", 0, 2, 94.0, 1.0, 2000, True))
+
+    asyncio.run(scenario())
+    assert received == [("BTCUSDT", STOP_LOSS, "order-1", 2000)]
+
+
+def test_invalid_positions():
+    engine = TriggerEngine()
+    with pytest.raises(ValueError):
+        engine.add("BTCUSDT", "BUY", 1.0)
+    with pytest.raises(ValueError):
+        engine.add("BTCUSDT", "BUY", 1.0, trailing=0.01)  # No price yet
+    with pytest.raises(ValueError):
+        engine.add("BTCUSDT", "LONG", 1.0, stop_loss=1)
+
+
+def test_trailing_matches_brute_force():
+    rng = random.Random(11)
+    engine = TriggerEngine()
+    extremes = {}
+    price = 100.0
+    for step in range(600):
+        if step % 3 == 0:
+            side = rng.choice(["BUY", "SELL"])
+            trail = rng.choice([0.01, 0.02, 0.05])
+            position_id = engine.add("BTCUSDT", side, 1.0, trailing=trail, reference_price=price)
+            extremes[position_id] = (side, trail, price)
+
+        price *= 1 + rng.gauss(0, 0.004)
+        expected = set()
+        for position_id, (side, trail, extreme) in list(extremes.items()):
+            if side == "BUY":
+                hit = price <= extreme * (1 - trail)
+                extreme = max(extreme, price)
+            else:
+                hit = price >= extreme * (1 + trail)
+                extreme = min(extreme, price)
+            if hit:
+                expected.add(position_id)
+                del extremes[position_id]
+            else:
+                extremes[position_id] = (side, trail, extreme)
+        assert {e.position_id for e in engine.check("BTCUSDT", price)} == expected
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from binance_trader.api.client import BinanceClient
+from binance_trader.api.user_data_stream import AccountCache, user_stream_url
+from binance_trader.config import Config
+from simulation.mock_exchange import MockExchange
+
+
+def position(time, **balances):
+    return {'e': 'outboundAccountPosition', 'E': time, 'u': time,
+            'B': [{'a': asset, 'f': str(free), 'l': str(locked)} for asset, (free, locked) in balances.items()]}
+
+
+def execution(time, order_id, status):
+    return {'e': 'executionReport', 'E': time, 's': 'BTCUSDT', 'i': order_id, 'X': status}
+
+
+def test_cache_applies_only_events_newer_than_the_snapshot():
+    cache = AccountCache()
+    cache.on_event(position(100, USDT=(50.0, 0.0)))  # Already in the snapshot
+    cache.on_event({'e': 'balanceUpdate', 'E': 300, 'a': 'USDT', 'd': '25.0'})
+    cache.on_event(execution(300, 7, 'NEW'))
+    assert not cache.synced and cache.free('USDT') == 0.0
+
+    cache.apply_snapshot({'updateTime': 200, 'balances': [{'asset': 'USDT', 'free': '90.0', 'locked': '10.0'},
+                                                          {'asset': 'BTC', 'free': '1.0', 'locked': '0.0'}]})
+    assert (cache.free('USDT'), cache.locked('USDT')) == (115.0, 10.0)
+    assert [order['i'] for order in cache.open_orders('BTCUSDT')] == [7]
+
+    cache.on_event(execution(400, 7, 'FILLED'))
+    cache.on_event(position(400, BTC=(1.5, 0.0), USDT=(65.0, 10.0)))
+    assert cache.open_orders() == []
+    assert (cache.free('BTC'), cache.free('USDT'), cache.update_time) == (1.5, 65.0, 400)
+
+    cache.invalidate()
+    cache.on_event(position(500, USDT=(0.0, 0.0)))
+    assert cache.free('USDT') == 65.0  # Buffered until the next snapshot
+
+
+def test_user_stream_url_follows_the_stream_base():
+    assert user_stream_url(None) == "wss://stream.binance.com:9443/ws"
+    assert user_stream_url("ws://127.0.0.1:8080/stream") == "ws://127.0.0.1:8080/ws"
+
+
+@pytest.fixture
+def mock_config(monkeypatch):
+    def point_at(exchange):
+        for name, value in (("API_KEY", "mock"), ("API_SECRET", "mock"), ("USE_TESTNET", False),
+                            ("REST_BASE_URL", exchange.rest_url), ("STREAM_BASE_URL", exchange.stream_url),
+                            ("STREAM_RECORD_DIR", None)):
+            monkeypatch.setattr(Config, name, value)
+    return point_at
+
+
+def test_balances_follow_fills_without_account_requests(mock_config):
+    async def scenario():
+        exchange = MockExchange(balances={"USDT": 1000.0})
+        async with exchange:
+            mock_config(exchange)
+            client = await BinanceClient.create()
+            try:
+                await client.start_user_data_stream()
+                before = await client.get_free_balance("USDT")
+                order = await client.place_order("BTCUSDT", "BUY", "MARKET", 2)
+                await asyncio.sleep(0.1)
+                after = await client.get_free_balance("USDT"), client.account.free("BTC")
+                fetched = exchange.requests["GET /api/v3/account"]
+                exchange_usdt = exchange.balances["USDT"][0]
+            finally:
+                await client.close_all_connections()
+            closed = not exchange.listen_keys
+        return before, order, after, exchange_usdt, fetched, closed
+
+    before, order, (usdt, btc), exchange_usdt, fetched, closed = asyncio.run(scenario())
+
+    assert before == 1000.0
+    assert usdt == pytest.approx(exchange_usdt, abs=1e-6) and usdt < 1000.0 - float(order["cummulativeQuoteQty"])
+    assert btc == 2.0
+    assert fetched == 1  # Only the snapshot
+    assert closed
+
+
+def test_resyncs_after_the_stream_drops(mock_config):
+    async def scenario():
+        exchange = MockExchange(balances={"USDT": 1000.0}, disconnect_every=0.4)
+        async with exchange:
+            mock_config(exchange)
+            client = await BinanceClient.create()
+            try:
+                await client.start_user_data_stream()
+                await asyncio.sleep(0.5)
+                await client.user_data.wait_synced()
+                order = await client.place_order("BTCUSDT", "BUY", "MARKET", 1)
+                await asyncio.sleep(0.1)
+                result = client.user_data.reconnects, client.account.synced, client.account.free("BTC")
+            finally:
+                await client.close_all_connections()
+        return order, result
+
+    order, (reconnects, synced, btc) = asyncio.run(scenario())
+
+    assert order["status"] == "FILLED"
+    assert reconnects >= 1 and synced
+    assert btc == 1.0